@@ -1,7 +1,41 @@
-from .agent import AgenticChatbot
-from .factory import ChatbotFactory, Provider, build_default_agent
-from .mcp import HttpMCPClient, MCPConnectorRegistry, MCPPromptConnector, MCPToolConnector
-from .schemas import Action, AgentResponse, ChatMessage, Role
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .agent import AgenticChatbot
+    from .factory import ChatbotFactory, Provider, ProviderConfig, StageConfig, build_default_agent
+    from .llm_router import LLMRouter
+    from .mcp import HttpMCPClient, MCPConnectorRegistry, MCPPromptConnector, MCPToolConnector, PooledHTTPTransport
+    from .schemas import Action, AgentResponse, ChatMessage, Role
+    from .server import ChatServer, ConversationService
+    from .sessions import InMemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+# Public names resolve on first access so `import agentic_chatbot` stays cheap.
+_EXPORTS = {
+    "Action": "schemas",
+    "AgenticChatbot": "agent",
+    "AgentResponse": "schemas",
+    "ChatbotFactory": "factory",
+    "ChatMessage": "schemas",
+    "ChatServer": "server",
+    "ConversationService": "server",
+    "HttpMCPClient": "mcp",
+    "InMemorySessionStore": "sessions",
+    "LLMRouter": "llm_router",
+    "MCPConnectorRegistry": "mcp",
+    "MCPPromptConnector": "mcp",
+    "MCPToolConnector": "mcp",
+    "PooledHTTPTransport": "mcp",
+    "Provider": "factory",
+    "ProviderConfig": "factory",
+    "RedisSessionStore": "sessions",
+    "Role": "schemas",
+    "SQLiteSessionStore": "sessions",
+    "StageConfig": "factory",
+    "build_default_agent": "factory",
+}
 
 __all__ = [
     "Action",
@@ -9,11 +43,33 @@ __all__ = [
     "AgentResponse",
     "ChatbotFactory",
     "ChatMessage",
+    "ChatServer",
+    "ConversationService",
     "HttpMCPClient",
+    "InMemorySessionStore",
+    "LLMRouter",
     "MCPConnectorRegistry",
     "MCPPromptConnector",
     "MCPToolConnector",
+    "PooledHTTPTransport",
     "Provider",
+    "ProviderConfig",
+    "RedisSessionStore",
     "Role",
+    "SQLiteSessionStore",
+    "StageConfig",
     "build_default_agent",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator
 
+from .history import HistoryManager
 from .planner import Planner
-from .schemas import Action, AgentResponse, ChatMessage
-from .skills import ClarifySkill, JokeSkill, RecipeSkill
+from .schemas import Action, AgentResponse, ChatMessage, Plan
+from .skills import ClarifySkill, JokeSkill, RecipeSkill, Skill, arun_skill, astream_skill, stream_skill
+from .speculation import Speculation
+from .tracing import span
 
 
 @dataclass
@@ -13,12 +18,133 @@ class AgenticChatbot:
     clarify_skill: ClarifySkill
     joke_skill: JokeSkill
     recipe_skill: RecipeSkill
+    history_manager: HistoryManager | None = None
+    speculation: Speculation | None = None
+    early_dispatch: bool = False
+    _pending_plans: set[asyncio.Task[Plan]] = field(default_factory=set, init=False, repr=False)
 
     def respond(self, history: list[ChatMessage], user_message: str) -> AgentResponse:
-        plan = self.planner.plan(history=history, user_message=user_message)
+        with span("agent.respond", history_messages=len(history)) as root:
+            plan = self.planner.plan(history=self._planner_history(history), user_message=user_message)
+            root.set_attribute("action", plan.action.value)
+            return self._skill_for(plan).run(plan, self._skill_history(history), user_message)
 
+    async def arespond(self, history: list[ChatMessage], user_message: str) -> AgentResponse:
+        with span("agent.respond", history_messages=len(history)) as root:
+            if self.speculation is not None:
+                response = await self._arespond_speculatively(history, user_message, self.speculation)
+            else:
+                plan = await self._aplan(history, user_message)
+                response = await arun_skill(
+                    self._skill_for(plan), plan, await self._askill_history(history), user_message
+                )
+            root.set_attribute("action", response.action.value)
+            return response
+
+    async def _arespond_speculatively(
+        self, history: list[ChatMessage], user_message: str, speculation: Speculation
+    ) -> AgentResponse:
+        plan, response = await self._aspeculate(history, user_message, speculation)
+        if response is None:
+            response = await arun_skill(
+                self._skill_for(plan), plan, await self._askill_history(history), user_message
+            )
+            speculation.observe(history, user_message, plan, response)
+        return response
+
+    async def _aspeculate(
+        self, history: list[ChatMessage], user_message: str, speculation: Speculation
+    ) -> tuple[Plan, AgentResponse | None]:
+        """Plan while a guessed skill runs; the response is set only when the guess held."""
+        skill_history = await self._askill_history(history)
+        guess = speculation.guess(history, user_message)
+        speculative: asyncio.Task[AgentResponse] | None = None
+        if guess is not None:
+            speculative = asyncio.create_task(
+                arun_skill(self._skill_for(guess), guess, skill_history, user_message)
+            )
+        try:
+            plan = await self._aplan(history, user_message)
+        except BaseException:
+            if speculative is not None:
+                speculative.cancel()
+            raise
+
+        skill = self._skill_for(plan)
+        if speculative is not None and guess is not None:
+            if speculation.accepts(skill, guess, plan, user_message):
+                try:
+                    response = await speculative
+                except Exception:
+                    # A failed speculative run gets one regular attempt.
+                    pass
+                else:
+                    speculation.observe(history, user_message, plan, response)
+                    return plan, response
+            else:
+                speculation.discard(speculative, skill_history, user_message)
+        return plan, None
+
+    async def _aplan(self, history: list[ChatMessage], user_message: str) -> Plan:
+        aplan_early = getattr(self.planner, "aplan_early", None) if self.early_dispatch else None
+        planner_history = await self._aplanner_history(history)
+        if aplan_early is not None:
+            plan, final = await aplan_early(history=planner_history, user_message=user_message)
+            # The rest of the plan (reason, cache and router updates) finishes alongside the skill.
+            self._pending_plans.add(final)
+            final.add_done_callback(self._plan_finished)
+            return plan
+        aplan = getattr(self.planner, "aplan", None)
+        if aplan is not None:
+            return await aplan(history=planner_history, user_message=user_message)
+        return await asyncio.to_thread(self.planner.plan, history=planner_history, user_message=user_message)
+
+    def _plan_finished(self, task: asyncio.Task[Plan]) -> None:
+        self._pending_plans.discard(task)
+        if not task.cancelled():
+            task.exception()  # already recorded on the planner span; don't warn about it
+
+    def stream_respond(self, history: list[ChatMessage], user_message: str) -> Iterator[str | AgentResponse]:
+        """Yield text chunks as the skill produces them, then the final `AgentResponse`."""
+        plan = self.planner.plan(history=self._planner_history(history), user_message=user_message)
+        yield from stream_skill(self._skill_for(plan), plan, self._skill_history(history), user_message)
+
+    async def astream_respond(
+        self, history: list[ChatMessage], user_message: str
+    ) -> AsyncIterator[str | AgentResponse]:
+        """Async `stream_respond`, planning the way `arespond` does.
+
+        A turn answered by a speculative run arrives as one chunk.
+        """
+        if self.speculation is not None:
+            plan, response = await self._aspeculate(history, user_message, self.speculation)
+            if response is not None:
+                yield response.content
+                yield response
+                return
+        else:
+            plan = await self._aplan(history, user_message)
+        skill_history = await self._askill_history(history)
+        async for chunk in astream_skill(self._skill_for(plan), plan, skill_history, user_message):
+            if isinstance(chunk, AgentResponse) and self.speculation is not None:
+                self.speculation.observe(history, user_message, plan, chunk)
+            yield chunk
+
+    def _planner_history(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return self.history_manager.for_planner(history) if self.history_manager else history
+
+    def _skill_history(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return self.history_manager.for_skill(history) if self.history_manager else history
+
+    async def _aplanner_history(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return await self.history_manager.afor_planner(history) if self.history_manager else history
+
+    async def _askill_history(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return await self.history_manager.afor_skill(history) if self.history_manager else history
+
+    def _skill_for(self, plan: Plan) -> Skill:
         if plan.action == Action.JOKE:
-            return self.joke_skill.run(plan, history, user_message)
+            return self.joke_skill
         if plan.action == Action.RECIPE:
-            return self.recipe_skill.run(plan, history, user_message)
-        return self.clarify_skill.run(plan, history, user_message)
+            return self.recipe_skill
+        return self.clarify_skill
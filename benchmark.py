@@ -0,0 +1,508 @@
+"""Offline benchmark: replay logged messages through the agent against simulated backends.
+
+    python -m agentic_chatbot.benchmark requests.jsonl --concurrency 1,8,32 --output bench.json
+
+With `--planner-models` only the planner runs, once per model, and the report gives
+routing accuracy (against `plan.action` / `expected_action` labels) and latency:
+
+    python -m agentic_chatbot.benchmark plans.jsonl --planner-models openai:gpt-5-nano,anthropic:claude-3-5-haiku-latest
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .agent import AgenticChatbot
+from .factory import ChatbotFactory
+from .llm import LLMClient
+from .mcp import HttpMCPClient, MCPConnectorRegistry, MCPPromptConnector, MCPToolConnector
+from .planner import _INVALID_JSON_REASON, PLANNER_SYSTEM_PROMPT, Planner
+from .schemas import Action, ChatMessage, Role
+from .skills import ClarifySkill, JokeSkill, RecipeSkill
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Seconds to first token: `fixed`, `uniform` (low..high) or `lognormal` (median, sigma)."""
+
+    kind: str = "fixed"
+    low: float = 0.0
+    high: float = 0.0
+    median: float = 0.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.low, self.high)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.median), self.sigma) if self.median > 0 else 0.0
+        if self.kind == "fixed":
+            return self.low
+        raise ValueError(f"Unknown latency model: {self.kind}")
+
+
+@dataclass
+class SimulatedLLM:
+    """Deterministic stand-in for a provider: answers planner prompts with a plan and
+    skill prompts with filler text, sleeping for first-token latency plus generation time."""
+
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    tokens_per_second: float = 0.0
+    output_tokens: int = 60
+    use_mcp: bool = False
+    seed: int = 0
+    calls: int = 0
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        text, delay = self._respond(messages)
+        time.sleep(delay)
+        return text
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        text, delay = self._respond(messages)
+        await asyncio.sleep(delay)
+        return text
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        text, delay = self._respond(messages)
+        words = text.split(" ")
+        time.sleep(max(0.0, delay - self._generation_seconds(len(words))))
+        for index, word in enumerate(words):
+            if self.tokens_per_second > 0:
+                time.sleep(1.0 / self.tokens_per_second)
+            yield word if index == 0 else f" {word}"
+
+    def _respond(self, messages: list[ChatMessage]) -> tuple[str, float]:
+        with self._lock:
+            self.calls += 1
+            first_token = self.latency.sample(self._rng)
+        if messages and messages[0].content == PLANNER_SYSTEM_PROMPT:
+            text = json.dumps(self._plan(messages[-1].content))
+        else:
+            text = " ".join(f"token{index}" for index in range(self.output_tokens))
+        return text, first_token + self._generation_seconds(len(text.split(" ")))
+
+    def _generation_seconds(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _plan(self, user_message: str) -> dict[str, Any]:
+        lowered = user_message.lower()
+        if any(word in lowered for word in ("joke", "funny", "laugh", "pun")):
+            action, params = Action.JOKE, {"topic": "benchmarks"}
+        elif any(word in lowered for word in ("recipe", "cook", "bake", "meal", "dinner", "food")):
+            action, params = Action.RECIPE, {"ingredients": "rice", "servings": 2}
+        else:
+            action, params = Action.CLARIFY, {}
+        if self.use_mcp and action != Action.CLARIFY:
+            params.update({"mcp_prompt": "system", "mcp_tool": "context"})
+        return {
+            "action": action.value,
+            "reason": "simulated",
+            "params": params,
+            "clarifying_question": "Joke or recipe?" if action == Action.CLARIFY else None,
+        }
+
+
+class FakeMCPServer:
+    """Local HTTP MCP server for `/prompts/get`, `/tools/call` and `/tools/batch`."""
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        latency = latency_seconds
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if latency:
+                    time.sleep(latency)
+                if self.path.endswith("/prompts/get"):
+                    body: dict[str, Any] = {"prompt": f"Simulated system prompt {payload.get('prompt_name')}"}
+                elif self.path.endswith("/tools/batch"):
+                    body = {"results": [{"result": f"context for {call.get('tool_name')}"} for call in payload.get("calls", [])]}
+                else:
+                    body = {"result": f"context for {payload.get('tool_name')}"}
+                raw = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return None
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> "FakeMCPServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def load_conversations(path: str | Path) -> list[list[str]]:
+    """Group JSONL records into conversations of user messages.
+
+    Each line needs a message under `user_message`, `message` or `body` (the shape of
+    `requests.jsonl`); lines sharing a `conversation_id` form one ordered conversation,
+    and lines without one are single-turn conversations.
+    """
+    conversations: dict[str, list[str]] = {}
+    with open(path, encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            message = record.get("user_message") or record.get("message") or record.get("body")
+            if not isinstance(message, str) or not message.strip():
+                continue
+            conversation_id = str(record.get("conversation_id", f"line-{line_number}"))
+            conversations.setdefault(conversation_id, []).append(message.strip())
+    return list(conversations.values())
+
+
+def load_labeled_messages(path: str | Path) -> list[tuple[str, Action | None]]:
+    """User messages paired with their expected action, from `plan.action` or `expected_action`.
+
+    Accepts the same records as `load_conversations` plus planner logs shaped like
+    `{"user_message": ..., "plan": {"action": ...}}`; unlabelled messages map to None.
+    """
+    labeled: list[tuple[str, Action | None]] = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            message = record.get("user_message") or record.get("message") or record.get("body")
+            if not isinstance(message, str) or not message.strip():
+                continue
+            plan = record.get("plan")
+            raw_action = record.get("expected_action") or (plan.get("action") if isinstance(plan, dict) else None)
+            try:
+                action = Action(str(raw_action).strip().lower()) if raw_action else None
+            except ValueError:
+                action = None
+            labeled.append((message.strip(), action))
+    return labeled
+
+
+@dataclass
+class ConcurrencyResult:
+    concurrency: int
+    turns: int
+    wall_seconds: float
+    throughput_turns_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    errors: int
+
+
+@dataclass
+class BenchmarkReport:
+    config: dict[str, Any]
+    results: list[ConcurrencyResult] = field(default_factory=list)
+    # Peak traced memory above the turn's starting point: what a turn allocates at once.
+    peak_bytes_per_turn: float = 0.0
+    # What is still held after the sample, spread over its turns (caches, leaks).
+    retained_blocks_per_turn: float = 0.0
+    retained_bytes_per_turn: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def save(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2, sort_keys=True), encoding="utf-8")
+
+
+@dataclass
+class PlannerModelResult:
+    model: str
+    turns: int
+    labeled: int
+    correct: int
+    accuracy: float
+    invalid_json: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+
+
+@dataclass
+class PlannerBenchmarkReport:
+    config: dict[str, Any]
+    results: list[PlannerModelResult] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def save(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2, sort_keys=True), encoding="utf-8")
+
+
+def build_simulated_agent(llm: SimulatedLLM, mcp_url: str | None = None) -> AgenticChatbot:
+    registry = None
+    if mcp_url is not None:
+        client = HttpMCPClient()
+        registry = MCPConnectorRegistry()
+        registry.register_prompt("system", MCPPromptConnector(client=client, server=mcp_url, prompt_name="system"))
+        registry.register_tool("context", MCPToolConnector(client=client, server=mcp_url, tool_name="context"))
+    return AgenticChatbot(
+        planner=Planner(llm=llm),
+        clarify_skill=ClarifySkill(),
+        joke_skill=JokeSkill(llm=llm, mcp_registry=registry),
+        recipe_skill=RecipeSkill(llm=llm, mcp_registry=registry),
+    )
+
+
+async def run_concurrency_level(
+    agent: AgenticChatbot, conversations: list[list[str]], concurrency: int
+) -> ConcurrencyResult:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def replay(messages: list[str]) -> None:
+        nonlocal errors
+        async with semaphore:
+            history: list[ChatMessage] = []
+            for message in messages:
+                started = time.perf_counter()
+                try:
+                    response = await agent.arespond(history=history, user_message=message)
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                history.append(ChatMessage(role=Role.USER, content=message))
+                history.append(ChatMessage(role=Role.ASSISTANT, content=response.content))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(replay(messages) for messages in conversations))
+    wall = time.perf_counter() - started
+    return ConcurrencyResult(
+        concurrency=concurrency,
+        turns=len(latencies),
+        wall_seconds=wall,
+        throughput_turns_per_second=len(latencies) / wall if wall > 0 else 0.0,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        mean_ms=(sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+        errors=errors,
+    )
+
+
+async def run_planner_model(
+    name: str, llm: LLMClient, messages: list[tuple[str, Action | None]], concurrency: int
+) -> PlannerModelResult:
+    planner = Planner(llm=llm)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    correct = invalid = errors = 0
+
+    async def route(message: str, expected: Action | None) -> None:
+        nonlocal correct, invalid, errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                plan = await planner.aplan(history=[], user_message=message)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - started)
+            if plan.reason == _INVALID_JSON_REASON:
+                invalid += 1
+            if expected is not None and plan.action == expected:
+                correct += 1
+
+    await asyncio.gather(*(route(message, expected) for message, expected in messages))
+    labeled = sum(1 for _, expected in messages if expected is not None)
+    return PlannerModelResult(
+        model=name,
+        turns=len(latencies),
+        labeled=labeled,
+        correct=correct,
+        accuracy=correct / labeled if labeled else 0.0,
+        invalid_json=invalid,
+        errors=errors,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        mean_ms=(sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+    )
+
+
+def run_planner_benchmark(
+    messages: list[tuple[str, Action | None]],
+    planners: dict[str, LLMClient],
+    *,
+    concurrency: int = 8,
+    config: dict[str, Any] | None = None,
+) -> PlannerBenchmarkReport:
+    report = PlannerBenchmarkReport(config=dict(config or {}))
+    for name, llm in planners.items():
+        report.results.append(asyncio.run(run_planner_model(name, llm, messages, concurrency)))
+    return report
+
+
+def measure_allocations(agent: AgenticChatbot, messages: list[str]) -> tuple[float, float, float]:
+    """Mean peak bytes per turn, and retained blocks and bytes per turn, replaying `messages` sequentially."""
+    if not messages:
+        return 0.0, 0.0, 0.0
+    agent.respond(history=[], user_message=messages[0])  # warm caches and imports
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        peaks = 0
+        for message in messages:
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            agent.respond(history=[], user_message=message)
+            peaks += tracemalloc.get_traced_memory()[1] - start
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    diffs = after.compare_to(before, "filename")
+    blocks = sum(max(0, diff.count_diff) for diff in diffs)
+    size = sum(max(0, diff.size_diff) for diff in diffs)
+    return peaks / len(messages), blocks / len(messages), size / len(messages)
+
+
+def run_benchmark(
+    conversations: list[list[str]],
+    *,
+    concurrency_levels: list[int],
+    agent_factory: Callable[[], AgenticChatbot],
+    allocation_sample: int = 20,
+    config: dict[str, Any] | None = None,
+) -> BenchmarkReport:
+    report = BenchmarkReport(config=dict(config or {}))
+    for concurrency in concurrency_levels:
+        report.results.append(asyncio.run(run_concurrency_level(agent_factory(), conversations, concurrency)))
+    sample = [message for messages in conversations for message in messages][:allocation_sample]
+    (
+        report.peak_bytes_per_turn,
+        report.retained_blocks_per_turn,
+        report.retained_bytes_per_turn,
+    ) = measure_allocations(agent_factory(), sample)
+    return report
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL conversation log")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--latency", default="fixed", choices=["fixed", "uniform", "lognormal"])
+    parser.add_argument("--latency-low", type=float, default=0.05)
+    parser.add_argument("--latency-high", type=float, default=0.2)
+    parser.add_argument("--latency-median", type=float, default=0.1)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=60)
+    parser.add_argument("--mcp-latency", type=float, default=None, help="enable the fake MCP server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--planner-models",
+        default=None,
+        help="comma-separated provider:model pairs (or 'simulated') to compare as planners",
+    )
+    parser.add_argument("--planner-concurrency", type=int, default=8)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    latency = LatencyModel(
+        kind=args.latency,
+        low=args.latency_low,
+        high=args.latency_high,
+        median=args.latency_median,
+        sigma=args.latency_sigma,
+    )
+    config = {key: value for key, value in vars(args).items() if key not in {"input", "output"}}
+    if args.planner_models:
+        planner_report = run_planner_benchmark(
+            load_labeled_messages(args.input),
+            _planner_clients(args.planner_models, latency=latency, seed=args.seed),
+            concurrency=args.planner_concurrency,
+            config=config,
+        )
+        if args.output:
+            planner_report.save(args.output)
+        print(json.dumps(planner_report.to_dict(), indent=2, sort_keys=True))
+        return
+
+    conversations = load_conversations(args.input)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    def run(mcp_url: str | None) -> BenchmarkReport:
+        def factory() -> AgenticChatbot:
+            llm = SimulatedLLM(
+                latency=latency,
+                tokens_per_second=args.tokens_per_second,
+                output_tokens=args.output_tokens,
+                use_mcp=mcp_url is not None,
+                seed=args.seed,
+            )
+            return build_simulated_agent(llm, mcp_url)
+
+        return run_benchmark(conversations, concurrency_levels=levels, agent_factory=factory, config=config)
+
+    if args.mcp_latency is not None:
+        with FakeMCPServer(latency_seconds=args.mcp_latency) as server:
+            report = run(server.url)
+    else:
+        report = run(None)
+
+    if args.output:
+        report.save(args.output)
+    print(json.dumps(report.to_dict(), indent=2, sort_keys=True))
+
+
+def _planner_clients(spec: str, *, latency: LatencyModel, seed: int) -> dict[str, LLMClient]:
+    clients: dict[str, LLMClient] = {}
+    for entry in (item.strip() for item in spec.split(",")):
+        if not entry:
+            continue
+        if entry == "simulated":
+            clients[entry] = SimulatedLLM(latency=latency, seed=seed)
+            continue
+        provider, _, model = entry.partition(":")
+        clients[entry] = ChatbotFactory(provider=provider.strip().lower(), model=model.strip() or None).build_llm()  # type: ignore[arg-type]
+    return clients
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,572 @@
+"""Bulk offline runs: stream a JSONL file of logged turns through the agent into a JSONL of results.
+
+    python -m agentic_chatbot.bulk requests.jsonl results.jsonl --workers 64
+
+Records use the shape `benchmark.load_conversations` reads. Lines sharing a
+`conversation_id` are answered in file order with the earlier answers as history;
+different conversations run concurrently. The output doubles as the checkpoint: rerunning
+with the same output file skips records already answered, retries failed ones and rebuilds
+their history. A retry appends a new row, so the last row for an id is the one that counts.
+
+With `--batch` every LLM call goes through the provider's batch API (OpenAI or Anthropic),
+which is slower per turn but billed at batch rates.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol
+
+from .agent import AgenticChatbot
+from .llm import (
+    AnthropicChatClient,
+    LLMClient,
+    OpenAIChatClient,
+    _anthropic_content,
+    _anthropic_tool_input,
+    _openai_response_format,
+    complete_json,
+)
+from .schemas import ChatMessage, Role
+
+
+@dataclass(frozen=True)
+class BulkRecord:
+    record_id: str
+    conversation_id: str
+    message: str
+
+
+def read_records(path: str | Path) -> Iterator[BulkRecord]:
+    """Yield records lazily; lines without a usable message are skipped like in the benchmark loader."""
+    with open(path, encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{line_number + 1}: invalid JSON ({exc.msg})") from exc
+            message = record.get("user_message") or record.get("message") or record.get("body")
+            if not isinstance(message, str) or not message.strip():
+                continue
+            record_id = str(record.get("request_id") or record.get("id") or f"line-{line_number}")
+            conversation_id = str(record.get("conversation_id", record_id))
+            yield BulkRecord(record_id=record_id, conversation_id=conversation_id, message=message.strip())
+
+
+@dataclass
+class BulkStats:
+    completed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    conversations: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "conversations": self.conversations,
+        }
+
+
+@dataclass
+class _Conversation:
+    turns: int = 0
+    # Answered turns by turn index: (user message, assistant reply).
+    answered: dict[int, tuple[str, str]] = field(default_factory=dict)
+    # Record ids whose earlier attempt failed, mapped to the turn they keep on retry.
+    retries: dict[str, int] = field(default_factory=dict)
+    queue: deque[BulkRecord] = field(default_factory=deque)
+    running: bool = False
+
+    def history(self, before: int) -> list[ChatMessage]:
+        messages: list[ChatMessage] = []
+        for turn in sorted(self.answered):
+            if turn >= before:
+                break
+            user, assistant = self.answered[turn]
+            messages.append(ChatMessage(role=Role.USER, content=user))
+            messages.append(ChatMessage(role=Role.ASSISTANT, content=assistant))
+        return messages
+
+
+@dataclass
+class BulkRunner:
+    """Run records through `agent` with at most `max_workers` turns in flight.
+
+    Reading pauses while `max_pending` records are queued, so memory stays bounded on large
+    files. A failed turn is written with `status: "error"` and the conversation continues
+    without it; on resume it is retried at its original turn, seeing only the turns before
+    it. `evaluator`, when given, maps each output row to extra fields under `evaluation`;
+    with `cpu_workers` it runs in a process pool and must be picklable. If it raises, the
+    row gets `evaluation: {"error": ...}` instead.
+    """
+
+    agent: AgenticChatbot
+    max_workers: int = 32
+    max_pending: int = 1024
+    cpu_workers: int = 0
+    evaluator: Callable[[dict[str, Any]], dict[str, Any]] | None = None
+    sync_every: int = 100
+    stats: BulkStats = field(default_factory=BulkStats)
+
+    def __post_init__(self) -> None:
+        if self.max_workers < 1 or self.max_pending < 1:
+            raise ValueError("max_workers and max_pending must be at least 1")
+
+    def run(self, input_path: str | Path, output_path: str | Path, *, resume: bool = True) -> BulkStats:
+        return asyncio.run(self.arun(input_path, output_path, resume=resume))
+
+    async def arun(self, input_path: str | Path, output_path: str | Path, *, resume: bool = True) -> BulkStats:
+        done, conversations = _load_checkpoint(output_path) if resume else (set(), {})
+        workers = asyncio.Semaphore(self.max_workers)
+        pending = asyncio.Semaphore(self.max_pending)
+        pool = ProcessPoolExecutor(self.cpu_workers) if self.cpu_workers and self.evaluator else None
+        tasks: set[asyncio.Task[None]] = set()
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as output:
+            writer = _ResultWriter(output, self.sync_every)
+            try:
+                for record in read_records(input_path):
+                    if record.record_id in done:
+                        self.stats.skipped += 1
+                        continue
+                    await pending.acquire()
+                    conversation = conversations.get(record.conversation_id)
+                    if conversation is None:
+                        conversation = conversations[record.conversation_id] = _Conversation()
+                        self.stats.conversations += 1
+                    conversation.queue.append(record)
+                    if not conversation.running:
+                        conversation.running = True
+                        task = asyncio.create_task(self._drain(conversation, workers, pending, writer, pool))
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                writer.sync()
+                if pool is not None:
+                    pool.shutdown()
+        return self.stats
+
+    async def _drain(
+        self,
+        conversation: _Conversation,
+        workers: asyncio.Semaphore,
+        pending: asyncio.Semaphore,
+        writer: _ResultWriter,
+        pool: ProcessPoolExecutor | None,
+    ) -> None:
+        # One task per conversation keeps its turns in order; the semaphore bounds turns across all of them.
+        try:
+            while conversation.queue:
+                record = conversation.queue.popleft()
+                try:
+                    row = await self._turn(record, conversation, workers)
+                    if self.evaluator is not None:
+                        row["evaluation"] = await self._evaluate(row, pool)
+                    writer.write(row)
+                finally:
+                    pending.release()
+        finally:
+            conversation.running = False
+
+    async def _evaluate(self, row: dict[str, Any], pool: ProcessPoolExecutor | None) -> dict[str, Any]:
+        # A broken evaluator costs one row's evaluation, not the whole run.
+        try:
+            if pool is not None:
+                return await asyncio.get_running_loop().run_in_executor(pool, self.evaluator, row)
+            return self.evaluator(row)
+        except Exception as exc:
+            return {"error": f"{type(exc).__name__}: {exc}"}
+
+    async def _turn(
+        self, record: BulkRecord, conversation: _Conversation, workers: asyncio.Semaphore
+    ) -> dict[str, Any]:
+        turn = conversation.retries.pop(record.record_id, None)
+        if turn is None:
+            turn = conversation.turns
+            conversation.turns += 1
+        row: dict[str, Any] = {
+            "id": record.record_id,
+            "conversation_id": record.conversation_id,
+            "turn": turn,
+            "message": record.message,
+        }
+        try:
+            async with workers:
+                response = await self.agent.arespond(conversation.history(before=turn), record.message)
+        except Exception as exc:
+            self.stats.failed += 1
+            row.update(status="error", error=f"{type(exc).__name__}: {exc}")
+            return row
+        conversation.answered[turn] = (record.message, response.content)
+        self.stats.completed += 1
+        row.update(status="ok", action=response.action.value, content=response.content)
+        return row
+
+
+@dataclass
+class _ResultWriter:
+    handle: Any
+    sync_every: int
+    _unsynced: int = 0
+
+    def write(self, row: dict[str, Any]) -> None:
+        # One write call per row so a crash leaves at most one partial trailing line.
+        self.handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self.sync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self._unsynced = 0
+
+
+def _load_checkpoint(path: str | Path) -> tuple[set[str], dict[str, _Conversation]]:
+    """Ids already answered and each conversation's state, from a previous run's output."""
+    path = Path(path)
+    done: set[str] = set()
+    conversations: dict[str, _Conversation] = {}
+    if not path.exists():
+        return done, conversations
+    with open(path, "rb+") as handle:
+        data = handle.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Drop the partial line left by a crash mid-write.
+            handle.truncate(complete)
+    for line in data[:complete].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        conversation = conversations.setdefault(row["conversation_id"], _Conversation())
+        conversation.turns = max(conversation.turns, row["turn"] + 1)
+        # Rows are in write order, so a retry's row supersedes the failure before it.
+        if row.get("status") == "ok":
+            done.add(row["id"])
+            conversation.retries.pop(row["id"], None)
+            conversation.answered[row["turn"]] = (row["message"], row["content"])
+        elif row["id"] not in done:
+            conversation.retries[row["id"]] = row["turn"]
+    return done, conversations
+
+
+@dataclass(frozen=True)
+class BatchRequest:
+    custom_id: str
+    messages: list[ChatMessage]
+    temperature: float
+    # Set for structured-output calls such as the planner's.
+    schema: dict[str, Any] | None = None
+    name: str | None = None
+    max_tokens: int | None = None
+
+
+class BatchBackend(Protocol):
+    def submit(self, requests: list[BatchRequest]) -> str:
+        ...
+
+    def poll(self, batch_id: str) -> bool:
+        """True once results are ready; raises if the batch failed as a whole."""
+        ...
+
+    def results(self, batch_id: str) -> dict[str, str | Exception]:
+        ...
+
+
+@dataclass
+class BatchingLLM:
+    """Async LLM client that gathers concurrent calls into provider batch jobs.
+
+    Calls queue until `max_batch_size` is reached or `flush_interval_seconds` passes, then
+    go out as one batch that is polled every `poll_interval_seconds`. Only the async path is
+    supported. Structured calls keep the provider's JSON mode; streaming calls fall back to
+    `acomplete_json` or `acomplete`.
+    """
+
+    backend: BatchBackend
+    model: str = "batch"
+    max_batch_size: int = 1000
+    flush_interval_seconds: float = 1.0
+    poll_interval_seconds: float = 30.0
+    batches: int = 0
+    _queue: list[tuple[BatchRequest, asyncio.Future[str]]] = field(default_factory=list, init=False, repr=False)
+    _flush_task: asyncio.Task[None] | None = field(default=None, init=False, repr=False)
+    _jobs: set[asyncio.Task[None]] = field(default_factory=set, init=False, repr=False)
+    _ids: Iterator[int] = field(default_factory=itertools.count, init=False, repr=False)
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        raise RuntimeError("BatchingLLM only serves async callers; use AgenticChatbot.arespond")
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        return await self._enqueue(messages, temperature)
+
+    async def acomplete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        return await self._enqueue(messages, temperature, schema=schema, name=name, max_tokens=max_tokens)
+
+    async def _enqueue(self, messages: list[ChatMessage], temperature: float, **structured: Any) -> str:
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        request = BatchRequest(
+            custom_id=f"req-{next(self._ids)}", messages=list(messages), temperature=temperature, **structured
+        )
+        self._queue.append((request, future))
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval_seconds)
+        self._flush_task = None
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+            self._flush_task = None
+        entries, self._queue = self._queue, []
+        if entries:
+            job = asyncio.create_task(self._run_batch(entries))
+            self._jobs.add(job)
+            job.add_done_callback(self._jobs.discard)
+
+    async def _run_batch(self, entries: list[tuple[BatchRequest, asyncio.Future[str]]]) -> None:
+        try:
+            batch_id = await asyncio.to_thread(self.backend.submit, [request for request, _ in entries])
+            self.batches += 1
+            while not await asyncio.to_thread(self.backend.poll, batch_id):
+                await asyncio.sleep(self.poll_interval_seconds)
+            results = await asyncio.to_thread(self.backend.results, batch_id)
+        except Exception as exc:
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for request, future in entries:
+            if future.done():
+                continue
+            result = results.get(request.custom_id)
+            if result is None:
+                future.set_exception(RuntimeError(f"Batch {batch_id} returned no result for {request.custom_id}"))
+            elif isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+@dataclass
+class AnthropicBatchBackend:
+    """Message Batches API, with requests built exactly as `AnthropicChatClient` sends them."""
+
+    client: AnthropicChatClient
+    _tool_names: dict[str, str] = field(default_factory=dict, init=False, repr=False)
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        batch = self.client.sdk_client.messages.batches.create(
+            requests=[{"custom_id": request.custom_id, "params": self._params(request)} for request in requests]
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> bool:
+        return self.client.sdk_client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id: str) -> dict[str, str | Exception]:
+        results: dict[str, str | Exception] = {}
+        for entry in self.client.sdk_client.messages.batches.results(batch_id):
+            outcome = entry.result
+            name = self._tool_names.pop(entry.custom_id, None)
+            if outcome.type == "succeeded":
+                try:
+                    if name is None:
+                        results[entry.custom_id] = _anthropic_content(outcome.message)
+                    else:
+                        results[entry.custom_id] = _anthropic_tool_input(outcome.message, name)
+                except ValueError as exc:
+                    results[entry.custom_id] = exc
+            else:
+                results[entry.custom_id] = RuntimeError(f"Anthropic batch request {outcome.type}")
+        return results
+
+    def _params(self, request: BatchRequest) -> dict[str, Any]:
+        if request.schema is None:
+            return self.client._request(request.messages, request.temperature)
+        name = request.name or "output"
+        self._tool_names[request.custom_id] = name
+        return self.client._json_request(request.messages, request.schema, name, request.temperature, request.max_tokens)
+
+
+_OPENAI_BATCH_FAILED = frozenset({"failed", "expired", "cancelled", "cancelling"})
+
+
+@dataclass
+class OpenAIBatchBackend:
+    """Batch API over an uploaded JSONL of chat completion requests built by `OpenAIChatClient`."""
+
+    client: OpenAIChatClient
+    completion_window: str = "24h"
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        lines = "".join(
+            json.dumps(
+                {
+                    "custom_id": request.custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._body(request),
+                }
+            )
+            + "\n"
+            for request in requests
+        )
+        sdk = self.client.sdk_client
+        upload = sdk.files.create(file=("batch.jsonl", lines.encode("utf-8")), purpose="batch")
+        batch = sdk.batches.create(
+            input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window=self.completion_window
+        )
+        return batch.id
+
+    def _body(self, request: BatchRequest) -> dict[str, Any]:
+        body = self.client._request(request.messages, request.temperature, request.max_tokens)
+        if request.schema is not None:
+            body["response_format"] = _openai_response_format(request.schema, request.name or "output")
+        return body
+
+    def poll(self, batch_id: str) -> bool:
+        status = self.client.sdk_client.batches.retrieve(batch_id).status
+        if status in _OPENAI_BATCH_FAILED:
+            raise RuntimeError(f"OpenAI batch {batch_id} ended with status '{status}'")
+        return status == "completed"
+
+    def results(self, batch_id: str) -> dict[str, str | Exception]:
+        sdk = self.client.sdk_client
+        batch = sdk.batches.retrieve(batch_id)
+        results: dict[str, str | Exception] = {}
+        for file_id in (batch.output_file_id, getattr(batch, "error_file_id", None)):
+            if not file_id:
+                continue
+            for line in sdk.files.content(file_id).text.splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    results[entry["custom_id"]] = _openai_batch_result(entry)
+        return results
+
+
+def _openai_batch_result(entry: dict[str, Any]) -> str | Exception:
+    response = entry.get("response") or {}
+    if entry.get("error") or response.get("status_code") != 200:
+        return RuntimeError(f"OpenAI batch request failed: {entry.get('error') or response.get('body')}")
+    content = response["body"]["choices"][0]["message"].get("content")
+    return content if content else ValueError("OpenAI response returned empty content")
+
+
+@dataclass
+class LocalBatchBackend:
+    """In-process stand-in for a batch API: answers with `llm` after `polls_until_done` polls."""
+
+    llm: LLMClient
+    polls_until_done: int = 1
+    submitted: list[list[BatchRequest]] = field(default_factory=list)
+    _polls: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    def submit(self, requests: list[BatchRequest]) -> str:
+        batch_id = f"local-batch-{len(self.submitted)}"
+        self.submitted.append(list(requests))
+        self._polls[batch_id] = 0
+        return batch_id
+
+    def poll(self, batch_id: str) -> bool:
+        self._polls[batch_id] += 1
+        return self._polls[batch_id] >= self.polls_until_done
+
+    def results(self, batch_id: str) -> dict[str, str | Exception]:
+        results: dict[str, str | Exception] = {}
+        for request in self.submitted[int(batch_id.rsplit("-", 1)[1])]:
+            try:
+                if request.schema is None:
+                    results[request.custom_id] = self.llm.complete(request.messages, temperature=request.temperature)
+                else:
+                    results[request.custom_id] = complete_json(
+                        self.llm,
+                        request.messages,
+                        schema=request.schema,
+                        name=request.name or "output",
+                        temperature=request.temperature,
+                        max_tokens=request.max_tokens,
+                    )
+            except Exception as exc:
+                results[request.custom_id] = exc
+        return results
+
+
+def batch_backend_for(llm: Any) -> BatchBackend:
+    if isinstance(llm, AnthropicChatClient):
+        return AnthropicBatchBackend(llm)
+    if isinstance(llm, OpenAIChatClient):
+        return OpenAIBatchBackend(llm)
+    raise ValueError(f"No batch API for {type(llm).__name__}; batch mode needs a single OpenAI or Anthropic client")
+
+
+def use_batching(
+    agent: AgenticChatbot, make_backend: Callable[[Any], BatchBackend] = batch_backend_for, **options: Any
+) -> AgenticChatbot:
+    """Route the planner and skills through batch jobs; stages sharing a client share one batcher."""
+    batchers: dict[int, BatchingLLM] = {}
+    for stage in (agent.planner, agent.joke_skill, agent.recipe_skill):
+        llm = getattr(stage, "llm", None)
+        if llm is None:
+            continue
+        if id(llm) not in batchers:
+            batchers[id(llm)] = BatchingLLM(backend=make_backend(llm), model=getattr(llm, "model", "batch"), **options)
+        stage.llm = batchers[id(llm)]
+    return agent
+
+
+def main(argv: list[str] | None = None) -> None:
+    from .factory import build_default_agent, load_env_file
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL conversation log")
+    parser.add_argument("output", help="JSONL results; also the checkpoint for resuming")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--max-pending", type=int, default=1024)
+    parser.add_argument("--no-resume", action="store_true", help="overwrite the output instead of resuming")
+    parser.add_argument("--batch", action="store_true", help="send LLM calls through the provider batch API")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--batch-poll-seconds", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    load_env_file()
+    agent = build_default_agent()
+    if args.batch:
+        use_batching(agent, max_batch_size=args.batch_size, poll_interval_seconds=args.batch_poll_seconds)
+    runner = BulkRunner(agent=agent, max_workers=args.workers, max_pending=args.max_pending)
+    stats = runner.run(args.input, args.output, resume=not args.no_resume)
+    print(json.dumps(stats.snapshot(), indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+from .schemas import Action, ChatMessage, Plan
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    near_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "near_hits": self.near_hits,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+@dataclass
+class TTLCache(Generic[K, V]):
+    """Thread-safe LRU cache with optional TTL and an approximate memory cap."""
+
+    max_entries: int = 1024
+    ttl_seconds: float | None = None
+    max_bytes: int | None = None
+    sizeof: Callable[[Any], int] = lambda value: len(repr(value))
+    on_evict: Callable[[K, V], None] | None = None
+    clock: Callable[[], float] = time.monotonic
+    stats: CacheStats = field(default_factory=CacheStats)
+    _entries: OrderedDict[K, tuple[V, float, int]] = field(default_factory=OrderedDict, init=False, repr=False)
+    _bytes: int = field(default=0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= self.clock():
+                self._remove(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def peek(self, key: K) -> tuple[V, float] | None:
+        """Return `(value, seconds_until_expiry)` without touching LRU order, stats or expiry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry[0], entry[1] - self.clock()
+
+    def set(self, key: K, value: V, *, ttl_seconds: float | None = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = self.clock() + ttl if ttl is not None else float("inf")
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def invalidate(self, key: K) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def invalidate_where(self, predicate: Callable[[K], bool]) -> int:
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                self._remove(key)
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: K) -> None:
+        value, _, size = self._entries.pop(key)
+        self._bytes -= size
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+
+@dataclass(frozen=True)
+class _PlanEntry:
+    plan: Plan
+    context_key: str
+    shingles: frozenset[str]
+
+
+@dataclass
+class PlanCache:
+    """Caches planner output keyed on the normalized message plus a bounded history window.
+
+    With `near_duplicate_threshold` set, a miss falls back to the entry under the same
+    history window whose character n-gram Jaccard similarity is highest.
+    """
+
+    history_window: int = 4
+    max_entries: int = 2048
+    ttl_seconds: float | None = 3600.0
+    max_bytes: int | None = 4 * 1024 * 1024
+    near_duplicate_threshold: float | None = None
+    ngram_size: int = 3
+    clock: Callable[[], float] = time.monotonic
+    _entries: TTLCache[str, _PlanEntry] = field(init=False, repr=False)
+    _postings: dict[str, dict[str, set[str]]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._entries = TTLCache(
+            max_entries=self.max_entries,
+            ttl_seconds=self.ttl_seconds,
+            max_bytes=self.max_bytes,
+            sizeof=_plan_entry_size,
+            on_evict=self._unindex,
+            clock=self.clock,
+        )
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._entries.stats
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, history: list[ChatMessage], user_message: str) -> Plan | None:
+        with self._lock:
+            return self._get(history, user_message)
+
+    def put(self, history: list[ChatMessage], user_message: str, plan: Plan) -> None:
+        with self._lock:
+            self._put(history, user_message, plan)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+
+    def _get(self, history: list[ChatMessage], user_message: str) -> Plan | None:
+        normalized = _normalize(user_message)
+        if not normalized:
+            return None
+        context_key = self._context_key(history)
+        entry = self._entries.get(_digest(context_key, normalized))
+        if entry is not None:
+            return entry.plan
+        if self.near_duplicate_threshold is None:
+            return None
+
+        match_key = self._nearest(context_key, _shingles(normalized, self.ngram_size))
+        if match_key is None:
+            return None
+        entry = self._entries.get(match_key)
+        if entry is None:
+            return None
+        # The exact lookup above already counted a miss; reclassify it.
+        self.stats.misses -= 1
+        self.stats.near_hits += 1
+        return entry.plan
+
+    def _put(self, history: list[ChatMessage], user_message: str, plan: Plan) -> None:
+        normalized = _normalize(user_message)
+        if not normalized:
+            # Punctuation-only messages would all share one key.
+            return
+        context_key = self._context_key(history)
+        key = _digest(context_key, normalized)
+        shingles = _shingles(normalized, self.ngram_size) if self.near_duplicate_threshold is not None else frozenset()
+        self._entries.set(key, _PlanEntry(plan=plan, context_key=context_key, shingles=shingles))
+        if not shingles:
+            return
+        postings = self._postings.setdefault(context_key, {})
+        for shingle in shingles:
+            postings.setdefault(shingle, set()).add(key)
+
+    def _context_key(self, history: list[ChatMessage]) -> str:
+        window = history[-self.history_window:] if self.history_window > 0 else []
+        return hashlib.sha256(
+            "\x1e".join(f"{msg.role.value}\x1f{_normalize(msg.content)}" for msg in window).encode("utf-8")
+        ).hexdigest()
+
+    def _nearest(self, context_key: str, shingles: frozenset[str]) -> str | None:
+        postings = self._postings.get(context_key)
+        if not postings or not shingles:
+            return None
+        overlaps: dict[str, int] = {}
+        for shingle in shingles:
+            for key in postings.get(shingle, ()):
+                overlaps[key] = overlaps.get(key, 0) + 1
+
+        best_key, best_score = None, 0.0
+        for key, overlap in overlaps.items():
+            peeked = self._entries.peek(key)
+            if peeked is None:
+                continue
+            candidate = peeked[0].shingles
+            score = overlap / (len(shingles) + len(candidate) - overlap)
+            if score > best_score:
+                best_key, best_score = key, score
+        assert self.near_duplicate_threshold is not None
+        return best_key if best_score >= self.near_duplicate_threshold else None
+
+    def _unindex(self, key: str, entry: _PlanEntry) -> None:
+        postings = self._postings.get(entry.context_key)
+        if postings is None:
+            return
+        for shingle in entry.shingles:
+            keys = postings.get(shingle)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del postings[shingle]
+        if not postings:
+            del self._postings[entry.context_key]
+
+
+@dataclass
+class ResponseCache:
+    """Caches skill responses keyed on the action, normalized params, system prompt and tool context.
+
+    An in-memory LRU sits in front of an optional SQLite file (`path`) that survives
+    restarts. Expiry uses wall-clock time so disk entries keep their TTL across processes.
+    The file is pruned in batches once it passes `max_disk_entries`, not on every write.
+    """
+
+    max_entries: int = 1024
+    ttl_seconds: float | None = 24 * 3600.0
+    max_bytes: int | None = 16 * 1024 * 1024
+    path: str | Path | None = None
+    max_disk_entries: int = 100_000
+    clock: Callable[[], float] = time.time
+    disk_hits: int = field(default=0, init=False)
+    _memory: TTLCache[str, str] = field(init=False, repr=False)
+    _disk: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+    _disk_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _disk_rows: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._memory = TTLCache(
+            max_entries=self.max_entries,
+            ttl_seconds=self.ttl_seconds,
+            max_bytes=self.max_bytes,
+            sizeof=len,
+            clock=self.clock,
+        )
+        if self.path is not None:
+            self._disk = sqlite3.connect(str(self.path), check_same_thread=False)
+            with self._disk_lock, self._disk:
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+                )
+                self._disk.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+                self._disk_rows = self._disk.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._memory.stats
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    @staticmethod
+    def key(
+        action: Action, params: dict[str, Any], system_prompt: str, tool_context: str, model: str | None = None
+    ) -> str:
+        payload = json.dumps(
+            [action.value, _normalize_params(params), system_prompt, tool_context, model],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        content = self._memory.get(key)
+        if content is not None or self._disk is None:
+            return content
+        now = self.clock()
+        with self._disk_lock, self._disk:
+            row = self._disk.execute(
+                "SELECT content, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._disk.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        content, expires_at = row
+        # The memory lookup above counted a miss; the disk tier answered it.
+        self.stats.misses -= 1
+        self.stats.hits += 1
+        self.disk_hits += 1
+        self._memory.set(key, content, ttl_seconds=expires_at - now)
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        self._memory.set(key, content)
+        if self._disk is None:
+            return
+        now = self.clock()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+        with self._disk_lock, self._disk:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO responses (key, content, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, content, expires_at, now),
+            )
+            # Replacements count too, so this only ever overestimates and prunes early.
+            self._disk_rows += 1
+            if self._disk_rows > self.max_disk_entries:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        self._disk.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        rows = self._disk.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        # Trim a tenth below the cap so the next prune is a batch of writes away.
+        overflow = rows - (self.max_disk_entries - self.max_disk_entries // 10)
+        if overflow > 0:
+            self._disk.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY used_at LIMIT ?)",
+                (overflow,),
+            )
+            rows -= overflow
+        self._disk_rows = rows
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            with self._disk_lock, self._disk:
+                self._disk.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        if self._disk is not None:
+            with self._disk_lock:
+                self._disk.close()
+            self._disk = None
+
+
+def _normalize_params(value: Any) -> Any:
+    """Case and whitespace are not meaningful in plan params; key order is handled by `sort_keys`."""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {str(key): _normalize_params(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_params(item) for item in value]
+    return value
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def _digest(context_key: str, normalized: str) -> str:
+    return hashlib.sha256(f"{context_key}\x1d{normalized}".encode("utf-8")).hexdigest()
+
+
+def _shingles(normalized: str, size: int) -> frozenset[str]:
+    padded = f" {normalized} "
+    if len(padded) <= size:
+        return frozenset({padded})
+    return frozenset(padded[i:i + size] for i in range(len(padded) - size + 1))
+
+
+def _plan_entry_size(entry: _PlanEntry) -> int:
+    plan = entry.plan
+    return (
+        len(plan.reason)
+        + len(repr(plan.params))
+        + len(plan.clarifying_question or "")
+        + 64 * len(entry.shingles)
+        + 256
+    )
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from .factory import build_default_agent
-from .schemas import ChatMessage, Role
-from .mcp import MCPClient
+from .factory import build_default_agent, load_env_file
+from .schemas import AgentResponse, ChatMessage, Role
 import asyncio
+import sys
 
 
 async def main():
+    load_env_file()
     agent = build_default_agent()
     history: list[ChatMessage] = []
 
@@ -16,8 +17,16 @@ async def main():
         if user_input.lower() in {"exit", "quit"}:
             break
 
-        response = agent.respond(history=history, user_message=user_input)
-        print(f"assistant> {response.content}")
+        print("assistant> ", end="", flush=True)
+        response: AgentResponse | None = None
+        for chunk in agent.stream_respond(history=history, user_message=user_input):
+            if isinstance(chunk, AgentResponse):
+                response = chunk
+            else:
+                print(chunk, end="", flush=True)
+        print()
+        if response is None:
+            continue
 
         history.append(ChatMessage(role=Role.USER, content=user_input))
         history.append(ChatMessage(
@@ -27,6 +36,8 @@ async def main():
         print("Usage: python client.py <path_to_server_script>")
         sys.exit(1)
 
+    from .mcp_stdio import MCPClient
+
     client = MCPClient()
     try:
         await client.connect_to_server(sys.argv[1])
@@ -35,5 +46,4 @@ async def main():
         await client.cleanup()
 
 if __name__ == "__main__":
-    import sys
     asyncio.run(main())
@@ -2,16 +2,62 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
 from .agent import AgenticChatbot
+from .cache import PlanCache, ResponseCache
+from .history import HistoryBudget, HistoryManager
 from .llm import AnthropicChatClient, GoogleChatClient, OpenAIChatClient
 from .mcp import MCPConnectorRegistry
 from .planner import Planner
+from .router import FastPathRouter
 from .skills import ClarifySkill, JokeSkill, RecipeSkill
+from .speculation import Speculation
+from .tracing import set_tracer, tracer_from_env
+
+if TYPE_CHECKING:
+    from .scheduler import LLMScheduler
+    from .singleflight import SingleFlight
 
 Provider = Literal["openai", "anthropic", "google"]
 
+_PROVIDERS = ("openai", "anthropic", "google")
+_MODEL_ENV = {"openai": "OPENAI_MODEL", "anthropic": "ANTHROPIC_MODEL", "google": "GOOGLE_MODEL"}
+_API_KEY_ENV = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY", "google": "GOOGLE_API_KEY"}
+_DEFAULT_MODELS = {"openai": "gpt-5-mini", "anthropic": "claude-3-5-sonnet-latest", "google": "gemini-2.5-flash"}
+
+
+@dataclass(frozen=True)
+class ProviderConfig:
+    provider: Provider
+    model: str | None = None
+    api_key: str | None = None
+    sdk_client: Any | None = None
+    max_tokens: int | None = None
+
+
+@dataclass(frozen=True)
+class StageConfig:
+    """Per-stage overrides for the planner or a skill; unset fields use the factory defaults.
+
+    `max_tokens=0` lifts the output cap, e.g. for a reasoning model behind the planner.
+    """
+
+    provider: Provider | None = None
+    model: str | None = None
+    api_key: str | None = None
+    sdk_client: Any | None = None
+    temperature: float | None = None
+    max_tokens: int | None = None
+    cache_max_temperature: float | None = None
+
+    @property
+    def has_client_overrides(self) -> bool:
+        return any(
+            value is not None
+            for value in (self.provider, self.model, self.api_key, self.sdk_client, self.max_tokens)
+        )
+
 
 @dataclass
 class ChatbotFactory:
@@ -20,63 +66,280 @@ class ChatbotFactory:
     api_key: str | None = None
     sdk_client: Any | None = None
     mcp_registry: MCPConnectorRegistry | None = None
+    router: FastPathRouter | None = None
+    plan_cache: PlanCache | None = None
+    response_cache: ResponseCache | None = None
+    history_manager: HistoryManager | None = None
+    speculation: Speculation | None = None
+    fallback_providers: tuple[ProviderConfig, ...] = ()
+    llm_timeout_seconds: float | None = 30.0
+    llm_hedge: bool = False
+    planner_stage: StageConfig | None = None
+    joke_stage: StageConfig | None = None
+    recipe_stage: StageConfig | None = None
+    early_dispatch: bool = False
+    scheduler: LLMScheduler | None = None
+    single_flight: SingleFlight | None = None
 
     @classmethod
     def from_env(cls) -> "ChatbotFactory":
         provider = os.getenv("LLM_PROVIDER", "openai").strip().lower()
-        if provider not in {"openai", "anthropic", "google"}:
+        if provider not in _PROVIDERS:
             provider = "openai"
 
-        env_model_key = {
-            "openai": "OPENAI_MODEL",
-            "anthropic": "ANTHROPIC_MODEL",
-            "google": "GOOGLE_MODEL",
-        }[provider]
-        env_key_key = {
-            "openai": "OPENAI_API_KEY",
-            "anthropic": "ANTHROPIC_API_KEY",
-            "google": "GOOGLE_API_KEY",
-        }[provider]
-
-        return cls(
-            provider=provider,  # type: ignore[arg-type]
-            model=os.getenv(env_model_key),
-            api_key=os.getenv(env_key_key),
+        # Unknown names are ignored, like an unknown LLM_PROVIDER.
+        fallback_names = [name.strip().lower() for name in os.getenv("LLM_FALLBACK_PROVIDERS", "").split(",")]
+        fallback_providers = tuple(
+            ProviderConfig(
+                provider=name,  # type: ignore[arg-type]
+                model=os.getenv(_MODEL_ENV[name]),
+                api_key=os.getenv(_API_KEY_ENV[name]),
+            )
+            for name in dict.fromkeys(fallback_names)
+            if name in _PROVIDERS and name != provider
         )
+        timeout = os.getenv("LLM_TIMEOUT_SECONDS", "30").strip()
+
+        router = None
+        if _env_flag("PLANNER_FAST_PATH"):
+            router = FastPathRouter(threshold=float(os.getenv("PLANNER_FAST_PATH_THRESHOLD", "0.85")))
+
+        plan_cache = None
+        if _env_flag("PLANNER_CACHE"):
+            near_duplicate = os.getenv("PLANNER_CACHE_NEAR_DUPLICATE")
+            plan_cache = PlanCache(
+                ttl_seconds=float(os.getenv("PLANNER_CACHE_TTL_SECONDS", "3600")),
+                near_duplicate_threshold=float(near_duplicate) if near_duplicate else None,
+            )
+
+        scheduler = None
+        if _env_flag("LLM_SCHEDULER"):
+            from .scheduler import LLMScheduler, RateLimits
 
-    def build_llm(self):
-        provider = self.provider.strip().lower()
-        if provider == "openai":
-            return OpenAIChatClient(
-                model=self.model or "gpt-5-mini",
-                api_key=self.api_key,
-                sdk_client=self.sdk_client,
+            rpm = os.getenv("LLM_REQUESTS_PER_MINUTE", "").strip()
+            tpm = os.getenv("LLM_TOKENS_PER_MINUTE", "").strip()
+            scheduler = LLMScheduler(
+                default_limits=RateLimits(
+                    requests_per_minute=float(rpm) if rpm else None,
+                    tokens_per_minute=float(tpm) if tpm else None,
+                ),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
             )
-        if provider == "anthropic":
-            return AnthropicChatClient(
-                model=self.model or "claude-3-5-sonnet-latest",
-                api_key=self.api_key,
-                sdk_client=self.sdk_client,
+
+        single_flight = None
+        if _env_flag("LLM_SINGLE_FLIGHT"):
+            from .singleflight import SingleFlight
+
+            single_flight = SingleFlight()
+
+        response_cache = None
+        if _env_flag("SKILL_RESPONSE_CACHE"):
+            response_ttl = os.getenv("SKILL_RESPONSE_CACHE_TTL_SECONDS", "86400").strip()
+            response_cache = ResponseCache(
+                ttl_seconds=float(response_ttl) if response_ttl and float(response_ttl) > 0 else None,
+                path=os.getenv("SKILL_RESPONSE_CACHE_PATH") or None,
             )
-        if provider == "google":
-            return GoogleChatClient(
-                model=self.model or "gemini-2.5-flash",
-                api_key=self.api_key,
-                sdk_client=self.sdk_client,
+
+        history_manager = None
+        if _env_flag("HISTORY_COMPACTION"):
+            history_manager = HistoryManager(
+                planner_budget=HistoryBudget(
+                    max_tokens=int(os.getenv("HISTORY_PLANNER_MAX_TOKENS", "400")),
+                    keep_turns=int(os.getenv("HISTORY_PLANNER_KEEP_TURNS", "2")),
+                ),
+                skill_budget=HistoryBudget(
+                    max_tokens=int(os.getenv("HISTORY_SKILL_MAX_TOKENS", "2000")),
+                    keep_turns=int(os.getenv("HISTORY_SKILL_KEEP_TURNS", "6")),
+                ),
             )
-        raise ValueError(f"Unsupported provider: {self.provider}")
+
+        return cls(
+            provider=provider,  # type: ignore[arg-type]
+            model=os.getenv(_MODEL_ENV[provider]),
+            api_key=os.getenv(_API_KEY_ENV[provider]),
+            router=router,
+            plan_cache=plan_cache,
+            response_cache=response_cache,
+            history_manager=history_manager,
+            speculation=Speculation() if _env_flag("AGENT_SPECULATION") else None,
+            fallback_providers=fallback_providers,
+            llm_timeout_seconds=float(timeout) if timeout and float(timeout) > 0 else None,
+            llm_hedge=_env_flag("LLM_HEDGE"),
+            planner_stage=_stage_from_env("PLANNER", provider),
+            joke_stage=_stage_from_env("JOKE", provider),
+            recipe_stage=_stage_from_env("RECIPE", provider),
+            early_dispatch=_env_flag("PLANNER_EARLY_DISPATCH"),
+            scheduler=scheduler,
+            single_flight=single_flight,
+        )
+
+    def build_llm(self, stage: StageConfig | None = None):
+        primary = self._provider_config(stage)
+        if not self.fallback_providers:
+            return _build_client(primary)
+        from .llm_router import LLMRouter
+
+        clients = {}
+        for config in (primary, *self.fallback_providers):
+            client = _build_client(config)
+            clients[f"{config.provider.strip().lower()}:{client.model}"] = client
+        return LLMRouter(providers=clients, timeout_seconds=self.llm_timeout_seconds, hedge=self.llm_hedge)
 
     def build_agent(self) -> AgenticChatbot:
-        llm = self.build_llm()
-        planner = Planner(llm=llm)
+        default_llm = None
+
+        def stage_llm(stage: StageConfig | None, *, planner: bool = False):
+            nonlocal default_llm
+            if stage is not None and stage.has_client_overrides:
+                llm = self.build_llm(stage)
+            else:
+                if default_llm is None:
+                    default_llm = self.build_llm()
+                llm = default_llm
+            if self.scheduler is not None:
+                from .scheduler import Priority
+
+                llm = self.scheduler.wrap(llm, Priority.PLANNER if planner else Priority.SKILL)
+            if self.single_flight is not None:
+                from .singleflight import SingleFlightLLM
+
+                # Outside the scheduler, so coalesced callers never take a rate-limit slot.
+                llm = SingleFlightLLM(llm, self.single_flight)
+            return llm
+
+        if self.single_flight is not None and self.mcp_registry is not None and self.mcp_registry.single_flight is None:
+            # One flight for tools and prompts too, so LLM_SINGLE_FLIGHT covers every upstream call.
+            self.mcp_registry.single_flight = self.single_flight
+
+        planner_stage = self.planner_stage or StageConfig()
+        joke_stage = self.joke_stage or StageConfig()
+        recipe_stage = self.recipe_stage or StageConfig()
+        planner = Planner(
+            llm=stage_llm(planner_stage, planner=True),
+            router=self.router,
+            cache=self.plan_cache,
+            temperature=planner_stage.temperature if planner_stage.temperature is not None else 0.0,
+            max_tokens=_planner_max_tokens(planner_stage),
+        )
 
         return AgenticChatbot(
             planner=planner,
             clarify_skill=ClarifySkill(),
-            joke_skill=JokeSkill(llm=llm, mcp_registry=self.mcp_registry),
-            recipe_skill=RecipeSkill(llm=llm, mcp_registry=self.mcp_registry),
+            joke_skill=JokeSkill(
+                llm=stage_llm(joke_stage),
+                mcp_registry=self.mcp_registry,
+                temperature=joke_stage.temperature,
+                response_cache=self.response_cache,
+                cache_max_temperature=joke_stage.cache_max_temperature,
+            ),
+            recipe_skill=RecipeSkill(
+                llm=stage_llm(recipe_stage),
+                mcp_registry=self.mcp_registry,
+                temperature=recipe_stage.temperature,
+                response_cache=self.response_cache,
+                cache_max_temperature=recipe_stage.cache_max_temperature,
+            ),
+            history_manager=self.history_manager,
+            speculation=self.speculation,
+            early_dispatch=self.early_dispatch,
         )
 
+    def _provider_config(self, stage: StageConfig | None) -> ProviderConfig:
+        if stage is None:
+            return ProviderConfig(
+                provider=self.provider, model=self.model, api_key=self.api_key, sdk_client=self.sdk_client
+            )
+        provider = stage.provider or self.provider
+        # Model, key and SDK client only carry over while the stage stays on the default provider.
+        same_provider = provider == self.provider
+        return ProviderConfig(
+            provider=provider,
+            model=stage.model or (self.model if same_provider else None),
+            api_key=stage.api_key or (self.api_key if same_provider else None),
+            sdk_client=stage.sdk_client or (self.sdk_client if same_provider else None),
+            max_tokens=stage.max_tokens or None,
+        )
+
+
+def load_env_file(path: str | None = None) -> bool:
+    """Load `.env` into `os.environ` when python-dotenv is installed.
+
+    Entry points call this explicitly; importing the package never touches the environment.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return False
+    return load_dotenv(path)
+
 
 def build_default_agent() -> AgenticChatbot:
+    tracer = tracer_from_env()
+    if tracer is not None:
+        set_tracer(tracer)
     return ChatbotFactory.from_env().build_agent()
+
+
+def _build_client(config: ProviderConfig):
+    provider = config.provider.strip().lower()
+    if provider == "openai":
+        return OpenAIChatClient(
+            model=config.model or _DEFAULT_MODELS["openai"],
+            api_key=config.api_key,
+            sdk_client=config.sdk_client,
+            max_tokens=config.max_tokens,
+        )
+    if provider == "anthropic":
+        limits = {"max_tokens": config.max_tokens} if config.max_tokens is not None else {}
+        return AnthropicChatClient(
+            model=config.model or _DEFAULT_MODELS["anthropic"],
+            api_key=config.api_key,
+            sdk_client=config.sdk_client,
+            **limits,
+        )
+    if provider == "google":
+        return GoogleChatClient(
+            model=config.model or _DEFAULT_MODELS["google"],
+            api_key=config.api_key,
+            sdk_client=config.sdk_client,
+            max_tokens=config.max_tokens,
+        )
+    raise ValueError(f"Unsupported provider: {config.provider}")
+
+
+def _stage_from_env(prefix: str, default_provider: str) -> StageConfig | None:
+    """Read `<PREFIX>_PROVIDER`, `_MODEL`, `_TEMPERATURE`, `_MAX_TOKENS` and `_CACHE_MAX_TEMPERATURE`.
+
+    Returns None when none is set. `_MAX_TOKENS=none` (or 0) lifts the cap.
+    """
+    provider = os.getenv(f"{prefix}_PROVIDER", "").strip().lower() or None
+    if provider not in _PROVIDERS:
+        provider = None
+    model = os.getenv(f"{prefix}_MODEL") or None
+    temperature = os.getenv(f"{prefix}_TEMPERATURE", "").strip()
+    max_tokens = os.getenv(f"{prefix}_MAX_TOKENS", "").strip().lower()
+    cache_max_temperature = os.getenv(f"{prefix}_CACHE_MAX_TEMPERATURE", "").strip()
+    if provider is None and model is None and not temperature and not max_tokens and not cache_max_temperature:
+        return None
+    api_key = None
+    if provider is not None and provider != default_provider:
+        api_key = os.getenv(_API_KEY_ENV[provider])
+    return StageConfig(
+        provider=provider,  # type: ignore[arg-type]
+        model=model,
+        api_key=api_key,
+        temperature=float(temperature) if temperature else None,
+        max_tokens=(0 if max_tokens == "none" else int(max_tokens)) if max_tokens else None,
+        cache_max_temperature=float(cache_max_temperature) if cache_max_temperature else None,
+    )
+
+
+def _planner_max_tokens(stage: StageConfig) -> int | None:
+    if stage.max_tokens is None:
+        return Planner.max_tokens
+    return stage.max_tokens or None
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "on"}
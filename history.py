@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Protocol
+
+from .llm import LLMClient, acomplete
+from .schemas import ChatMessage, Role
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens locally: `tiktoken` when installed, otherwise a word/character heuristic."""
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    if not text:
+        return 0
+    words = len(re.findall(r"\w+|[^\w\s]", text))
+    return max(1, round(max(words * 1.1, len(text) / 4)))
+
+
+@lru_cache(maxsize=1)
+def _tiktoken_encoding() -> Any | None:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:  # the encoding download can fail offline
+        return None
+
+
+class Summarizer(Protocol):
+    def summarize(self, previous_summary: str, messages: list[ChatMessage]) -> str:
+        ...
+
+
+@dataclass
+class ExtractiveSummarizer:
+    """Free summarizer: keeps the first sentence of each folded message, newest lines last."""
+
+    max_chars_per_message: int = 160
+    max_lines: int = 20
+
+    def summarize(self, previous_summary: str, messages: list[ChatMessage]) -> str:
+        lines = previous_summary.splitlines() if previous_summary else []
+        for msg in messages:
+            text = " ".join(msg.content.split())
+            sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+            if len(sentence) > self.max_chars_per_message:
+                sentence = sentence[: self.max_chars_per_message - 3].rstrip() + "..."
+            if sentence:
+                lines.append(f"{msg.role.value}: {sentence}")
+        return "\n".join(lines[-self.max_lines:])
+
+    async def asummarize(self, previous_summary: str, messages: list[ChatMessage]) -> str:
+        return self.summarize(previous_summary, messages)
+
+
+@dataclass
+class LLMSummarizer:
+    llm: LLMClient
+    max_words: int = 120
+
+    def summarize(self, previous_summary: str, messages: list[ChatMessage]) -> str:
+        return self.llm.complete(self._messages(previous_summary, messages), temperature=0).strip()
+
+    async def asummarize(self, previous_summary: str, messages: list[ChatMessage]) -> str:
+        return (await acomplete(self.llm, self._messages(previous_summary, messages), temperature=0)).strip()
+
+    def _messages(self, previous_summary: str, messages: list[ChatMessage]) -> list[ChatMessage]:
+        transcript = "\n".join(f"{msg.role.value}: {msg.content}" for msg in messages)
+        prompt = (
+            f"Current summary:\n{previous_summary or '(empty)'}\n\n"
+            f"New conversation turns:\n{transcript}\n\n"
+            f"Return the updated summary in at most {self.max_words} words. "
+            "Keep user preferences, constraints and open requests."
+        )
+        return [
+            ChatMessage(role=Role.SYSTEM, content="You maintain a rolling summary of a chat conversation."),
+            ChatMessage(role=Role.USER, content=prompt),
+        ]
+
+
+@dataclass(frozen=True)
+class HistoryBudget:
+    max_tokens: int
+    keep_turns: int
+
+
+@dataclass
+class HistoryManager:
+    """Fits history into a per-call token budget.
+
+    The last `keep_turns` user/assistant pairs are kept verbatim (fewer if they alone
+    exceed the budget); everything older is folded into a rolling summary. Summaries are
+    cached per history prefix, so each turn only summarizes the messages folded since
+    the previous call instead of recomputing from the start. The `a*` methods never block
+    the event loop on the summarizer.
+    """
+
+    planner_budget: HistoryBudget = field(default_factory=lambda: HistoryBudget(max_tokens=400, keep_turns=2))
+    skill_budget: HistoryBudget = field(default_factory=lambda: HistoryBudget(max_tokens=2000, keep_turns=6))
+    summarizer: Summarizer = field(default_factory=ExtractiveSummarizer)
+    count_tokens: Callable[[str], int] = estimate_tokens
+    max_cached_summaries: int = 1024
+    _summaries: OrderedDict[str, str] = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def for_planner(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return self.compact(history, self.planner_budget)
+
+    def for_skill(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return self.compact(history, self.skill_budget)
+
+    async def afor_planner(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return await self.acompact(history, self.planner_budget)
+
+    async def afor_skill(self, history: list[ChatMessage]) -> list[ChatMessage]:
+        return await self.acompact(history, self.skill_budget)
+
+    def compact(self, history: list[ChatMessage], budget: HistoryBudget) -> list[ChatMessage]:
+        split, used = self._split(history, budget)
+        if split == 0:
+            return list(history)
+        return self._assemble(history, split, used, budget, self._summary(history, split))
+
+    async def acompact(self, history: list[ChatMessage], budget: HistoryBudget) -> list[ChatMessage]:
+        split, used = self._split(history, budget)
+        if split == 0:
+            return list(history)
+        return self._assemble(history, split, used, budget, await self._asummary(history, split))
+
+    def _split(self, history: list[ChatMessage], budget: HistoryBudget) -> tuple[int, int]:
+        """Index where the verbatim tail starts, and the tail's token count."""
+        keep = max(0, budget.keep_turns * 2)
+        split = max(0, len(history) - keep)
+        tail_tokens = [self.count_tokens(msg.content) for msg in history[split:]]
+        used = sum(tail_tokens)
+        for tokens in tail_tokens:
+            if used <= budget.max_tokens:
+                break
+            used -= tokens
+            split += 1
+        return split, used
+
+    def _assemble(
+        self, history: list[ChatMessage], split: int, used: int, budget: HistoryBudget, summary: str
+    ) -> list[ChatMessage]:
+        tail = history[split:]
+        remaining = budget.max_tokens - used - self.count_tokens(SUMMARY_PREFIX)
+        summary = self._truncate(summary, remaining)
+        if not summary:
+            return list(tail)
+        return [ChatMessage(role=Role.SYSTEM, content=f"{SUMMARY_PREFIX}{summary}"), *tail]
+
+    def _summary(self, history: list[ChatMessage], split: int) -> str:
+        prefix_keys = _prefix_keys(history, split)
+        start, summary = self._cached_summary(prefix_keys, split)
+        if start == split:
+            return summary
+        summary = self.summarizer.summarize(summary, list(history[start:split]))
+        self._store_summary(prefix_keys[split - 1], summary)
+        return summary
+
+    async def _asummary(self, history: list[ChatMessage], split: int) -> str:
+        prefix_keys = _prefix_keys(history, split)
+        start, summary = self._cached_summary(prefix_keys, split)
+        if start == split:
+            return summary
+        folded = list(history[start:split])
+        native = getattr(self.summarizer, "asummarize", None)
+        if native is not None:
+            summary = await native(summary, folded)
+        else:
+            summary = await asyncio.to_thread(self.summarizer.summarize, summary, folded)
+        self._store_summary(prefix_keys[split - 1], summary)
+        return summary
+
+    def _cached_summary(self, prefix_keys: list[str], split: int) -> tuple[int, str]:
+        """The longest summarized prefix: how many messages it covers, and its summary."""
+        with self._lock:
+            for index in range(split, 0, -1):
+                cached = self._summaries.get(prefix_keys[index - 1])
+                if cached is not None:
+                    self._summaries.move_to_end(prefix_keys[index - 1])
+                    return index, cached
+        return 0, ""
+
+    def _store_summary(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+
+    def _truncate(self, summary: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        # Drop the oldest summary lines first; the newest context matters most.
+        lines = summary.splitlines()
+        while lines and self.count_tokens("\n".join(lines)) > max_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+
+def _prefix_keys(history: list[ChatMessage], count: int) -> list[str]:
+    keys: list[str] = []
+    digest = b""
+    for msg in history[:count]:
+        digest = hashlib.sha1(digest + msg.role.value.encode() + b"\x1f" + msg.content.encode("utf-8")).digest()
+        keys.append(digest.hex())
+    return keys
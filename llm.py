@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any, Protocol
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterator, Protocol
 
-from .schemas import ChatMessage
+from .schemas import ChatMessage, Role
+from .tracing import annotate
+from .transcript import PrefixCache
 
 
 class LLMClient(Protocol):
@@ -11,11 +18,208 @@ class LLMClient(Protocol):
         ...
 
 
+class StreamingLLMClient(Protocol):
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        ...
+
+
+class AsyncLLMClient(Protocol):
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        ...
+
+
+class StructuredLLMClient(Protocol):
+    def complete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        ...
+
+
+class AsyncStreamingLLMClient(Protocol):
+    def astream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> AsyncIterator[str]:
+        ...
+
+
+@dataclass
+class StructuredOutcome:
+    """Whether every structured call inside `track_structured()` used a native JSON mode."""
+
+    native: bool = True
+
+
+_structured_outcome: ContextVar[StructuredOutcome | None] = ContextVar("structured_outcome", default=None)
+
+
+@contextmanager
+def track_structured() -> Iterator[StructuredOutcome]:
+    """Record whether structured calls made in this block fell back to plain text.
+
+    Wrappers such as routers or schedulers always expose `complete_json`, so only the
+    innermost client knows which path a call took; it reports back through this context.
+    """
+    outcome = StructuredOutcome()
+    token = _structured_outcome.set(outcome)
+    try:
+        yield outcome
+    finally:
+        _structured_outcome.reset(token)
+
+
+def mark_text_fallback() -> None:
+    outcome = _structured_outcome.get()
+    if outcome is not None:
+        outcome.native = False
+
+
+async def acomplete(llm: LLMClient, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+    """Await `llm.acomplete` when available, otherwise run `complete` off the event loop."""
+    native = getattr(llm, "acomplete", None)
+    if native is not None:
+        return await native(messages, temperature=temperature)
+    return await asyncio.to_thread(llm.complete, messages, temperature=temperature)
+
+
+def complete_json(
+    llm: LLMClient,
+    messages: list[ChatMessage],
+    *,
+    schema: dict[str, Any],
+    name: str,
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+) -> str:
+    """JSON text from the provider's structured-output mode, or a plain completion without one."""
+    native = getattr(llm, "complete_json", None)
+    if native is not None:
+        return native(messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens)
+    mark_text_fallback()
+    return llm.complete(messages, temperature=temperature)
+
+
+async def acomplete_json(
+    llm: LLMClient,
+    messages: list[ChatMessage],
+    *,
+    schema: dict[str, Any],
+    name: str,
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+) -> str:
+    native = getattr(llm, "acomplete_json", None)
+    if native is not None:
+        return await native(messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens)
+    if getattr(llm, "complete_json", None) is not None:
+        return await asyncio.to_thread(
+            complete_json, llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+        )
+    mark_text_fallback()
+    return await acomplete(llm, messages, temperature=temperature)
+
+
+async def astream_json(
+    llm: LLMClient,
+    messages: list[ChatMessage],
+    *,
+    schema: dict[str, Any],
+    name: str,
+    temperature: float = 0.2,
+    max_tokens: int | None = None,
+) -> AsyncIterator[str]:
+    """Yield JSON text deltas from a streaming structured-output call.
+
+    Falls back to a plain `astream`, and then to one structured completion yielded whole.
+    """
+    native = getattr(llm, "astream_json", None)
+    if native is not None:
+        async for delta in native(messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens):
+            yield delta
+        return
+    plain = getattr(llm, "astream", None)
+    if plain is not None:
+        mark_text_fallback()
+        async for delta in plain(messages, temperature=temperature):
+            yield delta
+        return
+    yield await acomplete_json(llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens)
+
+
+async def astream_completion(
+    llm: LLMClient, messages: list[ChatMessage], *, temperature: float = 0.2
+) -> AsyncIterator[str]:
+    """Yield text deltas from `llm.astream` when available, otherwise the awaited completion at once."""
+    native = getattr(llm, "astream", None)
+    if native is not None:
+        async for delta in native(messages, temperature=temperature):
+            yield delta
+        return
+    yield await acomplete(llm, messages, temperature=temperature)
+
+
+def stream_completion(llm: LLMClient, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+    """Yield text deltas from `llm.stream` when available, otherwise the full completion at once."""
+    native = getattr(llm, "stream", None)
+    if native is not None:
+        yield from native(messages, temperature=temperature)
+    else:
+        yield llm.complete(messages, temperature=temperature)
+
+
+@dataclass
+class CacheUsage:
+    """Input tokens per client, split into those served from the provider's prefix cache and the rest."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    cache_write_tokens: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+
+    @property
+    def uncached_input_tokens(self) -> int:
+        return self.input_tokens - self.cached_input_tokens
+
+    @property
+    def cached_ratio(self) -> float:
+        return self.cached_input_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def record(self, *, input_tokens: int, cached_input_tokens: int = 0, cache_write_tokens: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cached_input_tokens += cached_input_tokens
+            self.cache_write_tokens += cache_write_tokens
+        annotate(
+            input_tokens=input_tokens,
+            cached_input_tokens=cached_input_tokens,
+            cache_write_tokens=cache_write_tokens,
+        )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "uncached_input_tokens": self.uncached_input_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "cached_ratio": self.cached_ratio,
+        }
+
+
 @dataclass
 class OpenAIChatClient:
     model: str
     api_key: str | None = None
     sdk_client: Any | None = None
+    async_sdk_client: Any | None = None
+    max_tokens: int | None = None
+    usage: CacheUsage = field(default_factory=CacheUsage)
+    _payloads: PrefixCache[Any] = field(default_factory=lambda: PrefixCache(_openai_message), init=False, repr=False)
 
     def __post_init__(self) -> None:
         if self.sdk_client is None:
@@ -24,17 +228,114 @@ class OpenAIChatClient:
             self.sdk_client = OpenAI(api_key=self.api_key)
 
     def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
-        payload = [{"role": msg.role.value, "content": msg.content}
-                   for msg in messages]
+        response = self.sdk_client.chat.completions.create(**self._request(messages, temperature))
+        _record_openai_usage(self.usage, response)
+        return _openai_content(response)
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        chunks = self.sdk_client.chat.completions.create(
+            **self._request(messages, temperature),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        for chunk in chunks:
+            _record_openai_usage(self.usage, chunk)
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        response = await self._async_client().chat.completions.create(**self._request(messages, temperature))
+        _record_openai_usage(self.usage, response)
+        return _openai_content(response)
+
+    async def astream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> AsyncIterator[str]:
+        chunks = await self._async_client().chat.completions.create(
+            **self._request(messages, temperature),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in chunks:
+            _record_openai_usage(self.usage, chunk)
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+    def complete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
         response = self.sdk_client.chat.completions.create(
-            model=self.model,
-            messages=payload,
-            temperature=temperature,
+            **self._request(messages, temperature, max_tokens), response_format=_openai_response_format(schema, name)
+        )
+        _record_openai_usage(self.usage, response)
+        return _openai_content(response)
+
+    async def acomplete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        response = await self._async_client().chat.completions.create(
+            **self._request(messages, temperature, max_tokens), response_format=_openai_response_format(schema, name)
         )
-        content = response.choices[0].message.content
-        if not content:
-            raise ValueError("OpenAI response returned empty content")
-        return content
+        _record_openai_usage(self.usage, response)
+        return _openai_content(response)
+
+    async def astream_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        chunks = await self._async_client().chat.completions.create(
+            **self._request(messages, temperature, max_tokens),
+            response_format=_openai_response_format(schema, name),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        async for chunk in chunks:
+            _record_openai_usage(self.usage, chunk)
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+    def _async_client(self) -> Any:
+        if self.async_sdk_client is None:
+            from openai import AsyncOpenAI
+
+            self.async_sdk_client = AsyncOpenAI(api_key=self.api_key)
+        return self.async_sdk_client
+
+    def _request(self, messages: list[ChatMessage], temperature: float, max_tokens: int | None = None) -> dict[str, Any]:
+        # OpenAI caches prompt prefixes automatically; keeping the message order stable is all it needs.
+        request: dict[str, Any] = {
+            "model": self.model,
+            "messages": self._payloads.items(messages),
+            "temperature": temperature,
+        }
+        limit = _min_tokens(self.max_tokens, max_tokens)
+        if limit is not None:
+            request["max_completion_tokens"] = limit
+        return request
 
 
 @dataclass
@@ -43,6 +344,9 @@ class AnthropicChatClient:
     api_key: str | None = None
     sdk_client: Any | None = None
     max_tokens: int = 512
+    async_sdk_client: Any | None = None
+    usage: CacheUsage = field(default_factory=CacheUsage)
+    _payloads: PrefixCache[Any] = field(default_factory=lambda: PrefixCache(_anthropic_block), init=False, repr=False)
 
     def __post_init__(self) -> None:
         if self.sdk_client is None:
@@ -51,24 +355,118 @@ class AnthropicChatClient:
             self.sdk_client = Anthropic(api_key=self.api_key)
 
     def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
-        system_parts = [msg.content for msg in messages if msg.role.value == "system"]
-        convo_parts = [f"{msg.role.value}: {msg.content}" for msg in messages if msg.role.value != "system"]
-        response = self.sdk_client.messages.create(
-            model=self.model,
-            max_tokens=self.max_tokens,
-            temperature=temperature,
-            system="\n".join(system_parts) if system_parts else None,
-            messages=[{"role": "user", "content": "\n".join(convo_parts)}],
-        )
-        text_chunks: list[str] = []
-        for chunk in response.content:
-            text = getattr(chunk, "text", None)
+        response = self.sdk_client.messages.create(**self._request(messages, temperature))
+        _record_anthropic_usage(self.usage, response)
+        return _anthropic_content(response)
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        events = self.sdk_client.messages.create(**self._request(messages, temperature), stream=True)
+        for event in events:
+            if getattr(event, "type", None) == "message_start":
+                _record_anthropic_usage(self.usage, event.message)
+                continue
+            if getattr(event, "type", None) != "content_block_delta":
+                continue
+            text = getattr(event.delta, "text", None)
             if text:
-                text_chunks.append(text)
-        content = "".join(text_chunks).strip()
-        if not content:
-            raise ValueError("Anthropic response returned empty content")
-        return content
+                yield text
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        response = await self._async_client().messages.create(**self._request(messages, temperature))
+        _record_anthropic_usage(self.usage, response)
+        return _anthropic_content(response)
+
+    async def astream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> AsyncIterator[str]:
+        events = await self._async_client().messages.create(**self._request(messages, temperature), stream=True)
+        async for event in events:
+            if getattr(event, "type", None) == "message_start":
+                _record_anthropic_usage(self.usage, event.message)
+                continue
+            if getattr(event, "type", None) != "content_block_delta":
+                continue
+            text = getattr(event.delta, "text", None)
+            if text:
+                yield text
+
+    def complete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        response = self.sdk_client.messages.create(**self._json_request(messages, schema, name, temperature, max_tokens))
+        _record_anthropic_usage(self.usage, response)
+        return _anthropic_tool_input(response, name)
+
+    async def acomplete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        response = await self._async_client().messages.create(
+            **self._json_request(messages, schema, name, temperature, max_tokens)
+        )
+        _record_anthropic_usage(self.usage, response)
+        return _anthropic_tool_input(response, name)
+
+    async def astream_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        events = await self._async_client().messages.create(
+            **self._json_request(messages, schema, name, temperature, max_tokens), stream=True
+        )
+        async for event in events:
+            if getattr(event, "type", None) == "message_start":
+                _record_anthropic_usage(self.usage, event.message)
+                continue
+            if getattr(event, "type", None) != "content_block_delta":
+                continue
+            # Tool input arrives as `input_json_delta` fragments.
+            text = getattr(event.delta, "partial_json", None) or getattr(event.delta, "text", None)
+            if text:
+                yield text
+
+    def _async_client(self) -> Any:
+        if self.async_sdk_client is None:
+            from anthropic import AsyncAnthropic
+
+            self.async_sdk_client = AsyncAnthropic(api_key=self.api_key)
+        return self.async_sdk_client
+
+    def _json_request(
+        self, messages: list[ChatMessage], schema: dict[str, Any], name: str, temperature: float, max_tokens: int | None
+    ) -> dict[str, Any]:
+        # Anthropic has no JSON mode; forcing a single tool call gets schema-shaped input instead.
+        return {
+            **self._request(messages, temperature, max_tokens),
+            "tools": [{"name": name, "description": f"Record the {name}.", "input_schema": schema}],
+            "tool_choice": {"type": "tool", "name": name},
+        }
+
+    def _request(self, messages: list[ChatMessage], temperature: float, max_tokens: int | None = None) -> dict[str, Any]:
+        system, turns = _anthropic_messages(self._payloads.items(messages))
+        request: dict[str, Any] = {
+            "model": self.model,
+            "max_tokens": _min_tokens(self.max_tokens, max_tokens),
+            "temperature": temperature,
+            "messages": turns,
+        }
+        if system:
+            request["system"] = system
+        return request
 
 
 @dataclass
@@ -76,6 +474,9 @@ class GoogleChatClient:
     model: str
     api_key: str | None = None
     sdk_client: Any | None = None
+    max_tokens: int | None = None
+    usage: CacheUsage = field(default_factory=CacheUsage)
+    _payloads: PrefixCache[Any] = field(default_factory=lambda: PrefixCache(_google_line), init=False, repr=False)
 
     def __post_init__(self) -> None:
         if self.sdk_client is None:
@@ -85,16 +486,263 @@ class GoogleChatClient:
             self.sdk_client = genai.GenerativeModel(self.model)
 
     def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
-        prompt = "\n".join(f"{msg.role.value}: {msg.content}" for msg in messages)
         response = self.sdk_client.generate_content(
-            prompt,
-            generation_config={"temperature": temperature},
-        )
-        content = getattr(response, "text", None)
-        if content is None and getattr(response, "candidates", None):
-            parts = response.candidates[0].content.parts
-            content = "".join(getattr(part, "text", "") for part in parts)
-        content = (content or "").strip()
-        if not content:
-            raise ValueError("Google response returned empty content")
-        return content
+            self._prompt(messages),
+            generation_config=self._generation_config(temperature),
+        )
+        _record_google_usage(self.usage, response)
+        return _google_content(response)
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        chunks = self.sdk_client.generate_content(
+            self._prompt(messages),
+            generation_config=self._generation_config(temperature),
+            stream=True,
+        )
+        last_chunk = None
+        for chunk in chunks:
+            last_chunk = chunk
+            text = _google_text(chunk)
+            if text:
+                yield text
+        if last_chunk is not None:
+            # Usage metadata is cumulative, so the final chunk carries the whole call.
+            _record_google_usage(self.usage, last_chunk)
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        response = await self.sdk_client.generate_content_async(
+            self._prompt(messages),
+            generation_config=self._generation_config(temperature),
+        )
+        _record_google_usage(self.usage, response)
+        return _google_content(response)
+
+    async def astream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> AsyncIterator[str]:
+        chunks = await self.sdk_client.generate_content_async(
+            self._prompt(messages),
+            generation_config=self._generation_config(temperature),
+            stream=True,
+        )
+        last_chunk = None
+        async for chunk in chunks:
+            last_chunk = chunk
+            text = _google_text(chunk)
+            if text:
+                yield text
+        if last_chunk is not None:
+            _record_google_usage(self.usage, last_chunk)
+
+    def complete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        response = self.sdk_client.generate_content(
+            self._prompt(messages),
+            generation_config=self._generation_config(temperature, max_tokens, json_mode=True),
+        )
+        _record_google_usage(self.usage, response)
+        return _google_content(response)
+
+    async def acomplete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        response = await self.sdk_client.generate_content_async(
+            self._prompt(messages),
+            generation_config=self._generation_config(temperature, max_tokens, json_mode=True),
+        )
+        _record_google_usage(self.usage, response)
+        return _google_content(response)
+
+    async def astream_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        chunks = await self.sdk_client.generate_content_async(
+            self._prompt(messages),
+            generation_config=self._generation_config(temperature, max_tokens, json_mode=True),
+            stream=True,
+        )
+        last_chunk = None
+        async for chunk in chunks:
+            last_chunk = chunk
+            text = _google_text(chunk)
+            if text:
+                yield text
+        if last_chunk is not None:
+            _record_google_usage(self.usage, last_chunk)
+
+    def _prompt(self, messages: list[ChatMessage]) -> str:
+        return "\n".join(self._payloads.items(messages))
+
+    def _generation_config(
+        self, temperature: float, max_tokens: int | None = None, *, json_mode: bool = False
+    ) -> dict[str, Any]:
+        config: dict[str, Any] = {"temperature": temperature}
+        limit = _min_tokens(self.max_tokens, max_tokens)
+        if limit is not None:
+            config["max_output_tokens"] = limit
+        if json_mode:
+            # Gemini's response_schema only takes an OpenAPI subset, so just request JSON and let the prompt shape it.
+            config["response_mime_type"] = "application/json"
+        return config
+
+
+def _anthropic_messages(
+    blocks: list[tuple[Role, dict[str, Any]]]
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Split into system blocks and alternating turns, with cache breakpoints on the stable prefix.
+
+    Leading system messages become system blocks; the first one (the static prompt) is a
+    cache breakpoint. So is the last block before the newest turn, which lets the next
+    call reuse the cached system prompt plus history. System messages after the first
+    turn have no place in the Messages API and are sent as user text.
+
+    `blocks` come from the client's prefix cache and are shared between calls, so they
+    are copied before being marked.
+    """
+    index = 0
+    system: list[dict[str, Any]] = []
+    while index < len(blocks) and blocks[index][0] == Role.SYSTEM:
+        if blocks[index][1]["text"]:
+            system.append(blocks[index][1])
+        index += 1
+
+    turns: list[dict[str, Any]] = []
+    for msg_role, block in blocks[index:]:
+        if not block["text"]:
+            continue
+        role = "assistant" if msg_role == Role.ASSISTANT else "user"
+        if msg_role == Role.SYSTEM:
+            block = {"type": "text", "text": f"{msg_role.value}: {block['text']}"}
+        if turns and turns[-1]["role"] == role:
+            turns[-1]["content"].append(block)
+        else:
+            turns.append({"role": role, "content": [block]})
+    if turns and turns[0]["role"] != "user":
+        turns.insert(0, {"role": "user", "content": [{"type": "text", "text": "(conversation continues)"}]})
+
+    if system:
+        system[0] = {**system[0], "cache_control": {"type": "ephemeral"}}
+    if len(turns) >= 2:
+        content = turns[-2]["content"]
+        content[-1] = {**content[-1], "cache_control": {"type": "ephemeral"}}
+    return system, turns
+
+
+def _anthropic_block(role: Role, content: str) -> tuple[Role, dict[str, Any]]:
+    return role, {"type": "text", "text": content}
+
+
+def _min_tokens(*limits: int | None) -> int | None:
+    present = [limit for limit in limits if limit is not None]
+    return min(present) if present else None
+
+
+def _openai_response_format(schema: dict[str, Any], name: str) -> dict[str, Any]:
+    # Not strict: free-form objects such as plan params are not allowed in strict schemas.
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": False}}
+
+
+def _anthropic_tool_input(response: Any, name: str) -> str:
+    for block in response.content:
+        if getattr(block, "type", None) == "tool_use" and getattr(block, "name", name) == name:
+            return json.dumps(block.input)
+    return _anthropic_content(response)
+
+
+def _google_text(response: Any) -> str:
+    """Text of a Google response or stream chunk; empty for safety or finish-only chunks."""
+    try:
+        text = getattr(response, "text", None)
+    except ValueError:
+        # The SDK's `.text` accessor raises when a candidate has no text parts.
+        text = None
+    if text is None and getattr(response, "candidates", None):
+        parts = getattr(getattr(response.candidates[0], "content", None), "parts", None) or []
+        text = "".join(getattr(part, "text", "") or "" for part in parts)
+    return text or ""
+
+
+def _record_openai_usage(usage: CacheUsage, response: Any) -> None:
+    reported = getattr(response, "usage", None)
+    if reported is None:
+        return
+    details = getattr(reported, "prompt_tokens_details", None)
+    usage.record(
+        input_tokens=getattr(reported, "prompt_tokens", 0) or 0,
+        cached_input_tokens=getattr(details, "cached_tokens", 0) or 0,
+    )
+
+
+def _record_anthropic_usage(usage: CacheUsage, response: Any) -> None:
+    reported = getattr(response, "usage", None)
+    if reported is None:
+        return
+    # Anthropic reports cache reads and writes separately from `input_tokens`.
+    cached = getattr(reported, "cache_read_input_tokens", 0) or 0
+    written = getattr(reported, "cache_creation_input_tokens", 0) or 0
+    usage.record(
+        input_tokens=(getattr(reported, "input_tokens", 0) or 0) + cached + written,
+        cached_input_tokens=cached,
+        cache_write_tokens=written,
+    )
+
+
+def _record_google_usage(usage: CacheUsage, response: Any) -> None:
+    reported = getattr(response, "usage_metadata", None)
+    if reported is None:
+        return
+    usage.record(
+        input_tokens=getattr(reported, "prompt_token_count", 0) or 0,
+        cached_input_tokens=getattr(reported, "cached_content_token_count", 0) or 0,
+    )
+
+
+def _openai_message(role: Role, content: str) -> dict[str, str]:
+    return {"role": role.value, "content": content}
+
+
+def _openai_content(response: Any) -> str:
+    content = response.choices[0].message.content
+    if not content:
+        raise ValueError("OpenAI response returned empty content")
+    return content
+
+
+def _anthropic_content(response: Any) -> str:
+    text_chunks: list[str] = []
+    for chunk in response.content:
+        text = getattr(chunk, "text", None)
+        if text:
+            text_chunks.append(text)
+    content = "".join(text_chunks).strip()
+    if not content:
+        raise ValueError("Anthropic response returned empty content")
+    return content
+
+
+def _google_line(role: Role, content: str) -> str:
+    return f"{role.value}: {content}"
+
+
+def _google_content(response: Any) -> str:
+    content = _google_text(response).strip()
+    if not content:
+        raise ValueError("Google response returned empty content")
+    return content
@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+
+from .llm import (
+    LLMClient,
+    acomplete,
+    acomplete_json,
+    astream_completion,
+    astream_json,
+    complete_json,
+    stream_completion,
+)
+from .schemas import ChatMessage
+from .tracing import annotate
+
+
+@dataclass
+class ProviderHealth:
+    """Rolling latency and error profile of one provider over its last `window` calls."""
+
+    window: int = 50
+    max_consecutive_failures: int = 3
+    cooldown_seconds: float = 30.0
+    calls: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    cooldown_until: float = 0.0
+    _latencies: deque[float] = field(init=False, repr=False)
+    _outcomes: deque[bool] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._latencies = deque(maxlen=self.window)
+        self._outcomes = deque(maxlen=self.window)
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok in self._outcomes if not ok) / len(self._outcomes)
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    def percentile(self, pct: float) -> float | None:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def record_success(self, latency: float) -> None:
+        self.calls += 1
+        self.consecutive_failures = 0
+        self._latencies.append(latency)
+        self._outcomes.append(True)
+
+    def record_latency(self, latency: float) -> None:
+        """Latency lower bound for an abandoned call (e.g. the loser of a hedge)."""
+        self._latencies.append(latency)
+
+    def record_failure(self, now: float) -> None:
+        self.calls += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self._outcomes.append(False)
+        if self.consecutive_failures >= self.max_consecutive_failures:
+            self.cooldown_until = now + self.cooldown_seconds
+
+    def snapshot(self, now: float) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "error_rate": self.error_rate,
+            "p50_seconds": self.percentile(50),
+            "p95_seconds": self.percentile(95),
+            "healthy": self.healthy(now),
+        }
+
+
+@dataclass
+class LLMRouterStats:
+    failovers: int = 0
+    timeouts: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return {
+            "failovers": self.failovers,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+@dataclass
+class LLMRouter:
+    """`LLMClient` that spreads calls over several providers.
+
+    Calls go to the healthy provider with the best observed latency (penalised by its
+    error rate); providers without samples are tried first so every one gets measured.
+    On an error or after `timeout_seconds` the next provider is tried. With `hedge`, a
+    second provider is started once the first runs past its own p95 latency and the
+    first answer wins. Providers that fail `max_consecutive_failures` times in a row sit
+    out for `cooldown_seconds`, but are still used as a last resort.
+    """
+
+    providers: dict[str, LLMClient]
+    timeout_seconds: float | None = 30.0
+    hedge: bool = False
+    hedge_min_samples: int = 20
+    window: int = 50
+    max_consecutive_failures: int = 3
+    cooldown_seconds: float = 30.0
+    clock: Callable[[], float] = time.monotonic
+    stats: LLMRouterStats = field(default_factory=LLMRouterStats)
+    provider: str = field(default="router", init=False)
+    model: str | None = field(default=None, init=False)
+    _health: dict[str, ProviderHealth] = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self.providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self._health = {
+            name: ProviderHealth(
+                window=self.window,
+                max_consecutive_failures=self.max_consecutive_failures,
+                cooldown_seconds=self.cooldown_seconds,
+            )
+            for name in self.providers
+        }
+
+    def health(self, name: str) -> ProviderHealth:
+        return self._health[name]
+
+    def snapshot(self) -> dict[str, Any]:
+        now = self.clock()
+        with self._lock:
+            return {
+                **self.stats.snapshot(),
+                "providers": {name: health.snapshot(now) for name, health in self._health.items()},
+            }
+
+    def ranked(self) -> list[str]:
+        """Provider names in the order they would be tried right now."""
+        now = self.clock()
+        with self._lock:
+            scores = {name: self._score(health, now) for name, health in self._health.items()}
+        order = {name: index for index, name in enumerate(self.providers)}
+        return sorted(self.providers, key=lambda name: (*scores[name], order[name]))
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        return self._route(lambda client: client.complete(messages, temperature=temperature))
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        return await self._aroute(lambda client: acomplete(client, messages, temperature=temperature))
+
+    def complete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        return self._route(
+            lambda client: complete_json(
+                client, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+            )
+        )
+
+    async def acomplete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        return await self._aroute(
+            lambda client: acomplete_json(
+                client, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+            )
+        )
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        """Stream from the best provider; fails over only if nothing has been yielded yet."""
+        errors: list[str] = []
+        for index, name in enumerate(self.ranked()):
+            if index:
+                self.stats.failovers += 1
+            started = self.clock()
+            yielded = False
+            try:
+                for delta in stream_completion(self.providers[name], messages, temperature=temperature):
+                    yielded = True
+                    yield delta
+            except Exception as exc:
+                self._record_failure(name)
+                if yielded:
+                    raise
+                errors.append(f"{name}: {type(exc).__name__}: {exc}")
+                continue
+            self._record_success(name, self.clock() - started)
+            return
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    async def astream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> AsyncIterator[str]:
+        errors: list[str] = []
+        for index, name in enumerate(self.ranked()):
+            if index:
+                self.stats.failovers += 1
+            started = self.clock()
+            yielded = False
+            try:
+                async for delta in astream_completion(self.providers[name], messages, temperature=temperature):
+                    yielded = True
+                    yield delta
+            except Exception as exc:
+                self._record_failure(name)
+                if yielded:
+                    raise
+                errors.append(f"{name}: {type(exc).__name__}: {exc}")
+                continue
+            self._record_success(name, self.clock() - started)
+            return
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    async def astream_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        errors: list[str] = []
+        for index, provider in enumerate(self.ranked()):
+            if index:
+                self.stats.failovers += 1
+            started = self.clock()
+            yielded = False
+            try:
+                async for delta in astream_json(
+                    self.providers[provider],
+                    messages,
+                    schema=schema,
+                    name=name,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                ):
+                    yielded = True
+                    yield delta
+            except Exception as exc:
+                self._record_failure(provider)
+                if yielded:
+                    raise
+                errors.append(f"{provider}: {type(exc).__name__}: {exc}")
+                continue
+            self._record_success(provider, self.clock() - started)
+            return
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    def close(self) -> None:
+        """Kept for callers that manage the router's lifetime; sync calls own no shared pool."""
+
+    def _route(self, call: Callable[[LLMClient], str]) -> str:
+        order = self.ranked()
+        pending: dict[Future[str], tuple[str, float]] = {}
+        errors: list[str] = []
+        launched = 0
+        hedged = False
+
+        def launch() -> None:
+            nonlocal launched
+            name = order[launched]
+            launched += 1
+            future, started = self._spawn(call, self.providers[name])
+            pending[future] = (name, started)
+
+        launch()
+        while pending:
+            wait_for = self._wait_seconds(pending.values(), hedge_ready=not hedged and launched < len(order))
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, started = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as exc:
+                    self._record_failure(name)
+                    errors.append(f"{name}: {type(exc).__name__}: {exc}")
+                    continue
+                self._record_success(name, self.clock() - started)
+                self._finish(name, order, hedged, pending)
+                return text
+            self._expire(pending, errors, lambda future: future.cancel())
+            if not pending and launched < len(order):
+                self.stats.failovers += 1
+                launch()
+            elif not done and pending and self._hedge_due(pending.values()) and not hedged and launched < len(order):
+                self.stats.hedges += 1
+                hedged = True
+                launch()
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    async def _aroute(self, call: Callable[[LLMClient], Awaitable[str]]) -> str:
+        order = self.ranked()
+        pending: dict[asyncio.Task[str], tuple[str, float]] = {}
+        errors: list[str] = []
+        launched = 0
+        hedged = False
+
+        def launch() -> None:
+            nonlocal launched
+            name = order[launched]
+            launched += 1
+            started = self.clock()
+            task = asyncio.ensure_future(call(self.providers[name]))
+            pending[task] = (name, started)
+
+        launch()
+        try:
+            while pending:
+                wait_for = self._wait_seconds(pending.values(), hedge_ready=not hedged and launched < len(order))
+                done, _ = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, started = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except Exception as exc:
+                        self._record_failure(name)
+                        errors.append(f"{name}: {type(exc).__name__}: {exc}")
+                        continue
+                    self._record_success(name, self.clock() - started)
+                    self._finish(name, order, hedged, pending)
+                    return text
+                self._expire(pending, errors, lambda task: task.cancel())
+                if not pending and launched < len(order):
+                    self.stats.failovers += 1
+                    launch()
+                elif not done and pending and self._hedge_due(pending.values()) and not hedged and launched < len(order):
+                    self.stats.hedges += 1
+                    hedged = True
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise RuntimeError(f"All LLM providers failed: {'; '.join(errors)}")
+
+    def _score(self, health: ProviderHealth, now: float) -> tuple[bool, float]:
+        if not health.healthy(now):
+            return True, 0.0
+        p50 = health.percentile(50)
+        if p50 is None:
+            # Unmeasured providers go first; a failure-only profile goes last among the healthy.
+            return False, 0.0 if health.calls == 0 else math.inf
+        return False, p50 / max(0.05, 1.0 - health.error_rate)
+
+    def _wait_seconds(self, pending: Any, *, hedge_ready: bool) -> float | None:
+        now = self.clock()
+        limits: list[float] = []
+        for name, started in pending:
+            if self.timeout_seconds is not None:
+                limits.append(started + self.timeout_seconds - now)
+            if hedge_ready and self.hedge and (delay := self._hedge_delay(name)) is not None:
+                limits.append(started + delay - now)
+        return max(0.0, min(limits)) if limits else None
+
+    def _hedge_delay(self, name: str) -> float | None:
+        with self._lock:
+            health = self._health[name]
+            if health.samples < self.hedge_min_samples:
+                return None
+            return health.percentile(95)
+
+    def _hedge_due(self, pending: Any) -> bool:
+        if not self.hedge:
+            return False
+        now = self.clock()
+        for name, started in pending:
+            delay = self._hedge_delay(name)
+            if delay is not None and now - started >= delay:
+                return True
+        return False
+
+    def _expire(self, pending: dict[Any, tuple[str, float]], errors: list[str], cancel: Callable[[Any], Any]) -> None:
+        if self.timeout_seconds is None:
+            return
+        now = self.clock()
+        for handle, (name, started) in list(pending.items()):
+            if now - started >= self.timeout_seconds:
+                del pending[handle]
+                cancel(handle)
+                self.stats.timeouts += 1
+                self._record_failure(name)
+                errors.append(f"{name}: timed out after {self.timeout_seconds}s")
+
+    def _finish(self, name: str, order: list[str], hedged: bool, losers: dict[Any, tuple[str, float]]) -> None:
+        if hedged and name != order[0]:
+            self.stats.hedge_wins += 1
+        now = self.clock()
+        with self._lock:
+            for handle, (loser, started) in losers.items():
+                handle.cancel()
+                self._health[loser].record_latency(now - started)
+        losers.clear()
+        annotate(routed_provider=name)
+
+    def _record_success(self, name: str, latency: float) -> None:
+        with self._lock:
+            self._health[name].record_success(latency)
+
+    def _record_failure(self, name: str) -> None:
+        with self._lock:
+            self._health[name].record_failure(self.clock())
+
+    def _spawn(self, call: Callable[[LLMClient], str], client: LLMClient) -> tuple[Future[str], float]:
+        """Run one provider call on its own daemon thread and return it with its start time.
+
+        A blocking SDK call cannot be cancelled, so a call abandoned after a timeout keeps
+        its thread until the SDK gives up. With a thread per call such stragglers never
+        hold up new calls, and the timeout clock starts when the call actually runs.
+        """
+        future: Future[str] = Future()
+        started: list[float] = []
+        running = threading.Event()
+        # The caller's context carries the active span and structured-output tracking.
+        context = contextvars.copy_context()
+
+        def run() -> None:
+            started.append(self.clock())
+            running.set()
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(context.run(call, client))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=run, name="llm-router", daemon=True).start()
+        running.wait()
+        return future, started[0]
@@ -1,157 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import http.client
 import json
+import ssl
+import threading
+import time
 import urllib.error
+import urllib.parse
 import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
-from typing import Any, Protocol
-
-import asyncio
-from typing import Optional
-from contextlib import AsyncExitStack
-
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-
-from anthropic import Anthropic
-from dotenv import load_dotenv
-
-load_dotenv()  # load environment variables from .env
-
-
-# Why use MCP
-# Don't bloat the agent with tool-specific logic and intermediary steps- keep it focused on reasoning and decision-making
-# Decouple tool execution from agent reasoning - allows for more flexible and powerful tool interactions
-# Support more complex tool interactions, like multi-step calls, conditional logic based on tool results, and dynamic tool discovery
-
-class MCPClient:
-    def __init__(self):
-        # Initialize session and client objects
-        self.session: Optional[ClientSession] = None
-        self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
-    # methods will go here
-
-    async def process_query(self, query: str) -> str:
-        """Process a query using Claude and available tools"""
-        messages = [
-            {
-                "role": "user",
-                "content": query
-            }
-        ]
-
-        response = await self.session.list_tools()
-        available_tools = [{
-            "name": tool.name,
-            "description": tool.description,
-            "input_schema": tool.inputSchema
-        } for tool in response.tools]
-
-        # Initial Claude API call
-        response = self.anthropic.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1000,
-            messages=messages,
-            tools=available_tools
-        )
-
-        # Process response and handle tool calls
-        final_text = []
-
-        assistant_message_content = []
-        for content in response.content:
-            if content.type == 'text':
-                final_text.append(content.text)
-                assistant_message_content.append(content)
-            elif content.type == 'tool_use':
-                tool_name = content.name
-                tool_args = content.input
-
-                # Execute tool call
-                result = await self.session.call_tool(tool_name, tool_args)
-                final_text.append(
-                    f"[Calling tool {tool_name} with args {tool_args}]")
-
-                assistant_message_content.append(content)
-                messages.append({
-                    "role": "assistant",
-                    "content": assistant_message_content
-                })
-                messages.append({
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content.id,
-                            "content": result.content
-                        }
-                    ]
-                })
-
-                # Get next response from Claude
-                response = self.anthropic.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=1000,
-                    messages=messages,
-                    tools=available_tools
-                )
-
-                final_text.append(response.content[0].text)
-
-        return "\n".join(final_text)
-
-    async def connect_to_server(self, server_script_path: str):
-        """Connect to an MCP server
-
-        Args:
-            server_script_path: Path to the server script (.py or .js)
-        """
-        is_python = server_script_path.endswith('.py')
-        is_js = server_script_path.endswith('.js')
-        if not (is_python or is_js):
-            raise ValueError("Server script must be a .py or .js file")
-
-        command = "python" if is_python else "node"
-        server_params = StdioServerParameters(
-            command=command,
-            args=[server_script_path],
-            env=None
-        )
-
-        stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
-
-        await self.session.initialize()
-
-        # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
-        print("\nConnected to server with tools:",
-              [tool.name for tool in tools])
-
-    async def chat_loop(self):
-        """Run an interactive chat loop"""
-        print("\nMCP Client Started!")
-        print("Type your queries or 'quit' to exit.")
-
-        while True:
-            try:
-                query = input("\nQuery: ").strip()
-
-                if query.lower() == 'quit':
-                    break
-
-                response = await self.process_query(query)
-                print("\n" + response)
-
-            except Exception as e:
-                print(f"\nError: {str(e)}")
+from typing import Any, Awaitable, Callable, Protocol
 
-    async def cleanup(self):
-        """Clean up resources"""
-        await self.exit_stack.aclose()
+from .cache import TTLCache
+from .singleflight import SingleFlight, canonical_json
+from .tracing import annotate, span
 
 
 class HTTPTransport(Protocol):
@@ -159,6 +25,11 @@ class HTTPTransport(Protocol):
         ...
 
 
+class AsyncHTTPTransport(Protocol):
+    async def apost_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        ...
+
+
 @dataclass(frozen=True)
 class UrllibHTTPTransport:
     def post_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
@@ -178,32 +49,287 @@ class UrllibHTTPTransport:
         except urllib.error.URLError as exc:
             raise ValueError(f"MCP network error: {exc.reason}") from exc
 
+        return _decode_json_object(raw)
+
+    async def apost_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        return await asyncio.to_thread(self.post_json, url, payload, timeout=timeout)
+
+
+@dataclass
+class HttpxHTTPTransport:
+    """Non-blocking transport backed by `httpx`; clients are created lazily and reused."""
+
+    client: Any | None = None
+    async_client: Any | None = None
+
+    def post_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        import httpx
+
+        if self.client is None:
+            self.client = httpx.Client()
+        try:
+            response = self.client.post(url, json=payload, timeout=timeout)
+        except httpx.TransportError as exc:
+            raise ValueError(f"MCP network error: {exc}") from exc
+        return _decode_httpx_response(response)
+
+    async def apost_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        import httpx
+
+        if self.async_client is None:
+            self.async_client = httpx.AsyncClient()
         try:
-            parsed = json.loads(raw)
-        except json.JSONDecodeError as exc:
-            raise ValueError("MCP response was not valid JSON") from exc
-        if not isinstance(parsed, dict):
-            raise ValueError("MCP response must be a JSON object")
-        return parsed
+            response = await self.async_client.post(url, json=payload, timeout=timeout)
+        except httpx.TransportError as exc:
+            raise ValueError(f"MCP network error: {exc}") from exc
+        return _decode_httpx_response(response)
+
+
+@dataclass
+class PoolStats:
+    connections_created: int = 0
+    connections_reused: int = 0
+    connections_discarded: int = 0
+    requests: int = 0
+    retries: int = 0
+    waits: int = 0
+    wait_seconds: float = 0.0
+
+    @property
+    def reuse_ratio(self) -> float:
+        opened = self.connections_created + self.connections_reused
+        return self.connections_reused / opened if opened else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "connections_discarded": self.connections_discarded,
+            "requests": self.requests,
+            "retries": self.retries,
+            "waits": self.waits,
+            "wait_seconds": self.wait_seconds,
+            "reuse_ratio": self.reuse_ratio,
+        }
+
+
+@dataclass
+class _HostPool:
+    slots: threading.BoundedSemaphore
+    idle: deque[tuple[http.client.HTTPConnection, float]] = field(default_factory=deque)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+@dataclass
+class PooledHTTPTransport:
+    """Keep-alive transport with a bounded connection pool per `scheme://host:port`.
+
+    With `http2=True` requests go through `httpx` (requires the `h2` extra), which
+    multiplexes over its own pool; `max_connections_per_host` then caps the total.
+    """
+
+    max_connections_per_host: int = 10
+    idle_timeout_seconds: float = 60.0
+    acquire_timeout_seconds: float | None = None
+    http2: bool = False
+    ssl_context: ssl.SSLContext | None = None
+    stats: PoolStats = field(default_factory=PoolStats)
+    _pools: dict[tuple[str, str, int], _HostPool] = field(default_factory=dict, init=False, repr=False)
+    _pools_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _http2_client: Any | None = field(default=None, init=False, repr=False)
+    _stats_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def post_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        if self.http2:
+            return self._post_http2(url, payload, timeout=timeout)
+
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in {"http", "https"} or not parsed.hostname:
+            raise ValueError(f"Unsupported MCP URL: {url}")
+        key = (parsed.scheme, parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        body = json.dumps(payload).encode("utf-8")
+
+        pool = self._pool(key)
+        self._acquire_slot(pool, timeout)
+        try:
+            self._count(requests=1)
+            status, raw = self._request(pool, key, path, body, timeout)
+        finally:
+            pool.slots.release()
+
+        if status >= 400:
+            raise ValueError(f"MCP HTTP {status}: {raw}")
+        return _decode_json_object(raw)
+
+    async def apost_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        return await asyncio.to_thread(self.post_json, url, payload, timeout=timeout)
+
+    def pool_sizes(self) -> dict[str, int]:
+        """Idle connections currently held per host."""
+        with self._pools_lock:
+            return {f"{scheme}://{host}:{port}": len(pool.idle) for (scheme, host, port), pool in self._pools.items()}
+
+    def close(self) -> None:
+        with self._pools_lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            with pool.lock:
+                while pool.idle:
+                    pool.idle.popleft()[0].close()
+        if self._http2_client is not None:
+            self._http2_client.close()
+            self._http2_client = None
+
+    def _request(
+        self, pool: _HostPool, key: tuple[str, str, int], path: str, body: bytes, timeout: float
+    ) -> tuple[int, str]:
+        connection, reused = self._checkout(pool, key, timeout)
+        try:
+            connection.request(
+                "POST",
+                path,
+                body=body,
+                headers={"Content-Type": "application/json", "Connection": "keep-alive"},
+            )
+            response = connection.getresponse()
+            raw = response.read().decode("utf-8", errors="replace")
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as exc:
+            connection.close()
+            self._count(connections_discarded=1)
+            if not reused:
+                raise ValueError(f"MCP network error: {exc}") from exc
+            # The server closed an idle keep-alive connection; retry once on a fresh one.
+            self._count(retries=1)
+            return self._request_fresh(pool, key, path, body, timeout)
+        except (OSError, http.client.HTTPException) as exc:
+            connection.close()
+            self._count(connections_discarded=1)
+            raise ValueError(f"MCP network error: {exc}") from exc
+
+        if response.will_close:
+            connection.close()
+            self._count(connections_discarded=1)
+        else:
+            with pool.lock:
+                pool.idle.append((connection, time.monotonic()))
+        return response.status, raw
+
+    def _request_fresh(
+        self, pool: _HostPool, key: tuple[str, str, int], path: str, body: bytes, timeout: float
+    ) -> tuple[int, str]:
+        with pool.lock:
+            stale = list(pool.idle)
+            pool.idle.clear()
+        for connection, _ in stale:
+            connection.close()
+            self._count(connections_discarded=1)
+        return self._request(pool, key, path, body, timeout)
+
+    def _checkout(
+        self, pool: _HostPool, key: tuple[str, str, int], timeout: float
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        with pool.lock:
+            while pool.idle:
+                connection, last_used = pool.idle.pop()
+                if now - last_used <= self.idle_timeout_seconds:
+                    connection.timeout = timeout
+                    if connection.sock is not None:
+                        connection.sock.settimeout(timeout)
+                    self._count(connections_reused=1)
+                    return connection, True
+                connection.close()
+                self._count(connections_discarded=1)
+
+        scheme, host, port = key
+        self._count(connections_created=1)
+        if scheme == "https":
+            context = self.ssl_context or ssl.create_default_context()
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=context), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _count(self, **deltas: float) -> None:
+        # Requests run on many worker threads; unguarded `+=` loses updates.
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self.stats, name, getattr(self.stats, name) + delta)
+
+    def _pool(self, key: tuple[str, str, int]) -> _HostPool:
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _HostPool(slots=threading.BoundedSemaphore(self.max_connections_per_host))
+                self._pools[key] = pool
+            return pool
+
+    def _acquire_slot(self, pool: _HostPool, timeout: float) -> None:
+        if pool.slots.acquire(blocking=False):
+            return
+        self._count(waits=1)
+        started = time.monotonic()
+        limit = self.acquire_timeout_seconds if self.acquire_timeout_seconds is not None else timeout
+        acquired = pool.slots.acquire(timeout=limit)
+        self._count(wait_seconds=time.monotonic() - started)
+        if not acquired:
+            raise ValueError("MCP connection pool exhausted")
+
+    def _post_http2(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        import httpx
+
+        if self._http2_client is None:
+            self._http2_client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=self.max_connections_per_host),
+                verify=self.ssl_context or True,
+            )
+        self._count(requests=1)
+        try:
+            response = self._http2_client.post(url, json=payload, timeout=timeout)
+        except httpx.TransportError as exc:
+            raise ValueError(f"MCP network error: {exc}") from exc
+        return _decode_httpx_response(response)
 
 
 @dataclass
 class HttpMCPClient:
     transport: HTTPTransport = field(default_factory=UrllibHTTPTransport)
     timeout_seconds: float = 15.0
+    batch_servers: frozenset[str] = frozenset()
+
+    def supports_batch(self, server: str) -> bool:
+        """Whether `server` exposes `/tools/batch`; listed explicitly in `batch_servers`."""
+        return server.strip().rstrip("/") in {item.strip().rstrip("/") for item in self.batch_servers}
+
+    def call_tools_batch(self, *, server: str, calls: list[tuple[str, dict[str, Any]]]) -> list[str | Exception]:
+        response = self.transport.post_json(
+            _join_endpoint(server, "/tools/batch"),
+            _batch_payload(calls),
+            timeout=self.timeout_seconds,
+        )
+        return _extract_batch(response, len(calls))
+
+    async def acall_tools_batch(
+        self, *, server: str, calls: list[tuple[str, dict[str, Any]]]
+    ) -> list[str | Exception]:
+        response = await self._apost(_join_endpoint(server, "/tools/batch"), _batch_payload(calls))
+        return _extract_batch(response, len(calls))
 
     def call_tool(self, *, server: str, tool_name: str, arguments: dict[str, Any]) -> str:
-        payload = {
-            "tool_name": tool_name,
-            "arguments": arguments,
-        }
         response = self.transport.post_json(
             _join_endpoint(server, "/tools/call"),
-            payload,
+            _tool_payload(tool_name, arguments),
             timeout=self.timeout_seconds,
         )
         return _extract_text(response, "result")
 
+    async def acall_tool(self, *, server: str, tool_name: str, arguments: dict[str, Any]) -> str:
+        response = await self._apost(_join_endpoint(server, "/tools/call"), _tool_payload(tool_name, arguments))
+        return _extract_text(response, "result")
+
     def get_prompt(
         self,
         *,
@@ -211,17 +337,29 @@ class HttpMCPClient:
         prompt_name: str,
         arguments: dict[str, Any] | None = None,
     ) -> str:
-        payload = {
-            "prompt_name": prompt_name,
-            "arguments": arguments or {},
-        }
         response = self.transport.post_json(
             _join_endpoint(server, "/prompts/get"),
-            payload,
+            _prompt_payload(prompt_name, arguments),
             timeout=self.timeout_seconds,
         )
         return _extract_text(response, "prompt")
 
+    async def aget_prompt(
+        self,
+        *,
+        server: str,
+        prompt_name: str,
+        arguments: dict[str, Any] | None = None,
+    ) -> str:
+        response = await self._apost(_join_endpoint(server, "/prompts/get"), _prompt_payload(prompt_name, arguments))
+        return _extract_text(response, "prompt")
+
+    async def _apost(self, url: str, payload: dict[str, Any]) -> dict[str, Any]:
+        native = getattr(self.transport, "apost_json", None)
+        if native is not None:
+            return await native(url, payload, timeout=self.timeout_seconds)
+        return await asyncio.to_thread(self.transport.post_json, url, payload, timeout=self.timeout_seconds)
+
 
 @dataclass(frozen=True)
 class MCPToolConnector:
@@ -230,14 +368,24 @@ class MCPToolConnector:
     tool_name: str
     default_arguments: dict[str, Any] = field(default_factory=dict)
 
+    def merged_arguments(self, arguments: dict[str, Any] | None = None) -> dict[str, Any]:
+        return {**self.default_arguments, **(arguments or {})}
+
     def run(self, arguments: dict[str, Any] | None = None) -> str:
-        merged_args = {**self.default_arguments, **(arguments or {})}
+        merged_args = self.merged_arguments(arguments)
         return self.client.call_tool(
             server=self.server,
             tool_name=self.tool_name,
             arguments=merged_args,
         )
 
+    async def arun(self, arguments: dict[str, Any] | None = None) -> str:
+        merged_args = self.merged_arguments(arguments)
+        native = getattr(self.client, "acall_tool", None)
+        if native is None:
+            return await asyncio.to_thread(self.run, arguments)
+        return await native(server=self.server, tool_name=self.tool_name, arguments=merged_args)
+
 
 @dataclass(frozen=True)
 class MCPPromptConnector:
@@ -254,30 +402,403 @@ class MCPPromptConnector:
             arguments=merged_args,
         )
 
+    async def aresolve(self, arguments: dict[str, Any] | None = None) -> str:
+        merged_args = {**self.default_arguments, **(arguments or {})}
+        native = getattr(self.client, "aget_prompt", None)
+        if native is None:
+            return await asyncio.to_thread(self.resolve, arguments)
+        return await native(server=self.server, prompt_name=self.prompt_name, arguments=merged_args)
+
+
+@dataclass(frozen=True)
+class ToolInvocation:
+    alias: str
+    arguments: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ToolResult:
+    alias: str
+    text: str = ""
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+# A unit of concurrent work: the invocation indices it answers and how to run it.
+_ToolUnit = tuple[list[int], Callable[[], list["str | Exception"]], Callable[[], Awaitable[list["str | Exception"]]]]
+
+_PromptKey = tuple[str, str, str, str]
+
+
+@dataclass
+class PromptCache:
+    """Caches resolved MCP prompts per (alias, server, prompt name, canonical arguments).
+
+    Entries are fresh for `ttl_seconds`. For a further `stale_ttl_seconds` the stale text
+    is served immediately while a background refresh fetches a new copy. Arguments in
+    `ignored_arguments` are left out of the key. By default that is the per-turn
+    `user_message` skills always send; clear it for prompt templates that use it.
+    """
+
+    ttl_seconds: float = 300.0
+    stale_ttl_seconds: float = 60.0
+    max_entries: int = 512
+    ignored_arguments: frozenset[str] = frozenset({"user_message"})
+    stale_hits: int = 0
+    refreshes: int = 0
+    refresh_errors: int = 0
+    _entries: TTLCache[_PromptKey, tuple[str, float]] = field(init=False, repr=False)
+    _refreshing: set[_PromptKey] = field(default_factory=set, init=False, repr=False)
+    _refresh_tasks: set[asyncio.Task[None]] = field(default_factory=set, init=False, repr=False)
+    _executor: ThreadPoolExecutor | None = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._entries = TTLCache(max_entries=self.max_entries, ttl_seconds=self.ttl_seconds + self.stale_ttl_seconds)
+
+    @property
+    def hit_ratio(self) -> float:
+        return self._entries.stats.hit_ratio
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            **self._entries.stats.snapshot(),
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "entries": len(self._entries),
+        }
+
+    def resolve(self, alias: str, connector: MCPPromptConnector, arguments: dict[str, Any] | None) -> str:
+        key = self._key(alias, connector, arguments)
+        cached = self._lookup(key)
+        annotate(cache_hit=cached is not None, stale=cached is not None and cached[1])
+        if cached is not None:
+            text, stale = cached
+            if stale and self._claim_refresh(key):
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mcp-prompt-refresh")
+                self._executor.submit(self._refresh, key, connector, arguments)
+            return text
+        text = connector.resolve(arguments)
+        self._store(key, text)
+        return text
+
+    async def aresolve(self, alias: str, connector: MCPPromptConnector, arguments: dict[str, Any] | None) -> str:
+        key = self._key(alias, connector, arguments)
+        cached = self._lookup(key)
+        annotate(cache_hit=cached is not None, stale=cached is not None and cached[1])
+        if cached is not None:
+            text, stale = cached
+            if stale and self._claim_refresh(key):
+                task = asyncio.create_task(self._arefresh(key, connector, arguments))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return text
+        text = await connector.aresolve(arguments)
+        self._store(key, text)
+        return text
+
+    def invalidate(self, alias: str | None = None) -> int:
+        if alias is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        return self._entries.invalidate_where(lambda key: key[0] == alias)
+
+    def _key(self, alias: str, connector: MCPPromptConnector, arguments: dict[str, Any] | None) -> _PromptKey:
+        merged_args = {
+            name: value
+            for name, value in {**connector.default_arguments, **(arguments or {})}.items()
+            if name not in self.ignored_arguments
+        }
+        canonical = json.dumps(merged_args, sort_keys=True, separators=(",", ":"), default=str)
+        return alias, connector.server, connector.prompt_name, canonical
+
+    def _lookup(self, key: _PromptKey) -> tuple[str, bool] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        text, fresh_until = entry
+        stale = time.monotonic() >= fresh_until
+        if stale:
+            self.stale_hits += 1
+        return text, stale
+
+    def _store(self, key: _PromptKey, text: str) -> None:
+        self._entries.set(key, (text, time.monotonic() + self.ttl_seconds))
+
+    def _claim_refresh(self, key: _PromptKey) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh(self, key: _PromptKey, connector: MCPPromptConnector, arguments: dict[str, Any] | None) -> None:
+        try:
+            self._store(key, connector.resolve(arguments))
+            self.refreshes += 1
+        except (KeyError, ValueError):
+            self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _arefresh(self, key: _PromptKey, connector: MCPPromptConnector, arguments: dict[str, Any] | None) -> None:
+        try:
+            self._store(key, await connector.aresolve(arguments))
+            self.refreshes += 1
+        except (KeyError, ValueError):
+            self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
 
 @dataclass
 class MCPConnectorRegistry:
     tool_connectors: dict[str, MCPToolConnector] = field(default_factory=dict)
     prompt_connectors: dict[str, MCPPromptConnector] = field(
         default_factory=dict)
+    prompt_cache: PromptCache | None = None
+    tool_timeout_seconds: float | None = None
+    tool_deadline_seconds: float | None = None
+    max_concurrent_tools: int = 8
+    single_flight: SingleFlight | None = None
 
     def register_tool(self, alias: str, connector: MCPToolConnector) -> None:
         self.tool_connectors[alias] = connector
 
     def register_prompt(self, alias: str, connector: MCPPromptConnector) -> None:
         self.prompt_connectors[alias] = connector
+        self.invalidate_prompt(alias)
+
+    def invalidate_prompt(self, alias: str) -> int:
+        """Drop cached resolutions for `alias`; returns how many entries were removed."""
+        if self.prompt_cache is None:
+            return 0
+        return self.prompt_cache.invalidate(alias)
 
     def call_tool(self, alias: str, arguments: dict[str, Any] | None = None) -> str:
+        with span("mcp.call_tool", alias=alias):
+            return self._run_tool(self._tool_connector(alias), arguments)
+
+    async def acall_tool(self, alias: str, arguments: dict[str, Any] | None = None) -> str:
+        with span("mcp.call_tool", alias=alias):
+            return await self._arun_tool(self._tool_connector(alias), arguments)
+
+    def call_tools(
+        self,
+        invocations: list[ToolInvocation],
+        *,
+        timeout_seconds: float | None = None,
+        deadline_seconds: float | None = None,
+    ) -> list[ToolResult]:
+        """Run tool calls concurrently; results come back in invocation order.
+
+        Calls to the same batch-capable server share one round trip. Each unit of work
+        gets `timeout_seconds` from when a worker picks it up, and everything must finish
+        within `deadline_seconds` of the call.
+        """
+        with span("mcp.call_tools", calls=len(invocations)) as stage:
+            results = self._call_tools(invocations, timeout_seconds, deadline_seconds)
+            stage.set_attribute("failures", sum(1 for result in results if not result.ok))
+            return results
+
+    def _call_tools(
+        self, invocations: list[ToolInvocation], timeout_seconds: float | None, deadline_seconds: float | None
+    ) -> list[ToolResult]:
+        outcomes: list[str | Exception | None] = [None] * len(invocations)
+        units = self._tool_units(invocations, outcomes)
+        timeout, deadline = self._tool_limits(timeout_seconds, deadline_seconds)
+        if units:
+            executor = ThreadPoolExecutor(max_workers=min(len(units), self.max_concurrent_tools))
+            try:
+                futures = []
+                for indices, run_sync, _ in units:
+                    start = _UnitStart()
+                    futures.append((indices, start, executor.submit(start.run, run_sync)))
+                for indices, start, future in futures:
+                    try:
+                        # The per-unit clock only starts once a worker has picked the unit up.
+                        if not start.event.wait(_remaining(deadline)):
+                            raise FutureTimeoutError
+                        end = _min_limit(None if timeout is None else start.at + timeout, deadline)
+                        unit_outcomes = future.result(timeout=_remaining(end))
+                    except FutureTimeoutError:
+                        unit_outcomes = [TimeoutError("MCP tool call timed out")] * len(indices)
+                    except Exception as exc:
+                        unit_outcomes = [exc] * len(indices)
+                    for index, outcome in zip(indices, unit_outcomes):
+                        outcomes[index] = outcome
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+        return _tool_results(invocations, outcomes)
+
+    async def acall_tools(
+        self,
+        invocations: list[ToolInvocation],
+        *,
+        timeout_seconds: float | None = None,
+        deadline_seconds: float | None = None,
+    ) -> list[ToolResult]:
+        with span("mcp.call_tools", calls=len(invocations)) as stage:
+            results = await self._acall_tools(invocations, timeout_seconds, deadline_seconds)
+            stage.set_attribute("failures", sum(1 for result in results if not result.ok))
+            return results
+
+    async def _acall_tools(
+        self, invocations: list[ToolInvocation], timeout_seconds: float | None, deadline_seconds: float | None
+    ) -> list[ToolResult]:
+        outcomes: list[str | Exception | None] = [None] * len(invocations)
+        units = self._tool_units(invocations, outcomes)
+        timeout, deadline = self._tool_limits(timeout_seconds, deadline_seconds)
+        semaphore = asyncio.Semaphore(self.max_concurrent_tools)
+
+        async def run_unit(run_async: Callable[[], Awaitable[list[str | Exception]]]) -> list[str | Exception]:
+            async with semaphore:
+                # Time spent queued for a slot counts against the deadline only.
+                return await asyncio.wait_for(run_async(), timeout)
+
+        async def guarded(indices: list[int], run_async: Callable[[], Awaitable[list[str | Exception]]]) -> None:
+            try:
+                unit_outcomes = await asyncio.wait_for(run_unit(run_async), _remaining(deadline))
+            except asyncio.TimeoutError:
+                unit_outcomes = [TimeoutError("MCP tool call timed out")] * len(indices)
+            except Exception as exc:
+                unit_outcomes = [exc] * len(indices)
+            for index, outcome in zip(indices, unit_outcomes):
+                outcomes[index] = outcome
+
+        await asyncio.gather(*(guarded(indices, run_async) for indices, _, run_async in units))
+        return _tool_results(invocations, outcomes)
+
+    def _tool_limits(
+        self, timeout_seconds: float | None, deadline_seconds: float | None
+    ) -> tuple[float | None, float | None]:
+        """The per-unit timeout, and the absolute `time.monotonic()` deadline for the whole call."""
+        timeout = timeout_seconds if timeout_seconds is not None else self.tool_timeout_seconds
+        deadline = deadline_seconds if deadline_seconds is not None else self.tool_deadline_seconds
+        return timeout, None if deadline is None else time.monotonic() + deadline
+
+    def _tool_units(
+        self, invocations: list[ToolInvocation], outcomes: list[str | Exception | None]
+    ) -> list[_ToolUnit]:
+        groups: dict[tuple[int, str], list[int]] = {}
+        singles: list[int] = []
+        for index, invocation in enumerate(invocations):
+            connector = self.tool_connectors.get(invocation.alias)
+            if connector is None:
+                outcomes[index] = KeyError(f"MCP tool connector not found: {invocation.alias}")
+                continue
+            supports_batch = getattr(connector.client, "supports_batch", None)
+            if supports_batch is not None and supports_batch(connector.server):
+                groups.setdefault((id(connector.client), connector.server), []).append(index)
+            else:
+                singles.append(index)
+
+        units: list[_ToolUnit] = []
+        for indices in groups.values():
+            if len(indices) == 1:
+                singles.append(indices[0])
+            else:
+                units.append(self._batch_unit(invocations, indices))
+        for index in sorted(singles):
+            units.append(self._single_unit(invocations, index))
+        return units
+
+    def _single_unit(self, invocations: list[ToolInvocation], index: int) -> _ToolUnit:
+        invocation = invocations[index]
+        connector = self.tool_connectors[invocation.alias]
+
+        def run_sync() -> list[str | Exception]:
+            return [self._run_tool(connector, invocation.arguments)]
+
+        async def run_async() -> list[str | Exception]:
+            return [await self._arun_tool(connector, invocation.arguments)]
+
+        return [index], run_sync, run_async
+
+    def _batch_unit(self, invocations: list[ToolInvocation], indices: list[int]) -> _ToolUnit:
+        connectors = [self.tool_connectors[invocations[index].alias] for index in indices]
+        client, server = connectors[0].client, connectors[0].server
+        calls = [
+            (connector.tool_name, connector.merged_arguments(invocations[index].arguments))
+            for connector, index in zip(connectors, indices)
+        ]
+
+        def run_sync() -> list[str | Exception]:
+            return client.call_tools_batch(server=server, calls=calls)
+
+        async def run_async() -> list[str | Exception]:
+            native = getattr(client, "acall_tools_batch", None)
+            if native is None:
+                return await asyncio.to_thread(run_sync)
+            return await native(server=server, calls=calls)
+
+        return indices, run_sync, run_async
+
+    def get_prompt(self, alias: str, arguments: dict[str, Any] | None = None) -> str:
+        with span("mcp.get_prompt", alias=alias):
+            connector = self._prompt_connector(alias)
+
+            def resolve() -> str:
+                if self.prompt_cache is not None:
+                    return self.prompt_cache.resolve(alias, connector, arguments)
+                return connector.resolve(arguments)
+
+            if self.single_flight is None:
+                return resolve()
+            return self.single_flight.do(_prompt_key(connector, arguments), resolve)
+
+    async def aget_prompt(self, alias: str, arguments: dict[str, Any] | None = None) -> str:
+        with span("mcp.get_prompt", alias=alias):
+            connector = self._prompt_connector(alias)
+
+            async def resolve() -> str:
+                if self.prompt_cache is not None:
+                    return await self.prompt_cache.aresolve(alias, connector, arguments)
+                return await connector.aresolve(arguments)
+
+            if self.single_flight is None:
+                return await resolve()
+            return await self.single_flight.ado(_prompt_key(connector, arguments), resolve)
+
+    def _run_tool(self, connector: MCPToolConnector, arguments: dict[str, Any] | None) -> str:
+        if self.single_flight is None:
+            return connector.run(arguments)
+        return self.single_flight.do(_tool_key(connector, arguments), lambda: connector.run(arguments))
+
+    async def _arun_tool(self, connector: MCPToolConnector, arguments: dict[str, Any] | None) -> str:
+        if self.single_flight is None:
+            return await connector.arun(arguments)
+        return await self.single_flight.ado(_tool_key(connector, arguments), lambda: connector.arun(arguments))
+
+    def _tool_connector(self, alias: str) -> MCPToolConnector:
         connector = self.tool_connectors.get(alias)
         if connector is None:
             raise KeyError(f"MCP tool connector not found: {alias}")
-        return connector.run(arguments)
+        return connector
 
-    def get_prompt(self, alias: str, arguments: dict[str, Any] | None = None) -> str:
+    def _prompt_connector(self, alias: str) -> MCPPromptConnector:
         connector = self.prompt_connectors.get(alias)
         if connector is None:
             raise KeyError(f"MCP prompt connector not found: {alias}")
-        return connector.resolve(arguments)
+        return connector
+
+
+def _tool_key(connector: MCPToolConnector, arguments: dict[str, Any] | None) -> tuple[Any, ...]:
+    merged = canonical_json(connector.merged_arguments(arguments))
+    return ("tool", id(connector.client), connector.server, connector.tool_name, merged)
+
+
+def _prompt_key(connector: MCPPromptConnector, arguments: dict[str, Any] | None) -> tuple[Any, ...]:
+    merged = canonical_json({**connector.default_arguments, **(arguments or {})})
+    return ("prompt", id(connector.client), connector.server, connector.prompt_name, merged)
 
 
 def _join_endpoint(server: str, endpoint: str) -> str:
@@ -287,6 +808,91 @@ def _join_endpoint(server: str, endpoint: str) -> str:
     return f"{base}{endpoint}"
 
 
+def _min_limit(*limits: float | None) -> float | None:
+    present = [limit for limit in limits if limit is not None]
+    return min(present) if present else None
+
+
+def _remaining(end: float | None) -> float | None:
+    return None if end is None else max(0.0, end - time.monotonic())
+
+
+@dataclass
+class _UnitStart:
+    """When a worker thread picked up a tool unit."""
+
+    event: threading.Event = field(default_factory=threading.Event)
+    at: float = 0.0
+
+    def run(self, call: Callable[[], list[str | Exception]]) -> list[str | Exception]:
+        self.at = time.monotonic()
+        self.event.set()
+        return call()
+
+
+def _tool_results(invocations: list[ToolInvocation], outcomes: list[str | Exception | None]) -> list[ToolResult]:
+    results: list[ToolResult] = []
+    for invocation, outcome in zip(invocations, outcomes):
+        if isinstance(outcome, str):
+            results.append(ToolResult(alias=invocation.alias, text=outcome.strip()))
+        else:
+            error = str(outcome) if outcome is not None else "MCP tool call did not run"
+            results.append(ToolResult(alias=invocation.alias, error=error or type(outcome).__name__))
+    return results
+
+
+def _batch_payload(calls: list[tuple[str, dict[str, Any]]]) -> dict[str, Any]:
+    return {"calls": [_tool_payload(tool_name, arguments) for tool_name, arguments in calls]}
+
+
+def _extract_batch(payload: dict[str, Any], expected: int) -> list[str | Exception]:
+    if "error" in payload and payload["error"]:
+        raise ValueError(f"MCP error: {payload['error']}")
+    items = payload.get("results")
+    if not isinstance(items, list) or len(items) != expected:
+        raise ValueError("MCP batch response must contain one result per call")
+
+    outcomes: list[str | Exception] = []
+    for item in items:
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("MCP batch result must be a JSON object")
+            outcomes.append(_extract_text(item, "result"))
+        except ValueError as exc:
+            outcomes.append(exc)
+    return outcomes
+
+
+def _tool_payload(tool_name: str, arguments: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "tool_name": tool_name,
+        "arguments": arguments,
+    }
+
+
+def _prompt_payload(prompt_name: str, arguments: dict[str, Any] | None) -> dict[str, Any]:
+    return {
+        "prompt_name": prompt_name,
+        "arguments": arguments or {},
+    }
+
+
+def _decode_json_object(raw: str) -> dict[str, Any]:
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError("MCP response was not valid JSON") from exc
+    if not isinstance(parsed, dict):
+        raise ValueError("MCP response must be a JSON object")
+    return parsed
+
+
+def _decode_httpx_response(response: Any) -> dict[str, Any]:
+    if response.status_code >= 400:
+        raise ValueError(f"MCP HTTP {response.status_code}: {response.text}")
+    return _decode_json_object(response.text)
+
+
 def _extract_text(payload: dict[str, Any], primary_key: str) -> str:
     if "error" in payload and payload["error"]:
         raise ValueError(f"MCP error: {payload['error']}")
@@ -308,3 +914,12 @@ def _extract_text(payload: dict[str, Any], primary_key: str) -> str:
             return "\n".join(texts)
 
     raise ValueError("MCP response missing textual content")
+
+
+def __getattr__(name: str) -> Any:
+    # The stdio client moved to `mcp_stdio` so importing this module never loads the MCP SDK.
+    if name == "MCPClient":
+        from .mcp_stdio import MCPClient
+
+        return MCPClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
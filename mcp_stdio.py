@@ -0,0 +1,443 @@
+"""Stdio MCP sessions: a pool of long-lived server subprocesses and the interactive client.
+
+Kept apart from `mcp` so the HTTP connectors can be imported without the MCP and
+Anthropic SDKs; both are imported only when a session is opened or a client is created.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Mapping
+
+_TOOLS_LIST_CHANGED = "notifications/tools/list_changed"
+# anyio stream errors raised when the server subprocess has gone away; matched by name to avoid importing anyio.
+_DISCONNECT_ERRORS = frozenset({"ClosedResourceError", "BrokenResourceError", "EndOfStream"})
+_CONNECTION_CLOSED = -32000  # JSON-RPC error code the SDK uses for requests cut off by a closed transport
+
+MessageHandler = Callable[[Any], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class StdioServer:
+    command: str
+    args: tuple[str, ...] = ()
+    env: Mapping[str, str] | None = None
+
+    @classmethod
+    def from_script(cls, path: str) -> "StdioServer":
+        is_python = path.endswith(".py")
+        is_js = path.endswith(".js")
+        if not (is_python or is_js):
+            raise ValueError("Server script must be a .py or .js file")
+        return cls(command="python" if is_python else "node", args=(path,))
+
+
+SessionOpener = Callable[[StdioServer, MessageHandler], AsyncContextManager[Any]]
+
+
+@asynccontextmanager
+async def open_stdio_session(server: StdioServer, message_handler: MessageHandler) -> AsyncIterator[Any]:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(
+        command=server.command,
+        args=list(server.args),
+        env=dict(server.env) if server.env is not None else None,
+    )
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write, message_handler=message_handler) as session:
+            await session.initialize()
+            yield session
+
+
+@dataclass
+class SessionPoolStats:
+    connects: int = 0
+    crashes: int = 0
+    catalog_hits: int = 0
+    catalog_misses: int = 0
+    catalog_invalidations: int = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "connects": self.connects,
+            "crashes": self.crashes,
+            "catalog_hits": self.catalog_hits,
+            "catalog_misses": self.catalog_misses,
+            "catalog_invalidations": self.catalog_invalidations,
+        }
+
+
+@dataclass
+class _Instance:
+    session: Any
+    task: asyncio.Task[None]
+    stop: asyncio.Event
+    in_flight: int = 0
+    failed: bool = False
+
+    @property
+    def healthy(self) -> bool:
+        return not self.failed and not self.task.done()
+
+
+@dataclass
+class StdioSessionPool:
+    """Long-lived `ClientSession`s to named stdio servers, shared across concurrent queries.
+
+    Each server gets up to `instances_per_server` subprocesses. A new one is started only when
+    every live instance already carries `max_concurrent_per_instance` calls; otherwise the
+    least-loaded instance is shared. Instances whose subprocess exits or whose streams break
+    are dropped and replaced on the next checkout. Tool catalogs are cached per server until
+    the server sends `tools/list_changed`.
+    """
+
+    servers: dict[str, StdioServer] = field(default_factory=dict)
+    instances_per_server: int = 1
+    max_concurrent_per_instance: int = 8
+    opener: SessionOpener = open_stdio_session
+    stats: SessionPoolStats = field(default_factory=SessionPoolStats)
+    _instances: dict[str, list[_Instance]] = field(default_factory=dict, init=False, repr=False)
+    _locks: dict[str, asyncio.Lock] = field(default_factory=dict, init=False, repr=False)
+    _catalogs: dict[str, list[Any]] = field(default_factory=dict, init=False, repr=False)
+    _generations: dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.instances_per_server < 1:
+            raise ValueError("instances_per_server must be at least 1")
+        if self.max_concurrent_per_instance < 1:
+            raise ValueError("max_concurrent_per_instance must be at least 1")
+
+    def add_server(self, name: str, server: StdioServer) -> None:
+        if name in self.servers:
+            raise ValueError(f"MCP server '{name}' is already registered")
+        self.servers[name] = server
+
+    async def start(self) -> None:
+        """Connect to every server and load its tool catalog ahead of the first query."""
+        await asyncio.gather(*(self.list_tools(name) for name in self.servers))
+
+    @asynccontextmanager
+    async def session(self, name: str) -> AsyncIterator[Any]:
+        instance = await self._checkout(name)
+        instance.in_flight += 1
+        try:
+            yield instance.session
+        except Exception as exc:
+            if _is_disconnect(exc) or instance.task.done():
+                await self._retire(name, instance)
+            raise
+        finally:
+            instance.in_flight -= 1
+
+    async def list_tools(self, name: str) -> list[Any]:
+        cached = self._catalogs.get(name)
+        if cached is not None:
+            self.stats.catalog_hits += 1
+            return cached
+        self.stats.catalog_misses += 1
+        for attempt in range(2):
+            generation = self._generations.get(name, 0)
+            try:
+                async with self.session(name) as session:
+                    tools = list((await session.list_tools()).tools)
+            except Exception as exc:
+                # Listing is idempotent, so one retry on a fresh subprocess is safe.
+                if attempt or not _is_disconnect(exc):
+                    raise
+                continue
+            # A list_changed that arrived mid-request makes this answer stale; return it uncached.
+            if self._generations.get(name, 0) == generation:
+                self._catalogs[name] = tools
+            return tools
+        raise AssertionError("unreachable")
+
+    async def tools(self) -> dict[str, tuple[str, Any]]:
+        """All tools by name, each with the server that provides it; earlier servers win on clashes."""
+        names = list(self.servers)
+        catalogs = await asyncio.gather(*(self.list_tools(name) for name in names))
+        merged: dict[str, tuple[str, Any]] = {}
+        for name, catalog in zip(names, catalogs):
+            for tool in catalog:
+                merged.setdefault(tool.name, (name, tool))
+        return merged
+
+    async def call_tool(self, name: str, tool_name: str, arguments: dict[str, Any] | None = None) -> Any:
+        async with self.session(name) as session:
+            return await session.call_tool(tool_name, arguments or {})
+
+    def invalidate(self, name: str | None = None) -> None:
+        for server in [name] if name is not None else list(self.servers):
+            self._generations[server] = self._generations.get(server, 0) + 1
+            if self._catalogs.pop(server, None) is not None:
+                self.stats.catalog_invalidations += 1
+
+    def sizes(self) -> dict[str, int]:
+        return {name: sum(instance.healthy for instance in instances) for name, instances in self._instances.items()}
+
+    async def aclose(self) -> None:
+        instances = [instance for group in self._instances.values() for instance in group]
+        self._instances.clear()
+        self._catalogs.clear()
+        for instance in instances:
+            instance.stop.set()
+        await asyncio.gather(*(instance.task for instance in instances), return_exceptions=True)
+
+    async def _checkout(self, name: str) -> _Instance:
+        if name not in self.servers:
+            raise KeyError(f"Unknown MCP server '{name}'")
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            instances = self._instances.setdefault(name, [])
+            for instance in [instance for instance in instances if not instance.healthy]:
+                await self._retire(name, instance)
+            least_loaded = min(instances, key=lambda instance: instance.in_flight, default=None)
+            if least_loaded is not None and (
+                least_loaded.in_flight < self.max_concurrent_per_instance
+                or len(instances) >= self.instances_per_server
+            ):
+                return least_loaded
+            instance = await self._spawn(name)
+            instances.append(instance)
+            return instance
+
+    async def _spawn(self, name: str) -> _Instance:
+        ready: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        stop = asyncio.Event()
+        # The session's stdio context must be entered and exited by the same task, so each
+        # instance lives in its own task for its whole lifetime.
+        task = asyncio.create_task(self._own(name, ready, stop))
+        try:
+            session = await asyncio.shield(ready)
+        except BaseException:
+            stop.set()
+            task.cancel()
+            raise
+        self.stats.connects += 1
+        return _Instance(session=session, task=task, stop=stop)
+
+    async def _own(self, name: str, ready: asyncio.Future[Any], stop: asyncio.Event) -> None:
+        async def on_message(message: Any) -> None:
+            if _is_tools_list_changed(message):
+                self.invalidate(name)
+
+        try:
+            async with self.opener(self.servers[name], on_message) as session:
+                ready.set_result(session)
+                await stop.wait()
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+            raise
+        except Exception as exc:
+            if not ready.done():
+                ready.set_exception(exc)
+            # After startup a failure just ends the task; checkout sees it and replaces the instance.
+
+    async def _retire(self, name: str, instance: _Instance) -> None:
+        instances = self._instances.get(name, [])
+        if instance not in instances:
+            return
+        instances.remove(instance)
+        instance.failed = True
+        self.stats.crashes += 1
+        self.invalidate(name)
+        instance.stop.set()
+        await asyncio.gather(instance.task, return_exceptions=True)
+
+
+def _is_disconnect(exc: BaseException) -> bool:
+    if isinstance(exc, (OSError, EOFError)) or type(exc).__name__ in _DISCONNECT_ERRORS:
+        return True
+    error = getattr(exc, "error", None)
+    return getattr(error, "code", None) == _CONNECTION_CLOSED
+
+
+def _is_tools_list_changed(message: Any) -> bool:
+    notification = getattr(message, "root", message)
+    return getattr(notification, "method", None) == _TOOLS_LIST_CHANGED
+
+
+@dataclass(frozen=True)
+class ToolLoopBudget:
+    """Limits on one `process_query`: model rounds, total billed tokens and wall-clock time."""
+
+    max_rounds: int = 8
+    max_tokens: int = 50_000
+    timeout_seconds: float = 120.0
+
+
+# Why use MCP
+# Don't bloat the agent with tool-specific logic and intermediary steps- keep it focused on reasoning and decision-making
+# Decouple tool execution from agent reasoning - allows for more flexible and powerful tool interactions
+# Support more complex tool interactions, like multi-step calls, conditional logic based on tool results, and dynamic tool discovery
+
+class MCPClient:
+    def __init__(
+        self,
+        pool: StdioSessionPool | None = None,
+        *,
+        model: str = "claude-sonnet-4-20250514",
+        max_tokens: int = 1000,
+        budget: ToolLoopBudget = ToolLoopBudget(),
+        anthropic: Any | None = None,
+    ):
+        # Sessions and tool catalogs outlive individual queries.
+        self.pool = pool if pool is not None else StdioSessionPool()
+        self.model = model
+        self.max_tokens = max_tokens
+        self.budget = budget
+        if anthropic is None:
+            from anthropic import AsyncAnthropic
+
+            anthropic = AsyncAnthropic()
+        self.anthropic = anthropic
+
+    async def process_query(self, query: str) -> str:
+        """Process a query using Claude and available tools
+
+        Each assistant turn's tool calls run concurrently and go back as one batch of
+        `tool_result` blocks; the loop continues until Claude stops asking for tools or
+        the budget runs out. Each round's `max_tokens` is capped by the tokens left.
+        """
+        messages: list[dict[str, Any]] = [
+            {
+                "role": "user",
+                "content": query
+            }
+        ]
+
+        catalog = await self.pool.tools()
+        available_tools = [{
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.inputSchema
+        } for _, tool in catalog.values()]
+
+        final_text: list[str] = []
+        deadline = asyncio.get_running_loop().time() + self.budget.timeout_seconds
+        tokens = 0
+        try:
+            for round_index in range(self.budget.max_rounds):
+                response = await _within(deadline, self.anthropic.messages.create(
+                    model=self.model,
+                    # Output can't take a round past the token budget; input is billed as sent.
+                    max_tokens=min(self.max_tokens, self.budget.max_tokens - tokens),
+                    messages=messages,
+                    tools=available_tools
+                ))
+                tokens += _billed_tokens(response)
+                final_text.extend(content.text for content in response.content if content.type == 'text')
+                tool_uses = [content for content in response.content if content.type == 'tool_use']
+                if not tool_uses or response.stop_reason != 'tool_use':
+                    return "\n".join(final_text)
+                # Tools only run when a further round can hand their results back to the model.
+                if tokens >= self.budget.max_tokens:
+                    final_text.append(f"[Stopped: token budget of {self.budget.max_tokens} used]")
+                    return "\n".join(final_text)
+                if round_index == self.budget.max_rounds - 1:
+                    break
+
+                final_text.extend(
+                    f"[Calling tool {tool_use.name} with args {tool_use.input}]" for tool_use in tool_uses
+                )
+                results = await _within(deadline, asyncio.gather(
+                    *(self._tool_result(catalog, tool_use) for tool_use in tool_uses)
+                ))
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append({"role": "user", "content": list(results)})
+        except asyncio.TimeoutError:
+            final_text.append(f"[Stopped: time budget of {self.budget.timeout_seconds}s used]")
+            return "\n".join(final_text)
+
+        final_text.append(f"[Stopped: {self.budget.max_rounds} tool rounds used]")
+        return "\n".join(final_text)
+
+    async def _tool_result(self, catalog: dict[str, tuple[str, Any]], tool_use: Any) -> dict[str, Any]:
+        entry = catalog.get(tool_use.name)
+        if entry is None:
+            return _tool_error(tool_use.id, f"Unknown tool '{tool_use.name}'")
+        try:
+            result = await self.pool.call_tool(entry[0], tool_use.name, tool_use.input)
+        except Exception as exc:
+            # One failed tool must not sink its siblings; the model sees the error and can recover.
+            return _tool_error(tool_use.id, f"{type(exc).__name__}: {exc}")
+        return {
+            "type": "tool_result",
+            "tool_use_id": tool_use.id,
+            "content": _anthropic_content(result.content),
+            "is_error": bool(getattr(result, "isError", False)),
+        }
+
+    async def connect_to_server(self, server_script_path: str, name: str | None = None):
+        """Connect to an MCP server
+
+        Args:
+            server_script_path: Path to the server script (.py or .js)
+            name: Name to register the server under; defaults to the script's file name
+        """
+        name = name or Path(server_script_path).stem
+        self.pool.add_server(name, StdioServer.from_script(server_script_path))
+
+        # Start the server and cache its tools
+        tools = await self.pool.list_tools(name)
+        print("\nConnected to server with tools:",
+              [tool.name for tool in tools])
+
+    async def chat_loop(self):
+        """Run an interactive chat loop"""
+        print("\nMCP Client Started!")
+        print("Type your queries or 'quit' to exit.")
+
+        while True:
+            try:
+                query = input("\nQuery: ").strip()
+
+                if query.lower() == 'quit':
+                    break
+
+                response = await self.process_query(query)
+                print("\n" + response)
+
+            except Exception as e:
+                print(f"\nError: {str(e)}")
+
+    async def cleanup(self):
+        """Clean up resources"""
+        await self.pool.aclose()
+
+
+async def _within(deadline: float, awaitable: Awaitable[Any]) -> Any:
+    remaining = deadline - asyncio.get_running_loop().time()
+    return await asyncio.wait_for(awaitable, max(remaining, 0.0))
+
+
+def _billed_tokens(response: Any) -> int:
+    usage = getattr(response, "usage", None)
+    return int(getattr(usage, "input_tokens", 0) or 0) + int(getattr(usage, "output_tokens", 0) or 0)
+
+
+def _anthropic_content(blocks: Any) -> Any:
+    # MCP content models carry extra fields (annotations, _meta) that the Messages API rejects.
+    if isinstance(blocks, str):
+        return blocks
+    converted: list[dict[str, Any]] = []
+    for block in blocks:
+        kind = getattr(block, "type", None)
+        if kind == "text":
+            converted.append({"type": "text", "text": block.text})
+        elif kind == "image":
+            source = {"type": "base64", "media_type": block.mimeType, "data": block.data}
+            converted.append({"type": "image", "source": source})
+        else:
+            dump = getattr(block, "model_dump_json", None)
+            converted.append({"type": "text", "text": dump() if dump is not None else str(block)})
+    return converted
+
+
+def _tool_error(tool_use_id: str, message: str) -> dict[str, Any]:
+    return {"type": "tool_result", "tool_use_id": tool_use_id, "content": message, "is_error": True}
@@ -1,22 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import json
-import re
-from dataclasses import dataclass
+from collections import Counter
+from dataclasses import dataclass, field, fields
 from typing import Any
 
-from .llm import LLMClient
+from .cache import PlanCache
+from .llm import LLMClient, acomplete_json, astream_json, complete_json, track_structured
+from .router import FastPathRouter
 from .schemas import Action, ChatMessage, Plan, Role
+from .tracing import llm_attributes, llm_span, span
+from .transcript import Transcript
 
 
 PLANNER_SYSTEM_PROMPT = """You are a routing planner for a chatbot.
 Pick exactly one action from: clarify, joke, recipe.
-Return strict JSON with this shape:
+Return strict JSON with this shape, keeping the keys in this order:
 {
   \"action\": \"clarify|joke|recipe\",
-  \"reason\": \"short reason\",
   \"params\": {\"any\": \"json object\"},
-  \"clarifying_question\": \"string or null\"
+  \"clarifying_question\": \"string or null\",
+  \"reason\": \"short reason\"
 }
 Rules:
 - choose clarify if the user request is ambiguous.
@@ -25,47 +30,240 @@ Rules:
 - do not include markdown or extra prose.
 """
 
+_INVALID_JSON_REASON = "Planner output was not valid JSON"
+_PLANNER_PREFIX = Transcript([ChatMessage(role=Role.SYSTEM, content=PLANNER_SYSTEM_PROMPT)])
+
+_SCHEMA_TYPES: dict[str, dict[str, Any]] = {
+    "Action": {"type": "string", "enum": [action.value for action in Action]},
+    "str": {"type": "string"},
+    "str | None": {"type": ["string", "null"]},
+    "dict[str, Any]": {"type": "object"},
+}
+
+
+# What a skill needs comes first, so a streamed plan can be dispatched before `reason` arrives.
+_FIELD_ORDER = ("action", "params", "clarifying_question", "reason")
+
+
+def plan_json_schema() -> dict[str, Any]:
+    """JSON schema for the planner output, following the fields of `Plan`."""
+    types = {item.name: _SCHEMA_TYPES[str(item.type)] for item in fields(Plan)}
+    ordered = sorted(types, key=lambda name: _FIELD_ORDER.index(name) if name in _FIELD_ORDER else len(_FIELD_ORDER))
+    properties = {name: types[name] for name in ordered}
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+PLAN_JSON_SCHEMA = plan_json_schema()
+
+
+@dataclass
+class PlannerStats:
+    calls: int = 0
+    structured_calls: int = 0
+    parse_failures: int = 0
+    calls_by_provider: Counter[str] = field(default_factory=Counter)
+    failures_by_provider: Counter[str] = field(default_factory=Counter)
+
+    def failure_rate(self, provider: str | None = None) -> float:
+        if provider is None:
+            return self.parse_failures / self.calls if self.calls else 0.0
+        calls = self.calls_by_provider[provider]
+        return self.failures_by_provider[provider] / calls if calls else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "structured_calls": self.structured_calls,
+            "parse_failures": self.parse_failures,
+            "failure_rate": self.failure_rate(),
+            "failures_by_provider": {
+                provider: {"calls": calls, "failures": self.failures_by_provider[provider]}
+                for provider, calls in self.calls_by_provider.items()
+            },
+        }
+
 
 @dataclass
 class Planner:
     llm: LLMClient
+    router: FastPathRouter | None = None
+    cache: PlanCache | None = None
+    temperature: float = 0.0
+    # A plan is a few dozen tokens. Reasoning models count their reasoning against this cap,
+    # so raise it for them or set None (PLANNER_MAX_TOKENS, or 0/"none" to lift it).
+    max_tokens: int | None = 256
+    stats: PlannerStats = field(default_factory=PlannerStats)
 
     def plan(self, history: list[ChatMessage], user_message: str) -> Plan:
-        prompt_messages = [
-            ChatMessage(role=Role.SYSTEM, content=PLANNER_SYSTEM_PROMPT),
-            *history,
-            ChatMessage(role=Role.USER, content=user_message),
-        ]
-        raw = self.llm.complete(prompt_messages, temperature=0)
-        data = _safe_parse_json(raw)
-        if data is None:
-            return Plan(
-                action=Action.CLARIFY,
-                reason="Planner output was not valid JSON",
-                clarifying_question="Could you clarify whether you want a joke or a recipe?",
-            )
-
-        action_value = str(data.get("action", "clarify")).strip().lower()
+        with span("planner.plan") as stage:
+            plan = self._shortcut(history, user_message, stage)
+            if plan is None:
+                messages = self._messages(history, user_message)
+                with llm_span("planner", self.llm, messages) as call, track_structured() as outcome:
+                    raw = complete_json(
+                        self.llm,
+                        messages,
+                        schema=PLAN_JSON_SCHEMA,
+                        name="plan",
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                    )
+                    call.set_attribute("response_chars", len(raw))
+                plan = self._observe(history, user_message, raw, structured=outcome.native)
+            stage.set_attribute("action", plan.action.value)
+            return plan
+
+    async def aplan(self, history: list[ChatMessage], user_message: str) -> Plan:
+        with span("planner.plan") as stage:
+            plan = self._shortcut(history, user_message, stage)
+            if plan is None:
+                messages = self._messages(history, user_message)
+                with llm_span("planner", self.llm, messages) as call, track_structured() as outcome:
+                    raw = await acomplete_json(
+                        self.llm,
+                        messages,
+                        schema=PLAN_JSON_SCHEMA,
+                        name="plan",
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                    )
+                    call.set_attribute("response_chars", len(raw))
+                plan = self._observe(history, user_message, raw, structured=outcome.native)
+            stage.set_attribute("action", plan.action.value)
+            return plan
+
+    async def aplan_early(
+        self, history: list[ChatMessage], user_message: str
+    ) -> tuple[Plan, asyncio.Task[Plan]]:
+        """Stream the plan and return as soon as the chosen skill has what it needs.
+
+        The returned task finishes reading the stream and resolves to the complete plan,
+        which is the one that gets cached and fed back to the router.
+        """
+        early: asyncio.Future[Plan] = asyncio.get_running_loop().create_future()
+        final = asyncio.create_task(self._astream_plan(history, user_message, early))
         try:
-            action = Action(action_value)
-        except ValueError:
-            action = Action.CLARIFY
+            plan = await early
+        except BaseException:
+            final.cancel()
+            await asyncio.gather(final, return_exceptions=True)
+            raise
+        return plan, final
+
+    async def _astream_plan(self, history: list[ChatMessage], user_message: str, early: asyncio.Future[Plan]) -> Plan:
+        try:
+            with span("planner.plan", streaming=True) as stage:
+                plan = self._shortcut(history, user_message, stage)
+                if plan is None:
+                    messages = self._messages(history, user_message)
+                    parser = PlanStreamParser()
+                    chunks: list[str] = []
+                    with llm_span("planner", self.llm, messages) as call, track_structured() as outcome:
+                        async for delta in astream_json(
+                            self.llm,
+                            messages,
+                            schema=PLAN_JSON_SCHEMA,
+                            name="plan",
+                            temperature=self.temperature,
+                            max_tokens=self.max_tokens,
+                        ):
+                            chunks.append(delta)
+                            parser.feed(delta)
+                            if not early.done() and _dispatchable(parser):
+                                early.set_result(_plan_from_fields(parser.fields))
+                                stage.set_attribute("dispatch_chars", sum(len(chunk) for chunk in chunks))
+                        raw = "".join(chunks)
+                        call.set_attribute("response_chars", len(raw))
+                    plan = self._observe(history, user_message, raw, structured=outcome.native)
+                stage.set_attribute("action", plan.action.value)
+        except asyncio.CancelledError:
+            early.cancel()
+            raise
+        except Exception as exc:
+            if not early.done():
+                early.set_exception(exc)
+            raise
+        if not early.done():
+            early.set_result(plan)
+        return plan
+
+    def _shortcut(self, history: list[ChatMessage], user_message: str, stage: Any) -> Plan | None:
+        if self.router is not None and (decision := self.router.route(history, user_message)):
+            stage.set_attributes(fast_path=True, confidence=decision.confidence)
+            return decision.plan
+        if self.cache is not None:
+            cached = self.cache.get(history, user_message)
+            stage.set_attribute("cache_hit", cached is not None)
+            return cached
+        return None
+
+    def _observe(self, history: list[ChatMessage], user_message: str, raw: str, *, structured: bool) -> Plan:
+        with span("planner.parse", response_chars=len(raw)) as parse:
+            plan = _parse_plan(raw)
+            parse.set_attribute("valid_json", plan.reason != _INVALID_JSON_REASON)
+        self._record(plan, structured=structured)
+        if plan.reason == _INVALID_JSON_REASON:
+            return plan
+        if self.router is not None:
+            self.router.observe(user_message, plan)
+        if self.cache is not None:
+            self.cache.put(history, user_message, plan)
+        return plan
 
-        reason = str(data.get("reason", "No reason provided")).strip() or "No reason provided"
-        params = data.get("params", {})
-        if not isinstance(params, dict):
-            params = {}
+    def _record(self, plan: Plan, *, structured: bool) -> None:
+        provider = str(llm_attributes(self.llm)["provider"])
+        self.stats.calls += 1
+        self.stats.calls_by_provider[provider] += 1
+        if structured:
+            self.stats.structured_calls += 1
+        if plan.reason == _INVALID_JSON_REASON:
+            self.stats.parse_failures += 1
+            self.stats.failures_by_provider[provider] += 1
 
-        clarifying_question = data.get("clarifying_question")
-        if clarifying_question is not None:
-            clarifying_question = str(clarifying_question).strip() or None
+    def _messages(self, history: list[ChatMessage], user_message: str) -> Transcript:
+        return _PLANNER_PREFIX.extended(history, [ChatMessage(role=Role.USER, content=user_message)])
 
+
+def _parse_plan(raw: str) -> Plan:
+    data = _safe_parse_json(raw)
+    if data is None:
         return Plan(
-            action=action,
-            reason=reason,
-            params=params,
-            clarifying_question=clarifying_question,
+            action=Action.CLARIFY,
+            reason=_INVALID_JSON_REASON,
+            clarifying_question="Could you clarify whether you want a joke or a recipe?",
         )
+    return _plan_from_fields(data)
+
+
+def _dispatchable(parser: PlanStreamParser) -> bool:
+    action = parser.action
+    if action is None:
+        return False
+    return ("clarifying_question" if action == Action.CLARIFY else "params") in parser.fields
+
+
+def _plan_from_fields(data: dict[str, Any]) -> Plan:
+    action_value = str(data.get("action", "clarify")).strip().lower()
+    try:
+        action = Action(action_value)
+    except ValueError:
+        action = Action.CLARIFY
+
+    reason = str(data.get("reason", "No reason provided")).strip() or "No reason provided"
+    params = data.get("params", {})
+    if not isinstance(params, dict):
+        params = {}
+
+    clarifying_question = data.get("clarifying_question")
+    if clarifying_question is not None:
+        clarifying_question = str(clarifying_question).strip() or None
+
+    return Plan(
+        action=action,
+        reason=reason,
+        params=params,
+        clarifying_question=clarifying_question,
+    )
 
 
 def _safe_parse_json(raw: str) -> dict[str, Any] | None:
@@ -76,12 +274,112 @@ def _safe_parse_json(raw: str) -> dict[str, Any] | None:
     except json.JSONDecodeError:
         pass
 
-    match = re.search(r"\{.*\}", raw, flags=re.DOTALL)
-    if not match:
-        return None
+    # Otherwise take the first complete object, skipping prose or code fences around it.
+    start = raw.find("{")
+    while start != -1:
+        parser = PlanStreamParser()
+        parser.feed(raw[start:])
+        if parser.complete:
+            return parser.fields
+        start = raw.find("{", start + 1)
+    return None
 
-    try:
-        parsed = json.loads(match.group(0))
-        return parsed if isinstance(parsed, dict) else None
-    except json.JSONDecodeError:
-        return None
+
+class PlanStreamParser:
+    """Parses the planner's JSON object incrementally as text deltas arrive.
+
+    Each top-level field is available in `fields` as soon as its value is complete, so a
+    caller can stop reading the stream once `action` is known. Anything before the first
+    `{` (a code fence, say) is skipped.
+    """
+
+    def __init__(self) -> None:
+        self.fields: dict[str, Any] = {}
+        self.complete = False
+        self.failed = False
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._state = "start"
+        self._key = ""
+        self._token_start = 0
+
+    @property
+    def done(self) -> bool:
+        return self.complete or self.failed
+
+    @property
+    def action(self) -> Action | None:
+        if "action" not in self.fields:
+            return None
+        try:
+            return Action(str(self.fields["action"]).strip().lower())
+        except ValueError:
+            return Action.CLARIFY
+
+    def feed(self, delta: str) -> None:
+        if self.done:
+            return
+        self._text += delta
+        text = self._text
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._state == "key":
+                        self._key = json.loads(text[self._token_start : index + 1])
+                        self._state = "colon"
+                continue
+            if self._state == "start":
+                if char == "{":
+                    self._depth, self._state = 1, "key"
+                continue
+            if char.isspace():
+                continue
+            if self._state == "key":
+                if char == '"':
+                    self._in_string, self._token_start = True, index
+                elif char == "}":
+                    self.complete = True
+                    self._pos = index + 1
+                    return
+                elif char != ",":
+                    self._fail(index)
+                    return
+            elif self._state == "colon":
+                if char != ":":
+                    self._fail(index)
+                    return
+                self._state = "value_start"
+            else:
+                if self._state == "value_start":
+                    self._state, self._token_start = "value", index
+                if char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]" and self._depth > 1:
+                    self._depth -= 1
+                elif char in ",}" and self._depth == 1:
+                    try:
+                        self.fields[self._key] = json.loads(text[self._token_start : index])
+                    except json.JSONDecodeError:
+                        self._fail(index)
+                        return
+                    if char == "}":
+                        self.complete = True
+                        self._pos = index + 1
+                        return
+                    self._state = "key"
+        self._pos = len(text)
+
+    def _fail(self, index: int) -> None:
+        self.failed = True
+        self._pos = index
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Protocol
+
+from .schemas import Action, ChatMessage, Plan
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    plan: Plan
+    confidence: float
+    source: str
+
+
+class RouteRule(Protocol):
+    def match(self, user_message: str) -> RouteDecision | None:
+        ...
+
+
+@dataclass(frozen=True)
+class KeywordRule:
+    action: Action
+    keywords: tuple[str, ...]
+    confidence: float = 0.8
+    name: str = "keyword"
+
+    def match(self, user_message: str) -> RouteDecision | None:
+        words = _normalize(user_message)
+        padded = f" {words} "
+        for keyword in self.keywords:
+            if f" {keyword} " in padded:
+                return RouteDecision(
+                    plan=Plan(action=self.action, reason=f"fast-path {self.name}: '{keyword}'"),
+                    confidence=self.confidence,
+                    source=self.name,
+                )
+        return None
+
+
+@dataclass(frozen=True)
+class RegexRule:
+    """Matches `pattern` case-insensitively; named groups become `Plan.params`."""
+
+    action: Action
+    pattern: str
+    confidence: float = 0.95
+    name: str = "regex"
+    _compiled: re.Pattern[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_compiled", re.compile(self.pattern, flags=re.IGNORECASE))
+
+    def match(self, user_message: str) -> RouteDecision | None:
+        found = self._compiled.search(user_message.strip())
+        if not found:
+            return None
+        params = {key: value.strip() for key, value in found.groupdict().items() if value and value.strip()}
+        return RouteDecision(
+            plan=Plan(action=self.action, reason=f"fast-path {self.name}", params=params),
+            confidence=self.confidence,
+            source=self.name,
+        )
+
+
+def default_rules() -> list[RouteRule]:
+    return [
+        RegexRule(
+            action=Action.JOKE,
+            pattern=r"^(?:please\s+)?(?:tell|give)\s+me\s+(?:a|another)\s+joke(?:\s+about\s+(?P<topic>[\w\s'-]+?))?[\s.!?]*$",
+            name="regex:joke",
+        ),
+        RegexRule(
+            action=Action.RECIPE,
+            pattern=r"^(?:(?:please\s+)?(?:give|show)\s+me\s+)?an?\s+recipe\s+(?:for|with)\s+(?P<ingredients>[\w\s,'-]+?)[\s.!?]*$",
+            name="regex:recipe",
+        ),
+        RegexRule(
+            action=Action.RECIPE,
+            pattern=r"^recipe\s+(?:for|with)\s+(?P<ingredients>[\w\s,'-]+?)[\s.!?]*$",
+            name="regex:recipe",
+        ),
+        KeywordRule(action=Action.JOKE, keywords=("joke", "jokes", "pun", "make me laugh"), name="keyword:joke"),
+        KeywordRule(
+            action=Action.RECIPE,
+            keywords=("recipe", "recipes", "how do i cook", "how to cook", "how do i bake"),
+            name="keyword:recipe",
+        ),
+    ]
+
+
+@dataclass
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word unigrams and bigrams, trained from logged plans."""
+
+    min_examples: int = 20
+    alpha: float = 1.0
+    _word_counts: dict[Action, Counter[str]] = field(default_factory=dict, repr=False)
+    _doc_counts: Counter[Action] = field(default_factory=Counter, repr=False)
+    _totals: Counter[Action] = field(default_factory=Counter, repr=False)
+    _vocabulary: set[str] = field(default_factory=set, repr=False)
+
+    @property
+    def example_count(self) -> int:
+        return sum(self._doc_counts.values())
+
+    def fit(self, examples: Iterable[tuple[str, Plan | Action]]) -> None:
+        for user_message, label in examples:
+            self.add(user_message, label.action if isinstance(label, Plan) else label)
+
+    def add(self, user_message: str, action: Action) -> None:
+        features = _features(user_message)
+        self._word_counts.setdefault(action, Counter()).update(features)
+        self._totals[action] += len(features)
+        self._doc_counts[action] += 1
+        self._vocabulary.update(features)
+
+    def predict(self, user_message: str) -> tuple[Action, float] | None:
+        if self.example_count < self.min_examples:
+            return None
+        features = _features(user_message)
+        vocab_size = len(self._vocabulary)
+        scores: dict[Action, float] = {}
+        for action, docs in self._doc_counts.items():
+            counts = self._word_counts[action]
+            denominator = self._totals[action] + self.alpha * vocab_size
+            score = math.log(docs / self.example_count)
+            for feature in features:
+                score += math.log((counts[feature] + self.alpha) / denominator)
+            scores[action] = score
+        best = max(scores, key=scores.__getitem__)
+        top = scores[best]
+        normalizer = sum(math.exp(score - top) for score in scores.values())
+        return best, 1.0 / normalizer
+
+    @classmethod
+    def from_plan_log(cls, path: str | Path, **kwargs: Any) -> "NaiveBayesClassifier":
+        """Train from JSON lines shaped like `{"user_message": ..., "plan": {"action": ...}}`."""
+        classifier = cls(**kwargs)
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                try:
+                    action = Action(str(record["plan"]["action"]).strip().lower())
+                except (KeyError, TypeError, ValueError):
+                    continue
+                classifier.add(str(record.get("user_message", "")), action)
+        return classifier
+
+
+@dataclass
+class RouterStats:
+    total: int = 0
+    hits: int = 0
+    hits_by_source: Counter[str] = field(default_factory=Counter)
+    confidences: deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    @property
+    def fallbacks(self) -> int:
+        return self.total - self.hits
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.total if self.total else 0.0
+
+    def hit_rate_at(self, threshold: float) -> float:
+        """Hit rate the recent traffic would have had at a different threshold."""
+        if not self.confidences:
+            return 0.0
+        return sum(1 for value in self.confidences if value >= threshold) / len(self.confidences)
+
+    def snapshot(self) -> dict[str, Any]:
+        recent = list(self.confidences)
+        return {
+            "total": self.total,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": self.hit_rate,
+            "hits_by_source": dict(self.hits_by_source),
+            "mean_confidence": sum(recent) / len(recent) if recent else 0.0,
+        }
+
+
+@dataclass
+class FastPathRouter:
+    """Routes obvious messages without an LLM call; returns None when the planner should decide."""
+
+    rules: list[RouteRule] = field(default_factory=default_rules)
+    classifier: NaiveBayesClassifier | None = None
+    threshold: float = 0.85
+    learn_from_planner: bool = True
+    stats: RouterStats = field(default_factory=RouterStats)
+
+    def route(self, history: list[ChatMessage], user_message: str) -> RouteDecision | None:
+        decision = self.best_guess(user_message)
+        confidence = decision.confidence if decision else 0.0
+        self.stats.total += 1
+        self.stats.confidences.append(confidence)
+        if decision is None or confidence < self.threshold:
+            return None
+        self.stats.hits += 1
+        self.stats.hits_by_source[decision.source] += 1
+        return decision
+
+    def observe(self, user_message: str, plan: Plan) -> None:
+        """Feed an LLM planner decision back into the local classifier."""
+        if self.classifier is not None and self.learn_from_planner:
+            self.classifier.add(user_message, plan.action)
+
+    def best_guess(self, user_message: str) -> RouteDecision | None:
+        """Highest-confidence candidate, ignoring the threshold and without touching stats."""
+        candidates = [decision for rule in self.rules if (decision := rule.match(user_message))]
+        if self.classifier is not None:
+            predicted = self.classifier.predict(user_message)
+            if predicted is not None:
+                action, probability = predicted
+                candidates.append(
+                    RouteDecision(
+                        plan=Plan(action=action, reason="fast-path classifier"),
+                        confidence=probability,
+                        source="classifier",
+                    )
+                )
+        if not candidates:
+            return None
+        # Conflicting signals (e.g. "a joke about recipes") are left to the LLM planner.
+        if len({decision.plan.action for decision in candidates}) > 1:
+            return None
+        return max(candidates, key=lambda decision: decision.confidence)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def _features(text: str) -> list[str]:
+    words = _normalize(text).split()
+    return words + [f"{left} {right}" for left, right in zip(words, words[1:])]
@@ -0,0 +1,545 @@
+"""Rate-limit-aware scheduling for LLM calls, admitting planner calls ahead of skill calls."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+from .llm import (
+    LLMClient,
+    acomplete,
+    acomplete_json,
+    astream_completion,
+    astream_json,
+    complete_json,
+    stream_completion,
+)
+from .schemas import ChatMessage
+from .tracing import annotate, llm_attributes
+
+T = TypeVar("T")
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+_RETRYABLE_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "OverloadedError",
+    "RateLimitError",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+}
+
+
+class Priority(IntEnum):
+    PLANNER = 0
+    SKILL = 1
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+
+
+@dataclass
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`; reservations may run into debt."""
+
+    rate: float
+    capacity: float
+    clock: Callable[[], float] = time.monotonic
+    _tokens: float = field(init=False, repr=False)
+    _updated: float = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._tokens = self.capacity
+        self._updated = self.clock()
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens and return the seconds to wait until they are covered."""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+
+@dataclass
+class AIMDLimit:
+    """Concurrency limit: +1 per limit's worth of fast successes, cut on 429s and slow calls."""
+
+    initial: int = 8
+    minimum: int = 1
+    maximum: int = 64
+    latency_target_seconds: float | None = None
+    backoff_factor: float = 0.5
+    slow_factor: float = 0.9
+    value: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.value = float(self.initial)
+
+    @property
+    def current(self) -> int:
+        return max(self.minimum, int(self.value))
+
+    def on_success(self, latency: float) -> None:
+        if self.latency_target_seconds is not None and latency > self.latency_target_seconds:
+            self.value = max(self.minimum, self.value * self.slow_factor)
+        else:
+            self.value = min(self.maximum, self.value + 1 / self.value)
+
+    def on_rate_limited(self) -> None:
+        self.value = max(self.minimum, self.value * self.backoff_factor)
+
+
+@dataclass
+class LaneStats:
+    calls: int = 0
+    rate_limited: int = 0
+    retries: int = 0
+    failures: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    waits: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.waits += 1
+        self.total_wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "failures": self.failures,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_wait_seconds": self.total_wait_seconds / self.waits if self.waits else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "wake", "state")
+
+    def __init__(self, priority: int, seq: int, wake: Callable[[], None]) -> None:
+        self.priority, self.seq, self.wake, self.state = priority, seq, wake, "waiting"
+
+    def __lt__(self, other: _Waiter) -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+@dataclass
+class _Lane:
+    concurrency: AIMDLimit
+    requests: TokenBucket | None
+    tokens: TokenBucket | None
+    stats: LaneStats = field(default_factory=LaneStats)
+    in_flight: int = 0
+    blocked_until: float = 0.0
+    waiters: list[_Waiter] = field(default_factory=list)
+
+
+@dataclass
+class LLMScheduler:
+    """Shared admission control for LLM calls, with one rate-limited lane per provider/model.
+
+    `limits` is keyed by `provider:model` or `provider`; lanes without an entry use
+    `default_limits`.
+    """
+
+    limits: dict[str, RateLimits] = field(default_factory=dict)
+    default_limits: RateLimits = field(default_factory=RateLimits)
+    initial_concurrency: int = 8
+    min_concurrency: int = 1
+    max_concurrency: int = 64
+    latency_target_seconds: float | None = None
+    max_retries: int = 3
+    backoff_base_seconds: float = 0.5
+    backoff_max_seconds: float = 20.0
+    clock: Callable[[], float] = time.monotonic
+    sleep: Callable[[float], None] = time.sleep
+    asleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    jitter: Callable[[], float] = random.random
+    _lanes: dict[str, _Lane] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _seq: itertools.count = field(default_factory=itertools.count, init=False, repr=False)
+
+    def wrap(self, llm: LLMClient, priority: Priority = Priority.SKILL) -> ScheduledLLM:
+        return ScheduledLLM(llm=llm, scheduler=self, priority=priority)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {
+                key: {**lane.stats.snapshot(), "in_flight": lane.in_flight, "concurrency_limit": lane.concurrency.current}
+                for key, lane in self._lanes.items()
+            }
+
+    def run(self, llm: LLMClient, priority: Priority, messages: list[ChatMessage], call: Callable[[], T]) -> T:
+        key, lane = self._lane(llm)
+        attempt = 0
+        while True:
+            queued_at = self.clock()
+            self._acquire(lane, priority)
+            try:
+                self.sleep(self._capacity_delay(lane, messages))
+                started = self._admitted(lane, queued_at)
+                result = call()
+            except Exception as exc:
+                delay = self._failed(lane, exc, attempt)
+                if delay is None:
+                    raise
+            else:
+                self._succeeded(key, lane, self.clock() - started)
+                return result
+            finally:
+                self._release(lane)
+            self.sleep(delay)
+            attempt += 1
+
+    async def arun(
+        self, llm: LLMClient, priority: Priority, messages: list[ChatMessage], call: Callable[[], Awaitable[T]]
+    ) -> T:
+        key, lane = self._lane(llm)
+        attempt = 0
+        while True:
+            queued_at = self.clock()
+            await self._aacquire(lane, priority)
+            try:
+                await self.asleep(self._capacity_delay(lane, messages))
+                started = self._admitted(lane, queued_at)
+                result = await call()
+            except Exception as exc:
+                delay = self._failed(lane, exc, attempt)
+                if delay is None:
+                    raise
+            else:
+                self._succeeded(key, lane, self.clock() - started)
+                return result
+            finally:
+                self._release(lane)
+            await self.asleep(delay)
+            attempt += 1
+
+    def stream(
+        self, llm: LLMClient, priority: Priority, messages: list[ChatMessage], open_stream: Callable[[], Iterator[str]]
+    ) -> Iterator[str]:
+        """Hold a slot for the whole stream; retry only before the first delta arrives."""
+        key, lane = self._lane(llm)
+        attempt = 0
+        while True:
+            queued_at = self.clock()
+            self._acquire(lane, priority)
+            yielded = False
+            try:
+                self.sleep(self._capacity_delay(lane, messages))
+                started = self._admitted(lane, queued_at)
+                for delta in open_stream():
+                    yielded = True
+                    yield delta
+            except Exception as exc:
+                # Text already reached the caller, so record the failure but never retry.
+                delay = self._failed(lane, exc, self.max_retries if yielded else attempt)
+                if delay is None:
+                    raise
+            else:
+                self._succeeded(key, lane, self.clock() - started)
+                return
+            finally:
+                self._release(lane)
+            self.sleep(delay)
+            attempt += 1
+
+    async def astream(
+        self,
+        llm: LLMClient,
+        priority: Priority,
+        messages: list[ChatMessage],
+        open_stream: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        key, lane = self._lane(llm)
+        attempt = 0
+        while True:
+            queued_at = self.clock()
+            await self._aacquire(lane, priority)
+            yielded = False
+            try:
+                await self.asleep(self._capacity_delay(lane, messages))
+                started = self._admitted(lane, queued_at)
+                async for delta in open_stream():
+                    yielded = True
+                    yield delta
+            except Exception as exc:
+                # Text already reached the caller, so record the failure but never retry.
+                delay = self._failed(lane, exc, self.max_retries if yielded else attempt)
+                if delay is None:
+                    raise
+            else:
+                self._succeeded(key, lane, self.clock() - started)
+                return
+            finally:
+                self._release(lane)
+            await self.asleep(delay)
+            attempt += 1
+
+    def _lane(self, llm: LLMClient) -> tuple[str, _Lane]:
+        attributes = llm_attributes(llm)
+        key = f"{attributes['provider']}:{attributes['model']}"
+        with self._lock:
+            lane = self._lanes.get(key)
+            if lane is None:
+                limits = self.limits.get(key) or self.limits.get(str(attributes["provider"])) or self.default_limits
+                lane = self._lanes[key] = _Lane(
+                    concurrency=AIMDLimit(
+                        initial=self.initial_concurrency,
+                        minimum=self.min_concurrency,
+                        maximum=self.max_concurrency,
+                        latency_target_seconds=self.latency_target_seconds,
+                    ),
+                    requests=_per_minute_bucket(limits.requests_per_minute, self.clock),
+                    tokens=_per_minute_bucket(limits.tokens_per_minute, self.clock),
+                )
+            return key, lane
+
+    def _acquire(self, lane: _Lane, priority: Priority) -> None:
+        event = threading.Event()
+        waiter = self._enqueue(lane, priority, event.set)
+        if waiter is not None:
+            event.wait()
+
+    async def _aacquire(self, lane: _Lane, priority: Priority) -> None:
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: admitted.done() or admitted.set_result(None))
+
+        waiter = self._enqueue(lane, priority, wake)
+        if waiter is None:
+            return
+        try:
+            await admitted
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.state == "admitted":
+                    self._release_locked(lane)
+                else:
+                    waiter.state = "cancelled"
+                    lane.stats.queue_depth -= 1
+            raise
+
+    def _enqueue(self, lane: _Lane, priority: Priority, wake: Callable[[], None]) -> _Waiter | None:
+        with self._lock:
+            if not lane.waiters and lane.in_flight < lane.concurrency.current:
+                lane.in_flight += 1
+                return None
+            waiter = _Waiter(int(priority), next(self._seq), wake)
+            heapq.heappush(lane.waiters, waiter)
+            lane.stats.queue_depth += 1
+            lane.stats.max_queue_depth = max(lane.stats.max_queue_depth, lane.stats.queue_depth)
+            return waiter
+
+    def _release(self, lane: _Lane) -> None:
+        with self._lock:
+            self._release_locked(lane)
+
+    def _release_locked(self, lane: _Lane) -> None:
+        lane.in_flight -= 1
+        self._dispatch_locked(lane)
+
+    def _dispatch_locked(self, lane: _Lane) -> None:
+        while lane.waiters and lane.in_flight < lane.concurrency.current:
+            waiter = heapq.heappop(lane.waiters)
+            if waiter.state == "cancelled":
+                continue
+            waiter.state = "admitted"
+            lane.stats.queue_depth -= 1
+            lane.in_flight += 1
+            waiter.wake()
+
+    def _capacity_delay(self, lane: _Lane, messages: list[ChatMessage]) -> float:
+        delay = max(0.0, lane.blocked_until - self.clock())
+        if lane.requests is not None:
+            delay = max(delay, lane.requests.reserve(1))
+        if lane.tokens is not None:
+            delay = max(delay, lane.tokens.reserve(_estimate_tokens(messages)))
+        return delay
+
+    def _admitted(self, lane: _Lane, queued_at: float) -> float:
+        started = self.clock()
+        with self._lock:
+            lane.stats.record_wait(started - queued_at)
+        return started
+
+    def _succeeded(self, key: str, lane: _Lane, latency: float) -> None:
+        with self._lock:
+            lane.stats.calls += 1
+            lane.concurrency.on_success(latency)
+            # A higher limit may admit more waiters straight away.
+            self._dispatch_locked(lane)
+        annotate(scheduler_lane=key)
+
+    def _failed(self, lane: _Lane, exc: Exception, attempt: int) -> float | None:
+        """Record the failure and return the backoff before retrying, or None to give up."""
+        status = _status_code(exc)
+        rate_limited = status == 429 or type(exc).__name__ in {"RateLimitError", "ResourceExhausted"}
+        retryable = (
+            rate_limited
+            or status in _RETRYABLE_STATUS
+            or type(exc).__name__ in _RETRYABLE_NAMES
+            or isinstance(exc, (ConnectionError, TimeoutError))
+        )
+        with self._lock:
+            if rate_limited:
+                lane.stats.rate_limited += 1
+                lane.concurrency.on_rate_limited()
+            if not retryable or attempt >= self.max_retries:
+                lane.stats.failures += 1
+                return None
+            lane.stats.retries += 1
+            # Full jitter spreads retries from concurrent callers apart.
+            delay = self.jitter() * min(self.backoff_max_seconds, self.backoff_base_seconds * 2**attempt)
+            retry_after = _retry_after(exc)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if rate_limited:
+                # Everyone on this lane waits, not just the caller that hit the limit.
+                lane.blocked_until = max(lane.blocked_until, self.clock() + delay)
+            return delay
+
+
+@dataclass
+class ScheduledLLM:
+    """An `LLMClient` whose calls go through an `LLMScheduler` at a fixed priority."""
+
+    llm: LLMClient
+    scheduler: LLMScheduler
+    priority: Priority = Priority.SKILL
+
+    @property
+    def provider(self) -> Any:
+        return llm_attributes(self.llm)["provider"]
+
+    @property
+    def model(self) -> Any:
+        return llm_attributes(self.llm)["model"]
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        return self.scheduler.run(
+            self.llm, self.priority, messages, lambda: self.llm.complete(messages, temperature=temperature)
+        )
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        return await self.scheduler.arun(
+            self.llm, self.priority, messages, lambda: acomplete(self.llm, messages, temperature=temperature)
+        )
+
+    def complete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        return self.scheduler.run(
+            self.llm,
+            self.priority,
+            messages,
+            lambda: complete_json(
+                self.llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+            ),
+        )
+
+    async def acomplete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        return await self.scheduler.arun(
+            self.llm,
+            self.priority,
+            messages,
+            lambda: acomplete_json(
+                self.llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+            ),
+        )
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        return self.scheduler.stream(
+            self.llm, self.priority, messages, lambda: stream_completion(self.llm, messages, temperature=temperature)
+        )
+
+    def astream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> AsyncIterator[str]:
+        return self.scheduler.astream(
+            self.llm, self.priority, messages, lambda: astream_completion(self.llm, messages, temperature=temperature)
+        )
+
+    def astream_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        return self.scheduler.astream(
+            self.llm,
+            self.priority,
+            messages,
+            lambda: astream_json(
+                self.llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+            ),
+        )
+
+
+def _per_minute_bucket(per_minute: float | None, clock: Callable[[], float]) -> TokenBucket | None:
+    if not per_minute:
+        return None
+    # A minute's budget may be spent in a burst, as provider limits allow.
+    return TokenBucket(rate=per_minute / 60.0, capacity=per_minute, clock=clock)
+
+
+def _estimate_tokens(messages: list[ChatMessage]) -> int:
+    # Four characters per token is close enough for budgeting and needs no tokenizer.
+    return max(1, sum(len(msg.content) for msg in messages) // 4)
+
+
+def _status_code(exc: Exception) -> int | None:
+    for candidate in (exc, getattr(exc, "response", None)):
+        for attribute in ("status_code", "status", "code"):
+            value = getattr(candidate, attribute, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def _retry_after(exc: Exception) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -11,7 +11,7 @@ class Role(str, Enum):
     ASSISTANT = "assistant"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ChatMessage:
     role: Role
     content: str
@@ -0,0 +1,409 @@
+"""HTTP/WebSocket chat server, one conversation per session id: `python -m agentic_chatbot.server`."""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+from urllib.parse import unquote
+
+from .agent import AgenticChatbot
+from .schemas import AgentResponse, ChatMessage, Role
+from .sessions import InMemorySessionStore, SessionStore, session_store_from_url
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_REASONS = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+class ServerOverloaded(RuntimeError):
+    """Raised instead of queueing a turn once the relevant queue is full."""
+
+
+@dataclass
+class ServerStats:
+    turns: int = 0
+    rejected: int = 0
+    errors: int = 0
+
+    def snapshot(self) -> dict[str, int]:
+        return {"turns": self.turns, "rejected": self.rejected, "errors": self.errors}
+
+
+@dataclass
+class _SessionSlot:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: int = 0
+
+
+@dataclass
+class ConversationService:
+    """Runs each session's turns in arrival order; full queues raise `ServerOverloaded`."""
+
+    agent: AgenticChatbot
+    store: SessionStore = field(default_factory=InMemorySessionStore)
+    max_concurrent_turns: int = 64
+    max_pending_per_session: int = 8
+    max_queued_turns: int = 1024
+    stats: ServerStats = field(default_factory=ServerStats)
+    _slots: dict[str, _SessionSlot] = field(default_factory=dict, init=False, repr=False)
+    _queued: int = field(default=0, init=False, repr=False)
+    _semaphore: asyncio.Semaphore | None = field(default=None, init=False, repr=False)
+
+    async def respond(self, session_id: str, user_message: str) -> AgentResponse:
+        async with self._turn(session_id):
+            history = await self._store_call(self.store.load, session_id)
+            try:
+                response = await self.agent.arespond(history, user_message)
+            except Exception:
+                self.stats.errors += 1
+                raise
+            await self._save_turn(session_id, user_message, response)
+            self.stats.turns += 1
+            return response
+
+    async def stream(self, session_id: str, user_message: str) -> AsyncIterator[str | AgentResponse]:
+        """Yield text chunks as the skill produces them, then the final `AgentResponse`."""
+        async with self._turn(session_id):
+            history = await self._store_call(self.store.load, session_id)
+            response: AgentResponse | None = None
+            try:
+                async for chunk in self.agent.astream_respond(history, user_message):
+                    if isinstance(chunk, AgentResponse):
+                        response = chunk
+                    yield chunk
+            except Exception:
+                self.stats.errors += 1
+                raise
+            if response is not None:
+                await self._save_turn(session_id, user_message, response)
+                self.stats.turns += 1
+
+    async def history(self, session_id: str) -> list[ChatMessage]:
+        return await self._store_call(self.store.load, session_id)
+
+    async def reset(self, session_id: str) -> None:
+        async with self._turn(session_id):
+            await self._store_call(self.store.delete, session_id)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**self.stats.snapshot(), "queued": self._queued, "active_sessions": len(self._slots)}
+
+    @asynccontextmanager
+    async def _turn(self, session_id: str) -> AsyncIterator[None]:
+        slot = self._slots.get(session_id)
+        if self._queued >= self.max_queued_turns or (slot is not None and slot.pending >= self.max_pending_per_session):
+            self.stats.rejected += 1
+            raise ServerOverloaded(f"Too many queued turns for session {session_id!r}")
+        if slot is None:
+            slot = self._slots[session_id] = _SessionSlot()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_turns)
+        slot.pending += 1
+        self._queued += 1
+        try:
+            # asyncio.Lock wakes waiters first-in first-out, which keeps a session's turns in order.
+            async with slot.lock, self._semaphore:
+                yield
+        finally:
+            slot.pending -= 1
+            self._queued -= 1
+            if slot.pending == 0:
+                del self._slots[session_id]
+
+    async def _save_turn(self, session_id: str, user_message: str, response: AgentResponse) -> None:
+        turn = [
+            ChatMessage(role=Role.USER, content=user_message),
+            ChatMessage(role=Role.ASSISTANT, content=response.content),
+        ]
+        await self._store_call(self.store.append, session_id, turn)
+
+    async def _store_call(self, method: Callable[..., Any], *args: Any) -> Any:
+        if getattr(self.store, "blocking", True):
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+
+@dataclass
+class _Request:
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ChatServer:
+    """Serves `ConversationService` over HTTP, streaming turns over `/sessions/{id}/ws`."""
+
+    service: ConversationService
+    host: str = "127.0.0.1"
+    port: int = 8000
+    max_body_bytes: int = 64 * 1024
+    _server: asyncio.AbstractServer | None = field(default=None, init=False, repr=False)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _HTTPError as exc:
+                    await _write_response(writer, exc.status, {"error": str(exc)}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                if request.headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(request, reader, writer)
+                    return
+                status, payload, headers = await self._dispatch(request)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                await _write_response(writer, status, payload, keep_alive=keep_alive, headers=headers)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> _Request | None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise _HTTPError(413, "Request headers too large") from None
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            raise _HTTPError(400, "Malformed request line") from None
+        headers = {}
+        for line in header_lines:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise _HTTPError(400, "Invalid Content-Length") from None
+        if length > self.max_body_bytes:
+            raise _HTTPError(413, f"Request body exceeds {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return _Request(method=method.upper(), path=unquote(target.split("?", 1)[0]), headers=headers, body=body)
+
+    async def _dispatch(self, request: _Request) -> tuple[int, Any, dict[str, str]]:
+        try:
+            return (*await self._route(request), {})
+        except _HTTPError as exc:
+            return exc.status, {"error": str(exc)}, {}
+        except ServerOverloaded as exc:
+            return 429, {"error": str(exc)}, {"Retry-After": "1"}
+        except Exception as exc:
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}, {}
+
+    async def _route(self, request: _Request) -> tuple[int, Any]:
+        parts = [part for part in request.path.split("/") if part]
+        if parts == ["healthz"]:
+            return 200, {"status": "ok", **self.service.snapshot()}
+        if len(parts) < 2 or parts[0] != "sessions":
+            raise _HTTPError(404, f"No route for {request.path}")
+        session_id, rest = parts[1], parts[2:]
+        if rest == ["messages"] and request.method == "POST":
+            response = await self.service.respond(session_id, _message_from(request.body))
+            return 200, _response_payload(response)
+        if rest == ["messages"] and request.method == "GET":
+            history = await self.service.history(session_id)
+            return 200, {"messages": [{"role": msg.role.value, "content": msg.content} for msg in history]}
+        if not rest and request.method == "DELETE":
+            await self.service.reset(session_id)
+            return 204, None
+        if rest in (["messages"], []):
+            raise _HTTPError(405, f"{request.method} not allowed on {request.path}")
+        raise _HTTPError(404, f"No route for {request.path}")
+
+    async def _websocket(self, request: _Request, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        parts = [part for part in request.path.split("/") if part]
+        key = request.headers.get("sec-websocket-key")
+        if len(parts) != 3 or parts[0] != "sessions" or parts[2] != "ws" or not key:
+            await _write_response(writer, 404, {"error": f"No WebSocket route for {request.path}"}, keep_alive=False)
+            return
+        session_id = parts[1]
+        accept = base64.b64encode(hashlib.sha1((key + _WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        # Turns on one socket are handled one after another, so the socket itself is the queue.
+        while (text := await _read_ws_message(reader, writer, self.max_body_bytes)) is not None:
+            try:
+                async for chunk in self.service.stream(session_id, _message_from(text.encode())):
+                    if isinstance(chunk, AgentResponse):
+                        event = {"type": "response", **_response_payload(chunk)}
+                    else:
+                        event = {"type": "delta", "content": chunk}
+                    await _write_ws_frame(writer, 0x1, json.dumps(event).encode())
+            except _HTTPError as exc:
+                await _write_ws_frame(writer, 0x1, _ws_error(exc.status, exc))
+            except ServerOverloaded as exc:
+                await _write_ws_frame(writer, 0x1, _ws_error(429, exc))
+            except Exception as exc:
+                await _write_ws_frame(writer, 0x1, _ws_error(500, f"{type(exc).__name__}: {exc}"))
+
+
+def _message_from(body: bytes) -> str:
+    try:
+        data = json.loads(body or b"{}")
+    except json.JSONDecodeError:
+        raise _HTTPError(400, "Body must be JSON") from None
+    message = data.get("message") if isinstance(data, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        raise _HTTPError(400, "Body must be a JSON object with a non-empty 'message' string")
+    return message.strip()
+
+
+def _response_payload(response: AgentResponse) -> dict[str, Any]:
+    return {"content": response.content, "action": response.action.value}
+
+
+def _ws_error(status: int, error: object) -> bytes:
+    return json.dumps({"type": "error", "status": status, "error": str(error)}).encode()
+
+
+async def _write_response(
+    writer: asyncio.StreamWriter,
+    status: int,
+    payload: Any,
+    *,
+    keep_alive: bool,
+    headers: dict[str, str] | None = None,
+) -> None:
+    body = b"" if payload is None else json.dumps(payload).encode()
+    lines = [
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if body:
+        lines.append("Content-Type: application/json")
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+
+
+async def _read_ws_message(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, limit: int) -> str | None:
+    """Read one text message, answering pings; None once the client closes."""
+    message = bytearray()
+    while True:
+        first, second = await reader.readexactly(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", await reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await reader.readexactly(8))
+        if len(message) + length > limit:
+            await _write_ws_frame(writer, 0x8, struct.pack("!H", 1009))
+            return None
+        mask = await reader.readexactly(4) if second & 0x80 else b""
+        payload = await reader.readexactly(length)
+        if mask:
+            payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+        if opcode == 0x8:
+            await _write_ws_frame(writer, 0x8, payload[:2])
+            return None
+        if opcode == 0x9:
+            await _write_ws_frame(writer, 0xA, payload)
+            continue
+        if opcode == 0xA:
+            continue
+        message += payload
+        if first & 0x80:
+            try:
+                return message.decode()
+            except UnicodeDecodeError:
+                await _write_ws_frame(writer, 0x8, struct.pack("!H", 1007))
+                return None
+
+
+async def _write_ws_frame(writer: asyncio.StreamWriter, opcode: int, payload: bytes) -> None:
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    writer.write(header + payload)
+    await writer.drain()
+
+
+def main() -> None:
+    from .factory import build_default_agent, load_env_file
+
+    load_env_file()
+    service = ConversationService(
+        agent=build_default_agent(),
+        store=session_store_from_url(os.getenv("SESSION_STORE_URL")),
+        max_concurrent_turns=int(os.getenv("SERVER_MAX_CONCURRENT_TURNS", "64")),
+        max_pending_per_session=int(os.getenv("SERVER_MAX_PENDING_PER_SESSION", "8")),
+        max_queued_turns=int(os.getenv("SERVER_MAX_QUEUED_TURNS", "1024")),
+    )
+    server = ChatServer(
+        service=service,
+        host=os.getenv("SERVER_HOST", "127.0.0.1"),
+        port=int(os.getenv("SERVER_PORT", "8000")),
+    )
+
+    async def run() -> None:
+        await server.start()
+        print(f"Agentic chatbot server listening on {server.url}")
+        await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
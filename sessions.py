@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ClassVar, Protocol
+
+from .schemas import ChatMessage, Role
+from .transcript import Transcript
+
+
+class SessionStore(Protocol):
+    def load(self, session_id: str) -> list[ChatMessage]:
+        ...
+
+    def append(self, session_id: str, messages: list[ChatMessage]) -> None:
+        ...
+
+    def delete(self, session_id: str) -> None:
+        ...
+
+
+@dataclass
+class InMemorySessionStore:
+    """Per-process store; the least recently used session is dropped past `max_sessions`.
+
+    Sessions are append-only transcripts, so `load` hands out a prefix view instead of
+    copying the history.
+    """
+
+    # Never blocks, so the server calls it directly instead of on a worker thread.
+    blocking: ClassVar[bool] = False
+
+    max_sessions: int = 10_000
+    max_messages: int | None = None
+    _sessions: OrderedDict[str, Transcript] = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def load(self, session_id: str) -> Transcript:
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                return Transcript()
+            self._sessions.move_to_end(session_id)
+            return history.prefix(len(history))
+
+    def append(self, session_id: str, messages: list[ChatMessage]) -> None:
+        with self._lock:
+            history = self._sessions.setdefault(session_id, Transcript())
+            history.extend(messages)
+            if self.max_messages is not None and len(history) > self.max_messages:
+                self._sessions[session_id] = Transcript(history[len(history) - self.max_messages :])
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """Durable store in one SQLite file, shared safely between threads."""
+
+    def __init__(self, path: str | Path = ":memory:", *, max_messages: int | None = None) -> None:
+        self.max_messages = max_messages
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " session_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " role TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " PRIMARY KEY (session_id, seq))"
+            )
+
+    def load(self, session_id: str) -> list[ChatMessage]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+        return [ChatMessage(role=Role(role), content=content) for role, content in rows]
+
+    def append(self, session_id: str, messages: list[ChatMessage]) -> None:
+        with self._lock, self._connection:
+            (last,) = self._connection.execute(
+                "SELECT COALESCE(MAX(seq), -1) FROM messages WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self._connection.executemany(
+                "INSERT INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(session_id, last + 1 + offset, msg.role.value, msg.content) for offset, msg in enumerate(messages)],
+            )
+            if self.max_messages is not None:
+                self._connection.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND seq <= ?",
+                    (session_id, last + len(messages) - self.max_messages),
+                )
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+@dataclass
+class RedisSessionStore:
+    """Stores each session as a Redis list of JSON messages.
+
+    `client` only needs the redis-py methods `rpush`, `lrange`, `ltrim`, `expire` and
+    `delete`, so any compatible client (or an in-process stand-in) works.
+    """
+
+    client: Any
+    prefix: str = "agentic_chatbot:session:"
+    ttl_seconds: int | None = 7 * 24 * 3600
+    max_messages: int | None = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "RedisSessionStore":
+        import redis
+
+        return cls(client=redis.Redis.from_url(url), **kwargs)
+
+    def load(self, session_id: str) -> list[ChatMessage]:
+        return [_decode_message(raw) for raw in self.client.lrange(self._key(session_id), 0, -1)]
+
+    def append(self, session_id: str, messages: list[ChatMessage]) -> None:
+        if not messages:
+            return
+        key = self._key(session_id)
+        self.client.rpush(key, *(_encode_message(msg) for msg in messages))
+        if self.max_messages is not None:
+            self.client.ltrim(key, -self.max_messages, -1)
+        if self.ttl_seconds is not None:
+            self.client.expire(key, self.ttl_seconds)
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self._key(session_id))
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+
+def session_store_from_url(url: str | None) -> SessionStore:
+    """`memory` (default), `sqlite:///path/to/file.db` or `redis://host:port/db`."""
+    if not url or url == "memory":
+        return InMemorySessionStore()
+    if url.startswith("sqlite://"):
+        return SQLiteSessionStore(url[len("sqlite://") :].removeprefix("/") or ":memory:")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore.from_url(url)
+    raise ValueError(f"Unsupported session store URL: {url}")
+
+
+def _encode_message(message: ChatMessage) -> str:
+    return json.dumps({"role": message.role.value, "content": message.content})
+
+
+def _decode_message(raw: str | bytes) -> ChatMessage:
+    data = json.loads(raw)
+    return ChatMessage(role=Role(data["role"]), content=data["content"])
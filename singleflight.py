@@ -0,0 +1,245 @@
+"""Single-flight coalescing of identical in-flight requests; nothing outlives the call."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterator, TypeVar
+
+from .llm import (
+    LLMClient,
+    acomplete,
+    acomplete_json,
+    astream_completion,
+    astream_json,
+    complete_json,
+    mark_text_fallback,
+    stream_completion,
+    track_structured,
+)
+from .schemas import ChatMessage
+from .tracing import annotate, llm_attributes
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    calls: int = 0
+    upstream: int = 0
+    coalesced: int = 0
+    shared_errors: int = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "upstream": self.upstream,
+            "coalesced": self.coalesced,
+            "shared_errors": self.shared_errors,
+            "coalesced_ratio": self.coalesced / self.calls if self.calls else 0.0,
+        }
+
+
+@dataclass
+class _Call:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+    followers: int = 0
+
+
+@dataclass
+class SingleFlight:
+    """Coalesce concurrent calls by key, across threads (`do`) or tasks on one event loop (`ado`)."""
+
+    stats: SingleFlightStats = field(default_factory=SingleFlightStats)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _calls: dict[Hashable, _Call] = field(default_factory=dict, init=False, repr=False)
+    _tasks: dict[tuple[int, Hashable], asyncio.Task[Any]] = field(default_factory=dict, init=False, repr=False)
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        with self._lock:
+            self.stats.calls += 1
+            pending = self._calls.get(key)
+            if pending is None:
+                pending = self._calls[key] = _Call()
+                self.stats.upstream += 1
+                leader = True
+            else:
+                pending.followers += 1
+                self.stats.coalesced += 1
+                leader = False
+        if not leader:
+            annotate(single_flight="coalesced")
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+        try:
+            pending.result = call()
+            return pending.result
+        except BaseException as exc:
+            pending.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if pending.error is not None:
+                    self.stats.shared_errors += pending.followers
+            pending.done.set()
+
+    async def ado(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            self.stats.calls += 1
+            task = self._tasks.get(loop_key)
+            leader = task is None
+            if task is None:
+                task = self._tasks[loop_key] = asyncio.ensure_future(call())
+                self.stats.upstream += 1
+                task.add_done_callback(lambda done: self._finished(loop_key, done))
+            else:
+                self.stats.coalesced += 1
+        if not leader:
+            annotate(single_flight="coalesced")
+        try:
+            # Shielded so one caller giving up does not cancel the call the others are waiting on.
+            return await asyncio.shield(task)
+        except Exception:
+            if not leader:
+                with self._lock:
+                    self.stats.shared_errors += 1
+            raise
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
+
+    def _finished(self, loop_key: tuple[int, Hashable], task: asyncio.Task[Any]) -> None:
+        with self._lock:
+            if self._tasks.get(loop_key) is task:
+                del self._tasks[loop_key]
+        if not task.cancelled():
+            # Mark the outcome retrieved even when every waiter has gone away.
+            task.exception()
+
+
+@dataclass
+class SingleFlightLLM:
+    """An `LLMClient` that shares one upstream call among identical concurrent deterministic calls.
+
+    Only `temperature == 0` calls are coalesced: at any other temperature each caller is
+    owed its own sample. Streams always pass through.
+    """
+
+    llm: LLMClient
+    flight: SingleFlight = field(default_factory=SingleFlight)
+
+    @property
+    def provider(self) -> Any:
+        return llm_attributes(self.llm)["provider"]
+
+    @property
+    def model(self) -> Any:
+        return llm_attributes(self.llm)["model"]
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        call = partial(self.llm.complete, messages, temperature=temperature)
+        if temperature != 0:
+            return call()
+        return self.flight.do(self._key("complete", messages), call)
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        call = partial(acomplete, self.llm, messages, temperature=temperature)
+        if temperature != 0:
+            return await call()
+        return await self.flight.ado(self._key("complete", messages), call)
+
+    def complete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        call = partial(
+            complete_json, self.llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+        )
+        if temperature != 0:
+            return call()
+        key = self._key("complete_json", messages, schema, name, max_tokens)
+        return _shared_outcome(self.flight.do(key, partial(_tracked, call)))
+
+    async def acomplete_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> str:
+        call = partial(
+            acomplete_json, self.llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens
+        )
+        if temperature != 0:
+            return await call()
+        key = self._key("complete_json", messages, schema, name, max_tokens)
+        return _shared_outcome(await self.flight.ado(key, partial(_atracked, call)))
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> Iterator[str]:
+        return stream_completion(self.llm, messages, temperature=temperature)
+
+    def astream(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> AsyncIterator[str]:
+        return astream_completion(self.llm, messages, temperature=temperature)
+
+    def astream_json(
+        self,
+        messages: list[ChatMessage],
+        *,
+        schema: dict[str, Any],
+        name: str,
+        temperature: float = 0.2,
+        max_tokens: int | None = None,
+    ) -> AsyncIterator[str]:
+        return astream_json(self.llm, messages, schema=schema, name=name, temperature=temperature, max_tokens=max_tokens)
+
+    def _key(
+        self,
+        method: str,
+        messages: list[ChatMessage],
+        schema: dict[str, Any] | None = None,
+        name: str | None = None,
+        max_tokens: int | None = None,
+    ) -> Hashable:
+        # Exact contents rather than a digest: a collision here would hand one caller another's answer.
+        # The client's identity keeps stages on the same model but different endpoints or keys apart.
+        transcript = tuple((message.role.value, message.content) for message in messages)
+        return (method, self.provider, self.model, id(self.llm), transcript, canonical_json(schema), name, max_tokens)
+
+
+def _tracked(call: Callable[[], str]) -> tuple[str, bool]:
+    with track_structured() as outcome:
+        return call(), outcome.native
+
+
+async def _atracked(call: Callable[[], Awaitable[str]]) -> tuple[str, bool]:
+    with track_structured() as outcome:
+        return await call(), outcome.native
+
+
+def _shared_outcome(result: tuple[str, bool]) -> str:
+    # Followers never ran the call, so replay whether the leader fell back to plain text.
+    text, native = result
+    if not native:
+        mark_text_fallback()
+    return text
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
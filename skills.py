@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import asyncio
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Protocol
+from typing import Any, AsyncIterator, ClassVar, Hashable, Iterator, Protocol
 
-from .llm import LLMClient
-from .mcp import MCPConnectorRegistry
+from .cache import ResponseCache
+from .llm import LLMClient, acomplete, astream_completion, stream_completion
+from .mcp import MCPConnectorRegistry, ToolInvocation, ToolResult
 from .schemas import Action, AgentResponse, ChatMessage, Plan, Role
+from .tracing import annotate, llm_attributes, llm_span, span
+from .transcript import Transcript
 
 
 class Skill(Protocol):
@@ -13,6 +18,41 @@ class Skill(Protocol):
         ...
 
 
+async def arun_skill(skill: Skill, plan: Plan, history: list[ChatMessage], user_message: str) -> AgentResponse:
+    """Await `skill.arun` when available, otherwise run the sync skill off the event loop."""
+    native = getattr(skill, "arun", None)
+    if native is not None:
+        return await native(plan, history, user_message)
+    return await asyncio.to_thread(skill.run, plan, history, user_message)
+
+
+def stream_skill(
+    skill: Skill, plan: Plan, history: list[ChatMessage], user_message: str
+) -> Iterator[str | AgentResponse]:
+    """Yield text chunks followed by the final `AgentResponse`, falling back to `skill.run`."""
+    native = getattr(skill, "stream", None)
+    if native is not None:
+        yield from native(plan, history, user_message)
+        return
+    response = skill.run(plan, history, user_message)
+    yield response.content
+    yield response
+
+
+async def astream_skill(
+    skill: Skill, plan: Plan, history: list[ChatMessage], user_message: str
+) -> AsyncIterator[str | AgentResponse]:
+    """Async `stream_skill`: `skill.astream` when available, otherwise the awaited `arun_skill`."""
+    native = getattr(skill, "astream", None)
+    if native is not None:
+        async for chunk in native(plan, history, user_message):
+            yield chunk
+        return
+    response = await arun_skill(skill, plan, history, user_message)
+    yield response.content
+    yield response
+
+
 @dataclass
 class ClarifySkill:
     default_question: str = "Could you clarify what you want: a joke or a food recipe?"
@@ -21,130 +61,325 @@ class ClarifySkill:
         question = plan.clarifying_question or self.default_question
         return AgentResponse(content=question, action=Action.CLARIFY)
 
+    async def arun(self, plan: Plan, history: list[ChatMessage], user_message: str) -> AgentResponse:
+        return self.run(plan, history, user_message)
+
+    def stream(self, plan: Plan, history: list[ChatMessage], user_message: str) -> Iterator[str | AgentResponse]:
+        response = self.run(plan, history, user_message)
+        yield response.content
+        yield response
+
+    async def astream(
+        self, plan: Plan, history: list[ChatMessage], user_message: str
+    ) -> AsyncIterator[str | AgentResponse]:
+        for chunk in self.stream(plan, history, user_message):
+            yield chunk
+
 
 @dataclass
-class JokeSkill:
+class _LLMSkill(ABC):
     llm: LLMClient
     mcp_registry: MCPConnectorRegistry | None = None
+    temperature: float | None = None
+    response_cache: ResponseCache | None = None
+    # Responses are only cached at or below this temperature; above it they are meant to vary.
+    cache_max_temperature: float | None = None
+
+    action: ClassVar[Action]
+    default_system_prompt: ClassVar[str]
+    default_temperature: ClassVar[float]
+    default_cache_max_temperature: ClassVar[float] = 0.5
+
+    def __post_init__(self) -> None:
+        if self.temperature is None:
+            self.temperature = self.default_temperature
+        if self.cache_max_temperature is None:
+            self.cache_max_temperature = self.default_cache_max_temperature
 
     def run(self, plan: Plan, history: list[ChatMessage], user_message: str) -> AgentResponse:
-        topic = str(plan.params.get("topic", "anything")).strip() or "anything"
-        style = str(plan.params.get("style", "clean")).strip() or "clean"
+        with span("skill.run", action=self.action.value):
+            system_prompt = self._resolve_system_prompt(
+                default_prompt=self.default_system_prompt,
+                plan=plan,
+                user_message=user_message,
+            )
+            tool_context = self._resolve_tool_context(plan=plan, user_message=user_message)
+            cache_key = self._cache_key(plan, system_prompt, tool_context)
+            if cached := self._cached(cache_key):
+                return cached
+            messages = self._messages(system_prompt, history, self._build_prompt(plan, tool_context))
+            with llm_span(self.action.value, self.llm, messages) as call:
+                content = self.llm.complete(messages, temperature=self.temperature)
+                call.set_attribute("response_chars", len(content))
+            return self._store(cache_key, content.strip())
+
+    async def arun(self, plan: Plan, history: list[ChatMessage], user_message: str) -> AgentResponse:
+        with span("skill.run", action=self.action.value):
+            system_prompt, tool_context = await asyncio.gather(
+                self._aresolve_system_prompt(
+                    default_prompt=self.default_system_prompt,
+                    plan=plan,
+                    user_message=user_message,
+                ),
+                self._aresolve_tool_context(plan=plan, user_message=user_message),
+            )
+            cache_key = self._cache_key(plan, system_prompt, tool_context)
+            if cached := self._cached(cache_key):
+                return cached
+            messages = self._messages(system_prompt, history, self._build_prompt(plan, tool_context))
+            with llm_span(self.action.value, self.llm, messages) as call:
+                content = await acomplete(self.llm, messages, temperature=self.temperature)
+                call.set_attribute("response_chars", len(content))
+            return self._store(cache_key, content.strip())
+
+    def stream(self, plan: Plan, history: list[ChatMessage], user_message: str) -> Iterator[str | AgentResponse]:
         system_prompt = self._resolve_system_prompt(
-            default_prompt="You are a concise comedian.",
+            default_prompt=self.default_system_prompt,
             plan=plan,
             user_message=user_message,
         )
         tool_context = self._resolve_tool_context(plan=plan, user_message=user_message)
-        prompt = (
-            "Write one short joke. "
-            f"Topic: {topic}. Style: {style}. "
-            "Keep it safe for work."
-            f"{tool_context}"
+        cache_key = self._cache_key(plan, system_prompt, tool_context)
+        if cached := self._cached(cache_key):
+            yield cached.content
+            yield cached
+            return
+        messages = self._messages(system_prompt, history, self._build_prompt(plan, tool_context))
+        # No span across the yields below: consumers may resume the generator in another context.
+        parts: list[str] = []
+        for delta in stream_completion(self.llm, messages, temperature=self.temperature):
+            if not parts:
+                # Match `run`, whose content is stripped; leading whitespace is never shown.
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+            parts.append(delta)
+            yield delta
+        content = "".join(parts).strip()
+        if not content:
+            raise ValueError(f"{self.action.value} skill produced empty content")
+        yield self._store(cache_key, content)
+
+    async def astream(
+        self, plan: Plan, history: list[ChatMessage], user_message: str
+    ) -> AsyncIterator[str | AgentResponse]:
+        system_prompt, tool_context = await asyncio.gather(
+            self._aresolve_system_prompt(
+                default_prompt=self.default_system_prompt,
+                plan=plan,
+                user_message=user_message,
+            ),
+            self._aresolve_tool_context(plan=plan, user_message=user_message),
         )
-        content = self.llm.complete(
-            [
-                ChatMessage(role=Role.SYSTEM, content=system_prompt),
-                *history,
-                ChatMessage(role=Role.USER, content=prompt),
-            ],
-            temperature=0.8,
+        cache_key = self._cache_key(plan, system_prompt, tool_context)
+        if cached := self._cached(cache_key):
+            yield cached.content
+            yield cached
+            return
+        messages = self._messages(system_prompt, history, self._build_prompt(plan, tool_context))
+        parts: list[str] = []
+        async for delta in astream_completion(self.llm, messages, temperature=self.temperature):
+            if not parts:
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+            parts.append(delta)
+            yield delta
+        content = "".join(parts).strip()
+        if not content:
+            raise ValueError(f"{self.action.value} skill produced empty content")
+        yield self._store(cache_key, content)
+
+    def request_key(self, plan: Plan, user_message: str) -> Hashable:
+        """Everything besides history that determines this skill's LLM request for `plan`."""
+        return (
+            self._build_prompt(plan, ""),
+            repr(self._prompt_request(plan, user_message)),
+            repr(self._tool_requests(plan, user_message)),
+        )
+
+    @abstractmethod
+    def _build_prompt(self, plan: Plan, tool_context: str) -> str:
+        ...
+
+    def _cache_key(self, plan: Plan, system_prompt: str, tool_context: str) -> str | None:
+        if self.response_cache is None or self.temperature > self.cache_max_temperature:
+            return None
+        model = llm_attributes(self.llm)["model"]
+        return self.response_cache.key(self.action, plan.params, system_prompt, tool_context, model)
+
+    def _cached(self, cache_key: str | None) -> AgentResponse | None:
+        if cache_key is None:
+            return None
+        content = self.response_cache.get(cache_key)
+        annotate(response_cache_hit=content is not None)
+        return AgentResponse(content=content, action=self.action) if content is not None else None
+
+    def _store(self, cache_key: str | None, content: str) -> AgentResponse:
+        if cache_key is not None and content:
+            self.response_cache.put(cache_key, content)
+        return AgentResponse(content=content, action=self.action)
+
+    def _messages(self, system_prompt: str, history: list[ChatMessage], prompt: str) -> Transcript:
+        return Transcript([ChatMessage(role=Role.SYSTEM, content=system_prompt)]).extended(
+            history, [ChatMessage(role=Role.USER, content=prompt)]
         )
-        return AgentResponse(content=content.strip(), action=Action.JOKE)
 
     def _resolve_system_prompt(self, *, default_prompt: str, plan: Plan, user_message: str) -> str:
-        if not self.mcp_registry:
+        request = self._prompt_request(plan, user_message)
+        if request is None:
             return default_prompt
+        with span("skill.resolve_system_prompt", alias=request[0]):
+            try:
+                resolved = self.mcp_registry.get_prompt(*request)
+                return resolved.strip() or default_prompt
+            except (KeyError, ValueError):
+                return default_prompt
+
+    async def _aresolve_system_prompt(self, *, default_prompt: str, plan: Plan, user_message: str) -> str:
+        request = self._prompt_request(plan, user_message)
+        if request is None:
+            return default_prompt
+        with span("skill.resolve_system_prompt", alias=request[0]):
+            try:
+                resolved = await _call_async(self.mcp_registry, "get_prompt", *request)
+                return resolved.strip() or default_prompt
+            except (KeyError, ValueError):
+                return default_prompt
+
+    def _resolve_tool_context(self, *, plan: Plan, user_message: str) -> str:
+        requests = self._tool_requests(plan, user_message)
+        if not requests:
+            return ""
+        with span("skill.resolve_tool_context", tools=len(requests)):
+            return self._call_tools(requests)
+
+    async def _aresolve_tool_context(self, *, plan: Plan, user_message: str) -> str:
+        requests = self._tool_requests(plan, user_message)
+        if not requests:
+            return ""
+        with span("skill.resolve_tool_context", tools=len(requests)):
+            return await self._acall_tools(requests)
+
+    def _call_tools(self, requests: list[tuple[str, dict[str, Any]]]) -> str:
+        if len(requests) == 1:
+            try:
+                return _format_tool_context(self.mcp_registry.call_tool(*requests[0]))
+            except (KeyError, ValueError):
+                return ""
+
+        call_tools = getattr(self.mcp_registry, "call_tools", None)
+        if call_tools is None:
+            return _format_tool_results([_sequential_call(self.mcp_registry, *request) for request in requests])
+        return _format_tool_results(call_tools([ToolInvocation(*request) for request in requests]))
+
+    async def _acall_tools(self, requests: list[tuple[str, dict[str, Any]]]) -> str:
+        if len(requests) == 1:
+            try:
+                return _format_tool_context(await _call_async(self.mcp_registry, "call_tool", *requests[0]))
+            except (KeyError, ValueError):
+                return ""
+
+        acall_tools = getattr(self.mcp_registry, "acall_tools", None)
+        if acall_tools is None:
+            return await asyncio.to_thread(self._call_tools, requests)
+        return _format_tool_results(await acall_tools([ToolInvocation(*request) for request in requests]))
+
+    def _prompt_request(self, plan: Plan, user_message: str) -> tuple[str, dict[str, Any]] | None:
+        if not self.mcp_registry:
+            return None
         alias = plan.params.get("mcp_prompt")
         if not isinstance(alias, str) or not alias.strip():
-            return default_prompt
+            return None
 
         prompt_args = _dict_param(plan.params.get("prompt_args"))
         prompt_args.setdefault("user_message", user_message)
-        try:
-            resolved = self.mcp_registry.get_prompt(alias.strip(), prompt_args)
-            return resolved.strip() or default_prompt
-        except (KeyError, ValueError):
-            return default_prompt
+        return alias.strip(), prompt_args
 
-    def _resolve_tool_context(self, *, plan: Plan, user_message: str) -> str:
+    def _tool_requests(self, plan: Plan, user_message: str) -> list[tuple[str, dict[str, Any]]]:
+        """Tool calls from `mcp_tool`/`tool_args` and from `mcp_tools: [{"tool", "args"}, ...]`."""
         if not self.mcp_registry:
-            return ""
+            return []
+        requests: list[tuple[str, dict[str, Any]]] = []
         alias = plan.params.get("mcp_tool")
-        if not isinstance(alias, str) or not alias.strip():
-            return ""
+        if isinstance(alias, str) and alias.strip():
+            requests.append((alias.strip(), _dict_param(plan.params.get("tool_args"))))
 
-        tool_args = _dict_param(plan.params.get("tool_args"))
-        tool_args.setdefault("user_message", user_message)
-        try:
-            tool_result = self.mcp_registry.call_tool(alias.strip(), tool_args).strip()
-            return f"\nExternal tool context:\n{tool_result}" if tool_result else ""
-        except (KeyError, ValueError):
-            return ""
+        entries = plan.params.get("mcp_tools")
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, str):
+                entry = {"tool": entry}
+            if not isinstance(entry, dict):
+                continue
+            alias = entry.get("tool")
+            if isinstance(alias, str) and alias.strip():
+                requests.append((alias.strip(), _dict_param(entry.get("args"))))
+
+        for _, tool_args in requests:
+            tool_args.setdefault("user_message", user_message)
+        return requests
 
 
 @dataclass
-class RecipeSkill:
-    llm: LLMClient
-    mcp_registry: MCPConnectorRegistry | None = None
+class JokeSkill(_LLMSkill):
+    action: ClassVar[Action] = Action.JOKE
+    default_system_prompt: ClassVar[str] = "You are a concise comedian."
+    default_temperature: ClassVar[float] = 0.8
 
-    def run(self, plan: Plan, history: list[ChatMessage], user_message: str) -> AgentResponse:
+    def _build_prompt(self, plan: Plan, tool_context: str) -> str:
+        topic = str(plan.params.get("topic", "anything")).strip() or "anything"
+        style = str(plan.params.get("style", "clean")).strip() or "clean"
+        return (
+            "Write one short joke. "
+            f"Topic: {topic}. Style: {style}. "
+            "Keep it safe for work."
+            f"{tool_context}"
+        )
+
+
+@dataclass
+class RecipeSkill(_LLMSkill):
+    action: ClassVar[Action] = Action.RECIPE
+    default_system_prompt: ClassVar[str] = "You are a precise cooking assistant."
+    default_temperature: ClassVar[float] = 0.4
+
+    def _build_prompt(self, plan: Plan, tool_context: str) -> str:
         ingredients = plan.params.get("ingredients", "")
         servings = plan.params.get("servings", 2)
         diet = plan.params.get("diet", "none")
-        system_prompt = self._resolve_system_prompt(
-            default_prompt="You are a precise cooking assistant.",
-            plan=plan,
-            user_message=user_message,
-        )
-        tool_context = self._resolve_tool_context(plan=plan, user_message=user_message)
-
-        prompt = (
+        return (
             "Create a practical recipe with title, ingredients, and steps. "
             f"Ingredients preference: {ingredients}. Servings: {servings}. Diet: {diet}. "
             "Keep it under 12 steps and include estimated total time."
             f"{tool_context}"
         )
-        content = self.llm.complete(
-            [
-                ChatMessage(role=Role.SYSTEM, content=system_prompt),
-                *history,
-                ChatMessage(role=Role.USER, content=prompt),
-            ],
-            temperature=0.4,
-        )
-        return AgentResponse(content=content.strip(), action=Action.RECIPE)
 
-    def _resolve_system_prompt(self, *, default_prompt: str, plan: Plan, user_message: str) -> str:
-        if not self.mcp_registry:
-            return default_prompt
-        alias = plan.params.get("mcp_prompt")
-        if not isinstance(alias, str) or not alias.strip():
-            return default_prompt
 
-        prompt_args = _dict_param(plan.params.get("prompt_args"))
-        prompt_args.setdefault("user_message", user_message)
-        try:
-            resolved = self.mcp_registry.get_prompt(alias.strip(), prompt_args)
-            return resolved.strip() or default_prompt
-        except (KeyError, ValueError):
-            return default_prompt
+async def _call_async(target: Any, method: str, *args: Any) -> Any:
+    native = getattr(target, f"a{method}", None)
+    if native is not None:
+        return await native(*args)
+    return await asyncio.to_thread(getattr(target, method), *args)
 
-    def _resolve_tool_context(self, *, plan: Plan, user_message: str) -> str:
-        if not self.mcp_registry:
-            return ""
-        alias = plan.params.get("mcp_tool")
-        if not isinstance(alias, str) or not alias.strip():
-            return ""
 
-        tool_args = _dict_param(plan.params.get("tool_args"))
-        tool_args.setdefault("user_message", user_message)
-        try:
-            tool_result = self.mcp_registry.call_tool(alias.strip(), tool_args).strip()
-            return f"\nExternal tool context:\n{tool_result}" if tool_result else ""
-        except (KeyError, ValueError):
-            return ""
+def _sequential_call(registry: Any, alias: str, arguments: dict[str, Any]) -> ToolResult:
+    try:
+        return ToolResult(alias=alias, text=registry.call_tool(alias, arguments).strip())
+    except (KeyError, ValueError) as exc:
+        return ToolResult(alias=alias, error=str(exc))
+
+
+def _format_tool_context(tool_result: str) -> str:
+    tool_result = tool_result.strip()
+    return f"\nExternal tool context:\n{tool_result}" if tool_result else ""
+
+
+def _format_tool_results(results: list[ToolResult]) -> str:
+    # Failed calls are dropped, as with a single tool; order follows the plan.
+    sections = [f"[{result.alias}]\n{result.text}" for result in results if result.ok and result.text]
+    return _format_tool_context("\n\n".join(sections))
 
 
 def _dict_param(value: Any) -> dict[str, Any]:
-    return value if isinstance(value, dict) else {}
+    # Copy so `setdefault("user_message", ...)` never mutates the plan's params.
+    return dict(value) if isinstance(value, dict) else {}
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, Protocol
+
+from .cache import _normalize_params
+from .history import estimate_tokens
+from .router import FastPathRouter
+from .schemas import Action, AgentResponse, ChatMessage, Plan, Role
+
+
+class ActionPredictor(Protocol):
+    def predict(self, history: list[ChatMessage], user_message: str) -> Plan | None:
+        ...
+
+    def observe(self, history: list[ChatMessage], user_message: str, plan: Plan, response: AgentResponse) -> None:
+        ...
+
+
+@dataclass
+class PreviousActionPredictor:
+    """Guesses that a conversation continues with the action of its previous turn."""
+
+    max_conversations: int = 10_000
+    _last: OrderedDict[str, Plan] = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def predict(self, history: list[ChatMessage], user_message: str) -> Plan | None:
+        with self._lock:
+            previous = self._last.get(_history_key(history))
+        if previous is None:
+            return None
+        return Plan(action=previous.action, reason="speculative: previous action", params=previous.params)
+
+    def observe(self, history: list[ChatMessage], user_message: str, plan: Plan, response: AgentResponse) -> None:
+        key = _history_key(
+            [
+                *history,
+                ChatMessage(role=Role.USER, content=user_message),
+                ChatMessage(role=Role.ASSISTANT, content=response.content),
+            ]
+        )
+        with self._lock:
+            self._last[key] = plan
+            self._last.move_to_end(key)
+            while len(self._last) > self.max_conversations:
+                self._last.popitem(last=False)
+
+
+@dataclass
+class KeywordPredictor:
+    """Guesses from the fast-path rules without applying their confidence threshold.
+
+    Only guesses that carry params (from the regex rules) are made by default: the planner
+    nearly always fills in a topic or ingredients, so a bare keyword guess is rarely accepted.
+    """
+
+    router: FastPathRouter = field(default_factory=FastPathRouter)
+    min_confidence: float = 0.5
+    require_params: bool = True
+
+    def predict(self, history: list[ChatMessage], user_message: str) -> Plan | None:
+        decision = self.router.best_guess(user_message)
+        if decision is None or decision.confidence < self.min_confidence:
+            return None
+        if self.require_params and not decision.plan.params:
+            return None
+        return decision.plan
+
+    def observe(self, history: list[ChatMessage], user_message: str, plan: Plan, response: AgentResponse) -> None:
+        return None
+
+
+@dataclass
+class ChainedPredictor:
+    predictors: list[ActionPredictor]
+
+    def predict(self, history: list[ChatMessage], user_message: str) -> Plan | None:
+        for predictor in self.predictors:
+            guess = predictor.predict(history, user_message)
+            if guess is not None:
+                return guess
+        return None
+
+    def observe(self, history: list[ChatMessage], user_message: str, plan: Plan, response: AgentResponse) -> None:
+        for predictor in self.predictors:
+            predictor.observe(history, user_message, plan, response)
+
+
+@dataclass
+class SpeculationStats:
+    attempts: int = 0
+    hits: int = 0
+    misses: int = 0
+    skipped: int = 0
+    wasted_tokens: int = 0
+
+    @property
+    def accuracy(self) -> float:
+        return self.hits / self.attempts if self.attempts else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "accuracy": self.accuracy,
+            "wasted_tokens": self.wasted_tokens,
+        }
+
+
+@dataclass
+class Speculation:
+    """Opt-in speculative skill execution for `AgenticChatbot.arespond`.
+
+    The predicted skill starts alongside the planner. Its result is used only when the
+    real plan would have produced the same skill request, up to the case and whitespace of
+    param values; otherwise it is cancelled and its (estimated) token cost is recorded as waste.
+    """
+
+    predictor: ActionPredictor = field(
+        default_factory=lambda: ChainedPredictor([KeywordPredictor(), PreviousActionPredictor()])
+    )
+    count_tokens: Callable[[str], int] = estimate_tokens
+    stats: SpeculationStats = field(default_factory=SpeculationStats)
+
+    def guess(self, history: list[ChatMessage], user_message: str) -> Plan | None:
+        guess = self.predictor.predict(history, user_message)
+        # Clarify is free, so there is nothing to gain by speculating on it.
+        if guess is None or guess.action == Action.CLARIFY:
+            self.stats.skipped += 1
+            return None
+        self.stats.attempts += 1
+        return guess
+
+    def accepts(self, skill: Any, guess: Plan, plan: Plan, user_message: str) -> bool:
+        accepted = guess.action == plan.action and _request_key(skill, guess, user_message) == _request_key(
+            skill, plan, user_message
+        )
+        if accepted:
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+        return accepted
+
+    def discard(self, task: asyncio.Task[AgentResponse], history: list[ChatMessage], user_message: str) -> None:
+        """Cancel a losing speculative run and account for the tokens it consumed."""
+        wasted = sum(self.count_tokens(msg.content) for msg in history) + self.count_tokens(user_message)
+        if task.done() and not task.cancelled() and task.exception() is None:
+            wasted += self.count_tokens(task.result().content)
+        self.stats.wasted_tokens += wasted
+        task.cancel()
+
+    def observe(self, history: list[ChatMessage], user_message: str, plan: Plan, response: AgentResponse) -> None:
+        self.predictor.observe(history, user_message, plan, response)
+
+
+def _request_key(skill: Any, plan: Plan, user_message: str) -> Hashable:
+    # Same normalization as the response cache, so "Cats" from a regex matches the planner's "cats".
+    plan = Plan(action=plan.action, reason=plan.reason, params=_normalize_params(plan.params))
+    request_key = getattr(skill, "request_key", None)
+    if request_key is not None:
+        return request_key(plan, user_message)
+    return repr(sorted(plan.params.items()))
+
+
+def _history_key(history: list[ChatMessage]) -> str:
+    digest = hashlib.sha1()
+    for msg in history:
+        digest.update(msg.role.value.encode())
+        digest.update(b"\x1f")
+        digest.update(msg.content.encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
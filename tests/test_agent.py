@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import asyncio
 import unittest
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
 from agentic_chatbot.agent import AgenticChatbot
-from agentic_chatbot.schemas import Action, AgentResponse, Plan
+from agentic_chatbot.history import SUMMARY_PREFIX, HistoryBudget, HistoryManager, LLMSummarizer
+from agentic_chatbot.schemas import Action, AgentResponse, ChatMessage, Plan, Role
+from agentic_chatbot.skills import JokeSkill
 
 
 @dataclass
@@ -72,6 +75,131 @@ class AgentTests(unittest.TestCase):
         self.assertEqual(recipe.call_count, 0)
         self.assertEqual(clarify.call_count, 1)
 
+    def test_stream_respond_falls_back_to_run_for_non_streaming_skills(self) -> None:
+        planner = StubPlanner(next_plan=Plan(action=Action.JOKE, reason="joke"))
+        clarify = StubSkill(response=AgentResponse(content="clarify", action=Action.CLARIFY))
+        joke = StubSkill(response=AgentResponse(content="joke", action=Action.JOKE))
+        recipe = StubSkill(response=AgentResponse(content="recipe", action=Action.RECIPE))
+        agent = AgenticChatbot(planner=planner, clarify_skill=clarify, joke_skill=joke, recipe_skill=recipe)
+
+        chunks = list(agent.stream_respond(history=[], user_message="tell joke"))
+
+        self.assertEqual(chunks, ["joke", AgentResponse(content="joke", action=Action.JOKE)])
+        self.assertEqual(joke.call_count, 1)
+
+
+class AsyncAgentTests(unittest.IsolatedAsyncioTestCase):
+    async def test_arespond_falls_back_to_sync_planner_and_skills(self) -> None:
+        planner = StubPlanner(next_plan=Plan(action=Action.RECIPE, reason="recipe"))
+        clarify = StubSkill(response=AgentResponse(content="clarify", action=Action.CLARIFY))
+        joke = StubSkill(response=AgentResponse(content="joke", action=Action.JOKE))
+        recipe = StubSkill(response=AgentResponse(content="recipe", action=Action.RECIPE))
+        agent = AgenticChatbot(planner=planner, clarify_skill=clarify, joke_skill=joke, recipe_skill=recipe)
+
+        response = await agent.arespond(history=[], user_message="recipe")
+
+        self.assertEqual(response.content, "recipe")
+        self.assertEqual(recipe.call_count, 1)
+        self.assertEqual(joke.call_count, 0)
+
+    async def test_arespond_summarizes_history_without_blocking_calls(self) -> None:
+        @dataclass
+        class AsyncSummaryLLM:
+            def complete(self, messages, *, temperature=0.2):
+                raise AssertionError("sync summarizer call on the event loop")
+
+            async def acomplete(self, messages, *, temperature=0.2):
+                return "user likes cats"
+
+        @dataclass
+        class RecordingPlanner:
+            histories: list = field(default_factory=list)
+
+            async def aplan(self, history, user_message):
+                self.histories.append(history)
+                return Plan(action=Action.JOKE, reason="joke")
+
+        budget = HistoryBudget(max_tokens=200, keep_turns=1)
+        manager = HistoryManager(
+            planner_budget=budget, skill_budget=budget, summarizer=LLMSummarizer(llm=AsyncSummaryLLM())
+        )
+        history = [
+            ChatMessage(role=role, content=f"turn {index}")
+            for index in range(3)
+            for role in (Role.USER, Role.ASSISTANT)
+        ]
+        planner = RecordingPlanner()
+        joke = StubSkill(response=AgentResponse(content="joke", action=Action.JOKE))
+        agent = AgenticChatbot(
+            planner=planner,
+            clarify_skill=StubSkill(response=AgentResponse(content="clarify", action=Action.CLARIFY)),
+            joke_skill=joke,
+            recipe_skill=StubSkill(response=AgentResponse(content="recipe", action=Action.RECIPE)),
+            history_manager=manager,
+        )
+
+        await agent.arespond(history=history, user_message="joke")
+
+        (planner_history,) = planner.histories
+        self.assertEqual(planner_history[0].content, f"{SUMMARY_PREFIX}user likes cats")
+        self.assertEqual(planner_history[1:], history[-2:])
+
+    async def test_early_dispatch_runs_skill_before_planner_finishes(self) -> None:
+        planner_done = asyncio.Event()
+
+        @dataclass
+        class EarlyPlanner:
+            async def aplan_early(self, history, user_message):
+                async def finish() -> Plan:
+                    await planner_done.wait()
+                    return Plan(action=Action.JOKE, reason="full plan")
+
+                return Plan(action=Action.JOKE, reason="partial"), asyncio.create_task(finish())
+
+        clarify = StubSkill(response=AgentResponse(content="clarify", action=Action.CLARIFY))
+        joke = StubSkill(response=AgentResponse(content="joke", action=Action.JOKE))
+        recipe = StubSkill(response=AgentResponse(content="recipe", action=Action.RECIPE))
+        agent = AgenticChatbot(
+            planner=EarlyPlanner(), clarify_skill=clarify, joke_skill=joke, recipe_skill=recipe, early_dispatch=True
+        )
+
+        response = await agent.arespond(history=[], user_message="joke")
+
+        self.assertEqual(response.content, "joke")
+        self.assertEqual(len(agent._pending_plans), 1)
+        planner_done.set()
+        await asyncio.gather(*agent._pending_plans)
+        await asyncio.sleep(0)
+        self.assertEqual(agent._pending_plans, set())
+
+    async def test_astream_respond_plans_and_streams_without_sync_calls(self) -> None:
+        @dataclass
+        class AsyncPlanner:
+            def plan(self, history, user_message):
+                raise AssertionError("sync planner should not be used")
+
+            async def aplan(self, history, user_message):
+                return Plan(action=Action.JOKE, reason="joke")
+
+        @dataclass
+        class AsyncStreamLLM:
+            def complete(self, messages, *, temperature=0.2):
+                raise AssertionError("sync LLM should not be used")
+
+            async def astream(self, messages, *, temperature=0.2):
+                for delta in (" Why", " not?"):
+                    yield delta
+
+        clarify = StubSkill(response=AgentResponse(content="clarify", action=Action.CLARIFY))
+        recipe = StubSkill(response=AgentResponse(content="recipe", action=Action.RECIPE))
+        agent = AgenticChatbot(
+            planner=AsyncPlanner(), clarify_skill=clarify, joke_skill=JokeSkill(llm=AsyncStreamLLM()), recipe_skill=recipe
+        )
+
+        chunks = [chunk async for chunk in agent.astream_respond(history=[], user_message="joke")]
+
+        self.assertEqual(chunks, ["Why", " not?", AgentResponse(content="Why not?", action=Action.JOKE)])
+
 
 if __name__ == "__main__":
     unittest.main()
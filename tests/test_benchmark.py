@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.benchmark import (
+    FakeMCPServer,
+    LatencyModel,
+    SimulatedLLM,
+    build_simulated_agent,
+    load_conversations,
+    load_labeled_messages,
+    percentile,
+    run_benchmark,
+    run_planner_benchmark,
+)
+from agentic_chatbot.schemas import Action
+
+
+class BenchmarkTests(unittest.TestCase):
+    def test_load_conversations_groups_by_conversation_id(self) -> None:
+        lines = [
+            {"request_id": "r1", "body": "tell me a joke"},
+            {"conversation_id": "c", "user_message": "dinner ideas"},
+            {"conversation_id": "c", "message": "something vegan"},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "log.jsonl"
+            path.write_text("\n".join(json.dumps(line) for line in lines), encoding="utf-8")
+
+            conversations = load_conversations(path)
+
+        self.assertEqual(conversations, [["tell me a joke"], ["dinner ideas", "something vegan"]])
+
+    def test_percentile_uses_nearest_rank(self) -> None:
+        values = [float(value) for value in range(1, 101)]
+
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_run_benchmark_against_fake_mcp_server(self) -> None:
+        conversations = [["tell me a joke", "now a recipe for dinner"], ["hello"]] * 3
+        with FakeMCPServer() as server:
+            agent = build_simulated_agent(SimulatedLLM(use_mcp=True), server.url)
+            response = agent.respond(history=[], user_message="a joke please")
+            report = run_benchmark(
+                conversations,
+                concurrency_levels=[1, 4],
+                agent_factory=lambda: build_simulated_agent(
+                    SimulatedLLM(latency=LatencyModel(kind="uniform", low=0.0, high=0.002), use_mcp=True),
+                    server.url,
+                ),
+                allocation_sample=3,
+            )
+
+        self.assertEqual(response.action, Action.JOKE)
+        self.assertEqual([result.concurrency for result in report.results], [1, 4])
+        self.assertTrue(all(result.turns == 9 and result.errors == 0 for result in report.results))
+        self.assertGreater(report.peak_bytes_per_turn, 0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bench.json"
+            report.save(path)
+            saved = json.loads(path.read_text(encoding="utf-8"))
+        self.assertEqual(saved["results"][1]["concurrency"], 4)
+
+    def test_planner_benchmark_reports_accuracy_per_model(self) -> None:
+        lines = [
+            {"user_message": "tell me a joke", "plan": {"action": "joke"}},
+            {"user_message": "what should I cook for dinner", "expected_action": "recipe"},
+            {"user_message": "surprise me", "plan": {"action": "joke"}},
+            {"message": "hello"},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "plans.jsonl"
+            path.write_text("\n".join(json.dumps(line) for line in lines), encoding="utf-8")
+            messages = load_labeled_messages(path)
+
+        self.assertEqual(messages[1], ("what should I cook for dinner", Action.RECIPE))
+        self.assertIsNone(messages[3][1])
+
+        report = run_planner_benchmark(messages, {"simulated": SimulatedLLM()}, concurrency=2)
+
+        (result,) = report.results
+        self.assertEqual((result.model, result.turns, result.labeled, result.correct), ("simulated", 4, 3, 2))
+        self.assertAlmostEqual(result.accuracy, 2 / 3)
+        self.assertEqual(result.invalid_json, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.benchmark import LatencyModel, SimulatedLLM, build_simulated_agent
+from agentic_chatbot.bulk import (
+    BatchRequest,
+    BulkRunner,
+    LocalBatchBackend,
+    OpenAIBatchBackend,
+    read_records,
+    use_batching,
+)
+from agentic_chatbot.llm import OpenAIChatClient
+from agentic_chatbot.planner import PLAN_JSON_SCHEMA
+from agentic_chatbot.schemas import Action, AgentResponse, ChatMessage, Role
+
+
+def message_length(row: dict[str, Any]) -> dict[str, Any]:
+    return {"length": len(row["message"])}
+
+
+def fails_on_turn_one(row: dict[str, Any]) -> dict[str, Any]:
+    if row["turn"] == 1:
+        raise ValueError("bad row")
+    return message_length(row)
+
+
+@dataclass
+class RecordingAgent:
+    delay: float = 0.01
+    fail_on: str | None = None
+    seen: list[tuple[str, int]] = field(default_factory=list)
+    active: int = 0
+    peak: int = 0
+
+    async def arespond(self, history: list[ChatMessage], user_message: str) -> AgentResponse:
+        self.seen.append((user_message, len(history)))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        if user_message == self.fail_on:
+            raise RuntimeError("provider down")
+        return AgentResponse(content=f"re: {user_message}", action=Action.CLARIFY)
+
+
+def _write_input(directory: str, rows: list[dict[str, Any]]) -> Path:
+    path = Path(directory) / "input.jsonl"
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    return path
+
+
+def _read_output(path: Path) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+CONVERSATIONS = [
+    {"id": f"{conversation}-{turn}", "conversation_id": conversation, "message": f"{conversation} turn {turn}"}
+    for turn in range(3)
+    for conversation in ("a", "b", "c", "d")
+]
+
+
+class BulkRunnerTests(unittest.TestCase):
+    def test_runs_conversations_concurrently_with_ordered_turns(self) -> None:
+        agent = RecordingAgent()
+        with tempfile.TemporaryDirectory() as directory:
+            source = _write_input(directory, [*CONVERSATIONS, {"title": "no message"}])
+            output = Path(directory) / "out.jsonl"
+
+            stats = BulkRunner(agent=agent, max_workers=2, max_pending=3).run(source, output)
+            rows = _read_output(output)
+
+        self.assertEqual(stats.snapshot(), {"completed": 12, "failed": 0, "skipped": 0, "conversations": 4})
+        self.assertEqual(agent.peak, 2)
+        for conversation in "abcd":
+            turns = [row for row in rows if row["conversation_id"] == conversation]
+            self.assertEqual([row["turn"] for row in turns], [0, 1, 2])
+        self.assertIn(("a turn 2", 4), agent.seen)
+
+    def test_resumes_from_a_partially_written_output(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            source = _write_input(directory, CONVERSATIONS)
+            output = Path(directory) / "out.jsonl"
+            BulkRunner(agent=RecordingAgent(fail_on="b turn 1")).run(source, output)
+            lines = output.read_text(encoding="utf-8").splitlines(keepends=True)
+            # Keep the first round of every conversation plus a torn line, as after a crash.
+            kept = [line for line in lines if json.loads(line)["turn"] == 0]
+            output.write_text("".join(kept) + lines[-1][:10], encoding="utf-8")
+
+            agent = RecordingAgent(fail_on="b turn 1")
+            stats = BulkRunner(agent=agent).run(source, output)
+            rows = _read_output(output)
+
+        self.assertEqual((stats.skipped, stats.completed, stats.failed), (4, 7, 1))
+        self.assertEqual(len(rows), 12)
+        self.assertIn(("a turn 1", 2), agent.seen)
+        # The failed turn is recorded but left out of the history for the next one.
+        self.assertIn(("b turn 2", 2), agent.seen)
+        self.assertEqual(next(row for row in rows if row["id"] == "b-1")["status"], "error")
+
+    def test_resume_retries_failed_turns_at_their_original_position(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            source = _write_input(directory, CONVERSATIONS)
+            output = Path(directory) / "out.jsonl"
+            BulkRunner(agent=RecordingAgent(fail_on="b turn 1")).run(source, output)
+
+            agent = RecordingAgent()
+            stats = BulkRunner(agent=agent).run(source, output)
+            rows = _read_output(output)
+            rerun = BulkRunner(agent=RecordingAgent()).run(source, output)
+
+        self.assertEqual((stats.skipped, stats.completed, stats.failed), (11, 1, 0))
+        self.assertEqual(agent.seen, [("b turn 1", 2)])
+        retried = [row for row in rows if row["id"] == "b-1"]
+        self.assertEqual([(row["status"], row["turn"]) for row in retried], [("error", 1), ("ok", 1)])
+        self.assertEqual((rerun.skipped, rerun.completed), (12, 0))
+
+    def test_evaluator_runs_in_a_process_pool(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            source = _write_input(directory, CONVERSATIONS[:4])
+            output = Path(directory) / "out.jsonl"
+            BulkRunner(agent=RecordingAgent(), cpu_workers=2, evaluator=message_length).run(source, output)
+            rows = _read_output(output)
+
+        self.assertEqual({row["evaluation"]["length"] for row in rows}, {len("a turn 0")})
+
+    def test_evaluator_errors_are_recorded_per_row(self) -> None:
+        for cpu_workers in (0, 2):
+            with self.subTest(cpu_workers=cpu_workers), tempfile.TemporaryDirectory() as directory:
+                source = _write_input(directory, CONVERSATIONS)
+                output = Path(directory) / "out.jsonl"
+                runner = BulkRunner(
+                    agent=RecordingAgent(), max_pending=2, cpu_workers=cpu_workers, evaluator=fails_on_turn_one
+                )
+                stats = runner.run(source, output)
+                rows = _read_output(output)
+
+            self.assertEqual(stats.completed, 12)
+            self.assertEqual(len(rows), 12)
+            errors = [row for row in rows if "error" in row["evaluation"]]
+            self.assertEqual({row["turn"] for row in errors}, {1})
+            self.assertEqual(errors[0]["evaluation"], {"error": "ValueError: bad row"})
+
+    def test_read_records_uses_the_requests_shape(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            source = _write_input(directory, [{"request_id": "r-1", "title": "t", "body": " Tell me a joke "}])
+            (record,) = read_records(source)
+
+        self.assertEqual((record.record_id, record.conversation_id, record.message), ("r-1", "r-1", "Tell me a joke"))
+
+
+class BatchModeTests(unittest.TestCase):
+    def test_agent_calls_are_grouped_into_local_batches(self) -> None:
+        llm = SimulatedLLM(latency=LatencyModel(kind="fixed", low=0.0))
+        backend = LocalBatchBackend(llm, polls_until_done=2)
+        agent = use_batching(
+            build_simulated_agent(llm),
+            make_backend=lambda _: backend,
+            flush_interval_seconds=0.01,
+            poll_interval_seconds=0.0,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            source = _write_input(directory, CONVERSATIONS)
+            output = Path(directory) / "out.jsonl"
+            stats = BulkRunner(agent=agent).run(source, output)
+
+        requests = sum(len(batch) for batch in backend.submitted)
+        self.assertEqual(stats.completed, 12)
+        self.assertEqual(requests, llm.calls)
+        self.assertLess(len(backend.submitted), requests)
+        self.assertIs(agent.planner.llm, agent.joke_skill.llm)
+        structured = [request for batch in backend.submitted for request in batch if request.schema is not None]
+        self.assertEqual(len(structured), 12)
+        self.assertTrue(all(request.schema is PLAN_JSON_SCHEMA and request.name == "plan" for request in structured))
+
+    def test_openai_backend_uploads_jsonl_and_parses_results(self) -> None:
+        uploads: list[bytes] = []
+
+        def create_file(*, file: tuple[str, bytes], purpose: str) -> Any:
+            uploads.append(file[1])
+            return SimpleNamespace(id="file-in")
+
+        output = "\n".join(
+            json.dumps(entry)
+            for entry in (
+                {"custom_id": "ok", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "hi"}}]}}},
+                {"custom_id": "bad", "response": {"status_code": 500, "body": {"error": "boom"}}},
+            )
+        )
+        batch = SimpleNamespace(id="batch-1", status="completed", output_file_id="file-out", error_file_id=None)
+        sdk = SimpleNamespace(
+            files=SimpleNamespace(create=create_file, content=lambda file_id: SimpleNamespace(text=output)),
+            batches=SimpleNamespace(create=lambda **_: batch, retrieve=lambda _: batch),
+        )
+        backend = OpenAIBatchBackend(OpenAIChatClient(model="gpt-test", sdk_client=sdk))
+        batch_id = backend.submit([BatchRequest("ok", [ChatMessage(role=Role.USER, content="hello")], 0.0)])
+        results = backend.results(batch_id)
+
+        self.assertTrue(backend.poll(batch_id))
+        self.assertEqual(json.loads(uploads[0])["body"]["messages"], [{"role": "user", "content": "hello"}])
+        self.assertEqual(results["ok"], "hi")
+        self.assertIsInstance(results["bad"], RuntimeError)
+
+    def test_openai_backend_sends_structured_requests_in_json_mode(self) -> None:
+        backend = OpenAIBatchBackend(OpenAIChatClient(model="gpt-test", sdk_client=SimpleNamespace()))
+        request = BatchRequest(
+            "plan", [ChatMessage(role=Role.USER, content="hello")], 0.0, schema={"type": "object"}, name="plan"
+        )
+
+        body = backend._body(request)
+
+        self.assertEqual(body["response_format"]["json_schema"]["name"], "plan")
+        self.assertEqual(body["response_format"]["json_schema"]["schema"], {"type": "object"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.cache import PlanCache, ResponseCache, TTLCache
+from agentic_chatbot.planner import Planner
+from agentic_chatbot.schemas import Action, ChatMessage, Plan, Role
+
+
+@dataclass
+class FakeClock:
+    now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@dataclass
+class CountingLLM:
+    output: str
+    calls: int = 0
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.calls += 1
+        return self.output
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_lru_eviction_and_ttl_expiry(self) -> None:
+        clock = FakeClock()
+        cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=10, clock=clock)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+
+        self.assertIsNone(cache.get("b"))
+        clock.now = 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats.evictions, 1)
+        self.assertEqual(cache.stats.expirations, 1)
+
+    def test_memory_cap_evicts_oldest(self) -> None:
+        cache: TTLCache[str, str] = TTLCache(max_entries=10, max_bytes=10, sizeof=len)
+        cache.set("a", "12345")
+        cache.set("b", "12345")
+        cache.set("c", "1")
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size_bytes, 6)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_key_normalizes_params_but_not_prompts(self) -> None:
+        key = ResponseCache.key(Action.RECIPE, {"servings": 2, "diet": " Vegan "}, "system", "")
+
+        self.assertEqual(key, ResponseCache.key(Action.RECIPE, {"diet": "vegan", "servings": 2}, "system", ""))
+        self.assertNotEqual(key, ResponseCache.key(Action.RECIPE, {"servings": 2, "diet": "vegan"}, "System", ""))
+        self.assertNotEqual(key, ResponseCache.key(Action.RECIPE, {"servings": 2, "diet": "vegan"}, "system", "tool"))
+        self.assertNotEqual(key, ResponseCache.key(Action.JOKE, {"servings": 2, "diet": "vegan"}, "system", ""))
+
+    def test_disk_tier_survives_restart_and_honours_ttl(self) -> None:
+        clock = FakeClock(now=1000.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "responses.db"
+            first = ResponseCache(path=path, ttl_seconds=60, clock=clock)
+            first.put("k", "pasta")
+            first.close()
+
+            second = ResponseCache(path=path, ttl_seconds=60, clock=clock)
+            self.assertEqual(second.get("k"), "pasta")
+            self.assertEqual(second.disk_hits, 1)
+            self.assertEqual(second.get("k"), "pasta")
+            self.assertEqual(second.disk_hits, 1)
+            self.assertEqual(second.stats.hits, 2)
+            second.close()
+
+            clock.now += 61
+            third = ResponseCache(path=path, ttl_seconds=60, clock=clock)
+            self.assertIsNone(third.get("k"))
+            third.close()
+
+    def test_disk_tier_keeps_most_recently_used_entries(self) -> None:
+        clock = FakeClock()
+        cache = ResponseCache(path=":memory:", max_entries=1, max_disk_entries=2, clock=clock)
+        for index, key in enumerate("abc"):
+            clock.now = index
+            cache.put(key, key.upper())
+
+        cache._memory.clear()
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "C")
+        cache.close()
+
+    def test_disk_tier_prunes_in_batches_not_on_every_put(self) -> None:
+        clock = FakeClock()
+        cache = ResponseCache(path=":memory:", max_entries=1, max_disk_entries=100, clock=clock)
+        deletes: list[str] = []
+        cache._disk.set_trace_callback(lambda sql: deletes.append(sql) if sql.startswith("DELETE") else None)
+        for index in range(300):
+            clock.now = index
+            cache.put(f"k{index}", "v")
+
+        rows = cache._disk.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        self.assertLessEqual(rows, 100)
+        self.assertLessEqual(len(deletes), 2 * 21)
+        cache._memory.clear()
+        self.assertEqual(cache.get("k299"), "v")
+        self.assertIsNone(cache.get("k0"))
+        cache.close()
+
+
+class PlanCacheTests(unittest.TestCase):
+    def test_exact_match_normalizes_message_and_scopes_history(self) -> None:
+        cache = PlanCache(history_window=1)
+        plan = Plan(action=Action.JOKE, reason="joke")
+        history = [ChatMessage(role=Role.USER, content="hi")]
+        cache.put(history, "Tell me a joke!", plan)
+
+        self.assertIs(cache.get(history, "  tell me a JOKE "), plan)
+        self.assertIsNone(cache.get([], "tell me a joke"))
+        self.assertEqual(cache.stats.hits, 1)
+        self.assertEqual(cache.stats.misses, 1)
+
+    def test_non_ascii_and_punctuation_only_messages_do_not_collide(self) -> None:
+        cache = PlanCache(near_duplicate_threshold=0.7)
+        plan = Plan(action=Action.JOKE, reason="joke")
+        cache.put([], "给我讲个笑话", plan)
+        cache.put([], "???", plan)
+
+        self.assertIs(cache.get([], "给我讲个笑话！"), plan)
+        self.assertIsNone(cache.get([], "红烧肉怎么做"))
+        self.assertIsNone(cache.get([], "Расскажи анекдот"))
+        self.assertIsNone(cache.get([], "!!!"))
+        self.assertEqual(len(cache), 1)
+
+    def test_near_duplicate_lookup(self) -> None:
+        cache = PlanCache(near_duplicate_threshold=0.7)
+        plan = Plan(action=Action.RECIPE, reason="food", params={"ingredients": "pancakes"})
+        cache.put([], "give me a recipe for fluffy pancakes", plan)
+
+        self.assertIs(cache.get([], "give me a recipe for fluffy pancake"), plan)
+        self.assertIsNone(cache.get([], "tell me a joke about pancakes"))
+        self.assertEqual(cache.stats.near_hits, 1)
+
+    def test_planner_reuses_cached_plan(self) -> None:
+        llm = CountingLLM(output='{"action":"joke","reason":"r","params":{"topic":"cats"}}')
+        planner = Planner(llm=llm, cache=PlanCache())
+
+        first = planner.plan(history=[], user_message="Joke about cats")
+        second = planner.plan(history=[], user_message="joke about cats")
+
+        self.assertEqual(first, second)
+        self.assertEqual(llm.calls, 1)
+
+    def test_planner_does_not_cache_unparseable_output(self) -> None:
+        llm = CountingLLM(output="not json")
+        cache = PlanCache()
+        planner = Planner(llm=llm, cache=cache)
+
+        planner.plan(history=[], user_message="hm")
+        planner.plan(history=[], user_message="hm")
+
+        self.assertEqual(llm.calls, 2)
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import importlib.util
+import json
 import os
+import subprocess
 import unittest
 from pathlib import Path
+from types import SimpleNamespace
 import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-from agentic_chatbot.factory import ChatbotFactory
+import agentic_chatbot
+from agentic_chatbot.factory import ChatbotFactory, StageConfig
 from agentic_chatbot.llm import AnthropicChatClient, GoogleChatClient, OpenAIChatClient
+from agentic_chatbot.scheduler import LLMScheduler, Priority, ScheduledLLM
 
 
 class FactoryTests(unittest.TestCase):
@@ -59,6 +65,132 @@ class FactoryTests(unittest.TestCase):
         self.assertEqual(anthropic_client.model, "claude-3-5-sonnet-latest")
         self.assertEqual(google_client.model, "gemini-2.5-flash")
 
+    def test_build_agent_uses_per_stage_clients_and_temperatures(self) -> None:
+        sdk = object()
+        factory = ChatbotFactory(
+            provider="anthropic",
+            model="claude-strong",
+            sdk_client=sdk,
+            planner_stage=StageConfig(provider="openai", model="gpt-small", sdk_client=sdk, max_tokens=64),
+            recipe_stage=StageConfig(temperature=0.1),
+        )
+
+        agent = factory.build_agent()
+
+        self.assertIsInstance(agent.planner.llm, OpenAIChatClient)
+        self.assertEqual(agent.planner.llm.model, "gpt-small")
+        self.assertEqual(agent.planner.llm.max_tokens, 64)
+        self.assertEqual(agent.planner.temperature, 0.0)
+        self.assertIs(agent.joke_skill.llm, agent.recipe_skill.llm)
+        self.assertEqual(agent.joke_skill.llm.model, "claude-strong")
+        self.assertEqual(agent.joke_skill.temperature, 0.8)
+        self.assertEqual(agent.recipe_skill.temperature, 0.1)
+
+    def test_planner_stage_max_tokens_can_raise_the_planner_cap(self) -> None:
+        requests: list[dict] = []
+
+        def create(**request: object) -> object:
+            requests.append(request)
+            message = SimpleNamespace(content='{"action":"joke","params":{},"reason":"r"}')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+        sdk = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        factory = ChatbotFactory(provider="openai", sdk_client=sdk, planner_stage=StageConfig(max_tokens=4096))
+
+        agent = factory.build_agent()
+        agent.planner.plan(history=[], user_message="tell me a joke")
+
+        self.assertEqual(agent.planner.max_tokens, 4096)
+        self.assertEqual(requests[0]["max_completion_tokens"], 4096)
+
+    def test_planner_cap_defaults_small_and_can_be_lifted_from_env(self) -> None:
+        sdk = SimpleNamespace()
+        self.assertEqual(ChatbotFactory(provider="openai", sdk_client=sdk).build_agent().planner.max_tokens, 256)
+
+        old = dict(os.environ)
+        try:
+            os.environ["PLANNER_MAX_TOKENS"] = "none"
+            factory = ChatbotFactory.from_env()
+        finally:
+            os.environ.clear()
+            os.environ.update(old)
+        factory.sdk_client = sdk
+        agent = factory.build_agent()
+
+        self.assertIsNone(agent.planner.max_tokens)
+        self.assertIsNone(agent.planner.llm.max_tokens)
+
+    def test_build_agent_routes_stages_through_shared_scheduler(self) -> None:
+        scheduler = LLMScheduler()
+        factory = ChatbotFactory(provider="openai", sdk_client=object(), scheduler=scheduler)
+
+        agent = factory.build_agent()
+
+        self.assertIsInstance(agent.planner.llm, ScheduledLLM)
+        self.assertEqual(agent.planner.llm.priority, Priority.PLANNER)
+        self.assertEqual(agent.joke_skill.llm.priority, Priority.SKILL)
+        self.assertIs(agent.joke_skill.llm.scheduler, scheduler)
+        self.assertIs(agent.planner.llm.llm, agent.recipe_skill.llm.llm)
+
+    def test_factory_from_env_reads_stage_overrides(self) -> None:
+        old = dict(os.environ)
+        try:
+            os.environ["LLM_PROVIDER"] = "anthropic"
+            os.environ["PLANNER_PROVIDER"] = "google"
+            os.environ["PLANNER_MODEL"] = "gemini-flash-lite"
+            os.environ["PLANNER_MAX_TOKENS"] = "128"
+            os.environ["GOOGLE_API_KEY"] = "google-key"
+            os.environ["JOKE_TEMPERATURE"] = "1.0"
+            for name in ("RECIPE_PROVIDER", "RECIPE_MODEL", "RECIPE_TEMPERATURE", "RECIPE_MAX_TOKENS"):
+                os.environ.pop(name, None)
+
+            factory = ChatbotFactory.from_env()
+
+            self.assertEqual(
+                factory.planner_stage,
+                StageConfig(provider="google", model="gemini-flash-lite", api_key="google-key", max_tokens=128),
+            )
+            self.assertEqual(factory.joke_stage, StageConfig(temperature=1.0))
+            self.assertIsNone(factory.recipe_stage)
+        finally:
+            os.environ.clear()
+            os.environ.update(old)
+
+
+_STARTUP_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+import openai  # the configured provider's SDK is the caller's cost, not the package's
+start = time.perf_counter()
+from agentic_chatbot.factory import build_default_agent
+build_default_agent()
+elapsed = time.perf_counter() - start
+optional = ("anthropic", "google.generativeai", "mcp", "dotenv", "agentic_chatbot.mcp_stdio",
+            "agentic_chatbot.llm_router", "agentic_chatbot.scheduler", "agentic_chatbot.server")
+print(json.dumps({"seconds": elapsed, "loaded": [name for name in optional if name in sys.modules]}))
+"""
+
+
+@unittest.skipUnless(importlib.util.find_spec("openai"), "openai SDK not installed")
+class StartupBudgetTests(unittest.TestCase):
+    budget_seconds = 1.0
+
+    def test_single_provider_agent_builds_without_optional_imports(self) -> None:
+        env = {key: value for key, value in os.environ.items() if not key.endswith(("_STAGE", "_PROVIDERS"))}
+        env.update(LLM_PROVIDER="openai", OPENAI_API_KEY="test-key", LLM_FALLBACK_PROVIDERS="", LLM_SCHEDULER="")
+        root = str(Path(agentic_chatbot.__path__[0]).parent)
+        result = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, root],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+        report = json.loads(result.stdout)
+
+        self.assertEqual(report["loaded"], [])
+        self.assertLess(report["seconds"], self.budget_seconds)
+
 
 if __name__ == "__main__":
     unittest.main()
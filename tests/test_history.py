@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.history import SUMMARY_PREFIX, ExtractiveSummarizer, HistoryBudget, HistoryManager
+from agentic_chatbot.schemas import ChatMessage, Role
+
+
+@dataclass
+class RecordingSummarizer:
+    calls: list[int] = field(default_factory=list)
+
+    def summarize(self, previous_summary: str, messages: list[ChatMessage]) -> str:
+        self.calls.append(len(messages))
+        return "\n".join(filter(None, [previous_summary, *(msg.content for msg in messages)]))
+
+
+def _conversation(turns: int) -> list[ChatMessage]:
+    history: list[ChatMessage] = []
+    for index in range(turns):
+        history.append(ChatMessage(role=Role.USER, content=f"question {index}"))
+        history.append(ChatMessage(role=Role.ASSISTANT, content=f"answer {index}"))
+    return history
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+class HistoryManagerTests(unittest.TestCase):
+    def test_short_history_is_returned_verbatim(self) -> None:
+        manager = HistoryManager()
+        history = _conversation(2)
+
+        self.assertEqual(manager.for_skill(history), history)
+
+    def test_older_turns_fold_into_summary(self) -> None:
+        summarizer = RecordingSummarizer()
+        manager = HistoryManager(
+            planner_budget=HistoryBudget(max_tokens=100, keep_turns=1),
+            summarizer=summarizer,
+            count_tokens=_word_count,
+        )
+        history = _conversation(3)
+
+        compacted = manager.for_planner(history)
+
+        self.assertEqual(compacted[1:], history[-2:])
+        self.assertEqual(compacted[0].role, Role.SYSTEM)
+        self.assertTrue(compacted[0].content.startswith(SUMMARY_PREFIX))
+        self.assertIn("question 0", compacted[0].content)
+
+    def test_summary_is_updated_incrementally(self) -> None:
+        summarizer = RecordingSummarizer()
+        manager = HistoryManager(
+            skill_budget=HistoryBudget(max_tokens=100, keep_turns=1),
+            summarizer=summarizer,
+            count_tokens=_word_count,
+        )
+        history = _conversation(3)
+        manager.for_skill(history)
+        history += _conversation(1)
+
+        manager.for_skill(history)
+
+        self.assertEqual(summarizer.calls, [4, 2])
+
+    def test_tail_shrinks_to_fit_budget(self) -> None:
+        manager = HistoryManager(
+            skill_budget=HistoryBudget(max_tokens=5, keep_turns=3),
+            summarizer=ExtractiveSummarizer(),
+            count_tokens=_word_count,
+        )
+        history = _conversation(3)
+
+        compacted = manager.for_skill(history)
+
+        self.assertEqual(compacted[-2:], history[-2:])
+        self.assertLessEqual(sum(_word_count(msg.content) for msg in compacted), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
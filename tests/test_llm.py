@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.llm import AnthropicChatClient, GoogleChatClient, OpenAIChatClient
+from agentic_chatbot.schemas import ChatMessage, Role
+
+CONVERSATION = [
+    ChatMessage(role=Role.SYSTEM, content="You are a routing planner."),
+    ChatMessage(role=Role.SYSTEM, content="Summary of the earlier conversation:\nuser: hi"),
+    ChatMessage(role=Role.USER, content="tell me a joke"),
+    ChatMessage(role=Role.ASSISTANT, content="Why did the chicken cross the road?"),
+    ChatMessage(role=Role.USER, content="another one"),
+]
+
+
+class RecordingEndpoint:
+    def __init__(self, response: object) -> None:
+        self.response = response
+        self.requests: list[dict] = []
+
+    def create(self, **request: object) -> object:
+        self.requests.append(request)
+        return self.response
+
+
+class AnthropicRequestTests(unittest.TestCase):
+    def _client(self, usage: object) -> tuple[AnthropicChatClient, RecordingEndpoint]:
+        endpoint = RecordingEndpoint(SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=usage))
+        return AnthropicChatClient(model="claude", sdk_client=SimpleNamespace(messages=endpoint)), endpoint
+
+    def test_keeps_turns_and_marks_cache_breakpoints(self) -> None:
+        client, endpoint = self._client(usage=None)
+
+        client.complete(CONVERSATION)
+
+        request = endpoint.requests[0]
+        self.assertEqual([block["text"] for block in request["system"]], [CONVERSATION[0].content, CONVERSATION[1].content])
+        self.assertEqual(request["system"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("cache_control", request["system"][1])
+        self.assertEqual([turn["role"] for turn in request["messages"]], ["user", "assistant", "user"])
+        self.assertEqual(request["messages"][1]["content"][-1]["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("cache_control", request["messages"][2]["content"][-1])
+
+    def test_records_cached_and_uncached_input_tokens(self) -> None:
+        usage = SimpleNamespace(input_tokens=20, cache_read_input_tokens=900, cache_creation_input_tokens=80)
+        client, _ = self._client(usage=usage)
+
+        client.complete(CONVERSATION)
+
+        self.assertEqual(client.usage.input_tokens, 1000)
+        self.assertEqual(client.usage.cached_input_tokens, 900)
+        self.assertEqual(client.usage.uncached_input_tokens, 100)
+        self.assertEqual(client.usage.cache_write_tokens, 80)
+        self.assertAlmostEqual(client.usage.cached_ratio, 0.9)
+
+
+class OpenAIUsageTests(unittest.TestCase):
+    def test_records_cached_prompt_tokens(self) -> None:
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+            usage=SimpleNamespace(prompt_tokens=1200, prompt_tokens_details=SimpleNamespace(cached_tokens=1024)),
+        )
+        endpoint = RecordingEndpoint(response)
+        client = OpenAIChatClient(
+            model="gpt", sdk_client=SimpleNamespace(chat=SimpleNamespace(completions=endpoint))
+        )
+
+        client.complete(CONVERSATION)
+        client.complete(CONVERSATION)
+
+        self.assertEqual(endpoint.requests[0]["messages"][0], {"role": "system", "content": CONVERSATION[0].content})
+        self.assertEqual(client.usage.snapshot()["calls"], 2)
+        self.assertEqual(client.usage.cached_input_tokens, 2048)
+        self.assertEqual(client.usage.uncached_input_tokens, 352)
+
+
+
+class _GoogleChunk:
+    """Mimics the genai SDK, whose `.text` raises ValueError on chunks without text parts."""
+
+    def __init__(self, text: str | None) -> None:
+        self._text = text
+        self.candidates = [SimpleNamespace(content=SimpleNamespace(parts=[]), finish_reason="SAFETY")]
+        self.usage_metadata = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("The `response.text` quick accessor only works when the response contains a valid `Part`")
+        return self._text
+
+
+class GoogleStreamTests(unittest.TestCase):
+    CHUNKS = [_GoogleChunk("Why "), _GoogleChunk(None), _GoogleChunk("not?"), _GoogleChunk(None)]
+
+    def test_stream_skips_chunks_without_text(self) -> None:
+        sdk = SimpleNamespace(generate_content=lambda *args, **kwargs: iter(self.CHUNKS))
+        client = GoogleChatClient(model="gemini", sdk_client=sdk)
+
+        self.assertEqual(list(client.stream(CONVERSATION)), ["Why ", "not?"])
+
+    def test_astream_skips_chunks_without_text(self) -> None:
+        async def chunks():
+            for chunk in self.CHUNKS:
+                yield chunk
+
+        async def generate_content_async(*args, **kwargs):
+            return chunks()
+
+        client = GoogleChatClient(model="gemini", sdk_client=SimpleNamespace(generate_content_async=generate_content_async))
+
+        async def collect() -> list[str]:
+            return [delta async for delta in client.astream(CONVERSATION)]
+
+        self.assertEqual(asyncio.run(collect()), ["Why ", "not?"])
+
+
+if __name__ == "__main__":
+    unittest.main()
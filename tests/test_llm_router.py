@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.factory import ChatbotFactory, ProviderConfig
+from agentic_chatbot.llm_router import LLMRouter
+from agentic_chatbot.schemas import ChatMessage, Role
+
+MESSAGES = [ChatMessage(role=Role.USER, content="hi")]
+
+
+@dataclass
+class FakeProvider:
+    name: str
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return f"from {self.name}"
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return f"from {self.name}"
+
+
+class LLMRouterTests(unittest.TestCase):
+    def test_routes_to_fastest_provider_after_measuring_each(self) -> None:
+        slow, fast = FakeProvider("slow", delay=0.03), FakeProvider("fast")
+        router = LLMRouter(providers={"slow": slow, "fast": fast})
+
+        router.complete(MESSAGES)
+        router.complete(MESSAGES)
+
+        self.assertEqual(router.ranked(), ["fast", "slow"])
+        self.assertEqual(router.complete(MESSAGES), "from fast")
+        self.assertEqual(slow.calls, 1)
+
+    def test_fails_over_on_error_and_cools_down_failing_provider(self) -> None:
+        broken, backup = FakeProvider("broken", fail=True), FakeProvider("backup")
+        router = LLMRouter(providers={"broken": broken, "backup": backup}, max_consecutive_failures=1)
+
+        self.assertEqual(router.complete(MESSAGES), "from backup")
+        self.assertEqual(router.stats.failovers, 1)
+        self.assertFalse(router.health("broken").healthy(router.clock()))
+        self.assertEqual(router.ranked(), ["backup", "broken"])
+
+    def test_fails_over_on_timeout(self) -> None:
+        hung, backup = FakeProvider("hung", delay=0.5), FakeProvider("backup")
+        router = LLMRouter(providers={"hung": hung, "backup": backup}, timeout_seconds=0.05)
+
+        started = time.monotonic()
+        self.assertEqual(router.complete(MESSAGES), "from backup")
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(router.stats.timeouts, 1)
+        router.close()
+
+    def test_abandoned_calls_do_not_starve_or_fail_healthy_providers(self) -> None:
+        hung, backup = FakeProvider("hung", delay=1.0), FakeProvider("backup", delay=0.05)
+        router = LLMRouter(providers={"hung": hung, "backup": backup}, timeout_seconds=0.2)
+        callers = 6 * len(router.providers)
+
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            answers = list(pool.map(lambda _: router.complete(MESSAGES), range(callers)))
+
+        self.assertEqual(answers, ["from backup"] * callers)
+        self.assertEqual(router.health("backup").failures, 0)
+        self.assertEqual(router.stats.timeouts, callers)
+
+    def test_raises_when_every_provider_fails(self) -> None:
+        router = LLMRouter(providers={"a": FakeProvider("a", fail=True), "b": FakeProvider("b", fail=True)})
+
+        with self.assertRaises(RuntimeError) as raised:
+            router.complete(MESSAGES)
+
+        self.assertIn("a: ConnectionError", str(raised.exception))
+        self.assertIn("b: ConnectionError", str(raised.exception))
+
+    def test_hedges_after_primary_p95(self) -> None:
+        primary, secondary = FakeProvider("primary", delay=0.01), FakeProvider("secondary", delay=0.01)
+        router = LLMRouter(providers={"primary": primary, "secondary": secondary}, hedge=True, hedge_min_samples=3)
+        for _ in range(3):
+            router.health("primary").record_success(0.01)
+        router.health("secondary").record_success(0.02)
+
+        primary.delay = 0.3
+        self.assertEqual(router.complete(MESSAGES), "from secondary")
+
+        self.assertEqual(router.stats.hedges, 1)
+        self.assertEqual(router.stats.hedge_wins, 1)
+        router.close()
+
+    def test_async_hedge_cancels_loser(self) -> None:
+        primary, secondary = FakeProvider("primary", delay=0.3), FakeProvider("secondary")
+        router = LLMRouter(providers={"primary": primary, "secondary": secondary}, hedge=True, hedge_min_samples=1)
+        router.health("primary").record_success(0.01)
+        router.health("secondary").record_success(0.02)
+
+        started = time.monotonic()
+        result = asyncio.run(router.acomplete(MESSAGES))
+
+        self.assertEqual(result, "from secondary")
+        self.assertLess(time.monotonic() - started, 0.25)
+        self.assertGreaterEqual(router.health("primary").percentile(95), 0.01)
+
+
+class RouterFactoryTests(unittest.TestCase):
+    def test_from_env_reads_fallback_providers(self) -> None:
+        old = dict(os.environ)
+        try:
+            os.environ["LLM_PROVIDER"] = "openai"
+            os.environ["LLM_FALLBACK_PROVIDERS"] = "anthropic, openai, bogus"
+            os.environ["ANTHROPIC_MODEL"] = "claude-custom"
+            os.environ["LLM_TIMEOUT_SECONDS"] = "12"
+            os.environ["LLM_HEDGE"] = "true"
+
+            factory = ChatbotFactory.from_env()
+
+            self.assertEqual([config.provider for config in factory.fallback_providers], ["anthropic"])
+            self.assertEqual(factory.fallback_providers[0].model, "claude-custom")
+            self.assertEqual(factory.llm_timeout_seconds, 12.0)
+            self.assertTrue(factory.llm_hedge)
+        finally:
+            os.environ.clear()
+            os.environ.update(old)
+
+    def test_build_llm_wraps_fallbacks_in_router(self) -> None:
+        sdk = object()
+        factory = ChatbotFactory(
+            provider="openai",
+            sdk_client=sdk,
+            fallback_providers=(ProviderConfig(provider="google", sdk_client=sdk),),
+            llm_hedge=True,
+        )
+
+        llm = factory.build_llm()
+
+        self.assertIsInstance(llm, LLMRouter)
+        self.assertEqual(list(llm.providers), ["openai:gpt-5-mini", "google:gemini-2.5-flash"])
+        self.assertTrue(llm.hedge)
+
+
+if __name__ == "__main__":
+    unittest.main()
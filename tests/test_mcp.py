@@ -1,10 +1,26 @@
 from __future__ import annotations
 
+import json
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
 from typing import Any
 
-from agentic_chatbot.mcp import HttpMCPClient
+from agentic_chatbot.mcp import (
+    HttpMCPClient,
+    MCPConnectorRegistry,
+    MCPPromptConnector,
+    MCPToolConnector,
+    PooledHTTPTransport,
+    PromptCache,
+    ToolInvocation,
+)
+from agentic_chatbot.schemas import Action, Plan
+from agentic_chatbot.skills import JokeSkill
 
 
 @dataclass
@@ -21,6 +37,33 @@ class FakeTransport:
         return self.response
 
 
+@dataclass
+class AsyncFakeTransport(FakeTransport):
+    async_calls: int = 0
+
+    async def apost_json(self, url: str, payload: dict[str, Any], *, timeout: float) -> dict[str, Any]:
+        self.async_calls += 1
+        return self.post_json(url, payload, timeout=timeout)
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", "0"))
+        payload = json.loads(self.rfile.read(length))
+        status = 500 if payload.get("tool_name") == "boom" else 200
+        body = json.dumps({"result": f"{self.path}:{payload.get('tool_name')}"}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return None
+
+
 class MCPClientTests(unittest.TestCase):
     def test_call_tool_posts_expected_payload_and_endpoint(self) -> None:
         transport = FakeTransport(response={"result": " tool output "})
@@ -56,5 +99,253 @@ class MCPClientTests(unittest.TestCase):
             client.call_tool(server="https://mcp.example.com", tool_name="x", arguments={})
 
 
+class PooledHTTPTransportTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused_across_calls(self) -> None:
+        transport = PooledHTTPTransport(max_connections_per_host=2)
+        client = HttpMCPClient(transport=transport)
+        try:
+            results = [client.call_tool(server=self.base_url, tool_name=f"t{i}", arguments={}) for i in range(3)]
+        finally:
+            transport.close()
+
+        self.assertEqual(results, ["/tools/call:t0", "/tools/call:t1", "/tools/call:t2"])
+        self.assertEqual(transport.stats.connections_created, 1)
+        self.assertEqual(transport.stats.connections_reused, 2)
+        self.assertEqual(transport.stats.requests, 3)
+
+    def test_http_errors_raise_value_error_and_keep_pool_usable(self) -> None:
+        transport = PooledHTTPTransport(max_connections_per_host=1)
+        client = HttpMCPClient(transport=transport)
+        try:
+            with self.assertRaises(ValueError):
+                client.call_tool(server=self.base_url, tool_name="boom", arguments={})
+            result = client.call_tool(server=self.base_url, tool_name="ok", arguments={})
+        finally:
+            transport.close()
+
+        self.assertEqual(result, "/tools/call:ok")
+
+    def test_stats_are_exact_under_concurrent_requests(self) -> None:
+        transport = PooledHTTPTransport(max_connections_per_host=4)
+        client = HttpMCPClient(transport=transport)
+        calls = 200
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(lambda i: client.call_tool(server=self.base_url, tool_name=f"t{i}", arguments={}), range(calls)))
+        finally:
+            transport.close()
+
+        stats = transport.stats
+        self.assertEqual(stats.requests, calls)
+        self.assertEqual(stats.connections_created + stats.connections_reused, calls + stats.retries)
+
+
+@dataclass
+class CountingPromptClient:
+    calls: int = 0
+
+    def get_prompt(self, *, server: str, prompt_name: str, arguments: dict[str, Any] | None = None) -> str:
+        self.calls += 1
+        return f"{prompt_name} v{self.calls} {sorted((arguments or {}).items())}"
+
+
+def _cached_registry(cache: PromptCache) -> tuple[MCPConnectorRegistry, CountingPromptClient]:
+    client = CountingPromptClient()
+    registry = MCPConnectorRegistry(prompt_cache=cache)
+    registry.register_prompt("style", MCPPromptConnector(client=client, server="https://mcp", prompt_name="p"))
+    return registry, client
+
+
+class PromptCacheTests(unittest.TestCase):
+    def test_cache_key_uses_canonical_arguments(self) -> None:
+        registry, client = _cached_registry(PromptCache(ignored_arguments=frozenset({"user_message"})))
+
+        first = registry.get_prompt("style", {"a": 1, "b": 2, "user_message": "x"})
+        second = registry.get_prompt("style", {"b": 2, "a": 1, "user_message": "y"})
+        registry.get_prompt("style", {"a": 2})
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.calls, 2)
+        self.assertEqual(registry.prompt_cache.snapshot()["hits"], 1)
+
+    def test_skill_turns_with_different_messages_share_the_cached_prompt(self) -> None:
+        registry, client = _cached_registry(PromptCache())
+        llm = SimpleNamespace(complete=lambda messages, temperature=0.2: "ha")
+        skill = JokeSkill(llm=llm, mcp_registry=registry)
+        plan = Plan(action=Action.JOKE, reason="joke", params={"mcp_prompt": "style"})
+
+        skill.run(plan, [], "tell me a joke")
+        skill.run(plan, [], "another one please")
+
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(registry.prompt_cache.snapshot()["hits"], 1)
+
+    def test_invalidate_prompt_drops_alias_entries(self) -> None:
+        registry, client = _cached_registry(PromptCache())
+        registry.get_prompt("style")
+
+        self.assertEqual(registry.invalidate_prompt("style"), 1)
+        registry.get_prompt("style")
+        self.assertEqual(client.calls, 2)
+
+    def test_stale_entry_is_served_while_refreshing(self) -> None:
+        cache = PromptCache(ttl_seconds=0.0, stale_ttl_seconds=60.0)
+        registry, client = _cached_registry(cache)
+        first = registry.get_prompt("style")
+
+        stale = registry.get_prompt("style")
+        deadline = time.monotonic() + 2
+        while cache.refreshes == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(stale, first)
+        self.assertEqual(cache.stale_hits, 1)
+        self.assertEqual(cache.refreshes, 1)
+        self.assertEqual(client.calls, 2)
+
+
+@dataclass
+class SlowToolClient:
+    delays: dict[str, float]
+    batch_servers: frozenset[str] = frozenset()
+    batch_calls: int = 0
+
+    def call_tool(self, *, server: str, tool_name: str, arguments: dict[str, Any]) -> str:
+        time.sleep(self.delays.get(tool_name, 0))
+        if tool_name == "broken":
+            raise ValueError("tool failed")
+        return f"{tool_name}:{arguments.get('q', '')}"
+
+    def supports_batch(self, server: str) -> bool:
+        return server in self.batch_servers
+
+    def call_tools_batch(self, *, server: str, calls: list[tuple[str, dict[str, Any]]]) -> list[str | Exception]:
+        self.batch_calls += 1
+        return [f"batched {tool_name}" for tool_name, _ in calls]
+
+
+def _tool_registry(client: SlowToolClient, server: str = "https://mcp") -> MCPConnectorRegistry:
+    registry = MCPConnectorRegistry()
+    for name in ("a", "b", "c", "broken"):
+        registry.register_tool(name, MCPToolConnector(client=client, server=server, tool_name=name))
+    return registry
+
+
+class ToolFanOutTests(unittest.TestCase):
+    def test_call_tools_runs_concurrently_in_invocation_order(self) -> None:
+        registry = _tool_registry(SlowToolClient(delays={"a": 0.2, "b": 0.2, "c": 0.2}))
+
+        started = time.monotonic()
+        results = registry.call_tools(
+            [ToolInvocation("c", {"q": "3"}), ToolInvocation("a"), ToolInvocation("missing"), ToolInvocation("broken")]
+        )
+        elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual([result.alias for result in results], ["c", "a", "missing", "broken"])
+        self.assertEqual(results[0].text, "c:3")
+        self.assertTrue(results[1].ok)
+        self.assertFalse(results[2].ok)
+        self.assertEqual(results[3].error, "tool failed")
+
+    def test_call_tools_applies_per_call_timeout(self) -> None:
+        registry = _tool_registry(SlowToolClient(delays={"a": 0.5}))
+
+        results = registry.call_tools([ToolInvocation("a"), ToolInvocation("b")], timeout_seconds=0.1)
+
+        self.assertEqual(results[0].error, "MCP tool call timed out")
+        self.assertTrue(results[1].ok)
+
+    def test_per_call_timeout_starts_when_a_worker_picks_the_call_up(self) -> None:
+        registry = _tool_registry(SlowToolClient(delays={"a": 0.1}))
+        registry.max_concurrent_tools = 2
+
+        results = registry.call_tools([ToolInvocation("a", {"q": str(i)}) for i in range(6)], timeout_seconds=0.15)
+
+        self.assertTrue(all(result.ok for result in results), [result.error for result in results])
+
+    def test_deadline_still_bounds_queued_calls(self) -> None:
+        registry = _tool_registry(SlowToolClient(delays={"a": 0.1}))
+        registry.max_concurrent_tools = 1
+
+        results = registry.call_tools(
+            [ToolInvocation("a", {"q": str(i)}) for i in range(4)], timeout_seconds=0.15, deadline_seconds=0.25
+        )
+
+        self.assertEqual([result.ok for result in results], [True, True, False, False])
+
+    def test_batch_capable_server_gets_one_round_trip(self) -> None:
+        client = SlowToolClient(delays={}, batch_servers=frozenset({"https://mcp"}))
+        registry = _tool_registry(client)
+
+        results = registry.call_tools([ToolInvocation("a"), ToolInvocation("b")])
+
+        self.assertEqual([result.text for result in results], ["batched a", "batched b"])
+        self.assertEqual(client.batch_calls, 1)
+
+    def test_http_client_batch_endpoint(self) -> None:
+        transport = FakeTransport(response={"results": [{"result": "one"}, {"error": "nope"}]})
+        client = HttpMCPClient(transport=transport, batch_servers=frozenset({"https://mcp.example.com/"}))
+
+        outcomes = client.call_tools_batch(server="https://mcp.example.com", calls=[("x", {}), ("y", {"k": 1})])
+
+        self.assertTrue(client.supports_batch("https://mcp.example.com"))
+        self.assertEqual(transport.last_url, "https://mcp.example.com/tools/batch")
+        self.assertEqual(outcomes[0], "one")
+        self.assertIsInstance(outcomes[1], ValueError)
+
+
+class AsyncMCPClientTests(unittest.IsolatedAsyncioTestCase):
+    async def test_acall_tool_uses_async_transport(self) -> None:
+        transport = AsyncFakeTransport(response={"result": "async output"})
+        client = HttpMCPClient(transport=transport, timeout_seconds=2.0)
+
+        result = await client.acall_tool(server="https://mcp.example.com", tool_name="x", arguments={})
+
+        self.assertEqual(result, "async output")
+        self.assertEqual(transport.async_calls, 1)
+        self.assertEqual(transport.last_url, "https://mcp.example.com/tools/call")
+
+    async def test_aget_prompt_falls_back_to_sync_transport(self) -> None:
+        transport = FakeTransport(response={"prompt": "be brief"})
+        registry = MCPConnectorRegistry()
+        registry.register_prompt(
+            "style",
+            MCPPromptConnector(client=HttpMCPClient(transport=transport), server="https://mcp.example.com", prompt_name="p"),
+        )
+
+        result = await registry.aget_prompt("style", {"tone": "dry"})
+
+        self.assertEqual(result, "be brief")
+        self.assertEqual(transport.last_payload, {"prompt_name": "p", "arguments": {"tone": "dry"}})
+
+    async def test_acall_tools_per_call_timeout_excludes_queue_time(self) -> None:
+        registry = _tool_registry(SlowToolClient(delays={"a": 0.1}))
+        registry.max_concurrent_tools = 2
+
+        results = await registry.acall_tools(
+            [ToolInvocation("a", {"q": str(i)}) for i in range(6)], timeout_seconds=0.15
+        )
+
+        self.assertTrue(all(result.ok for result in results), [result.error for result in results])
+
+    async def test_acall_tools_respects_global_deadline(self) -> None:
+        registry = _tool_registry(SlowToolClient(delays={"a": 0.5, "b": 0.0}))
+
+        results = await registry.acall_tools([ToolInvocation("a"), ToolInvocation("b")], deadline_seconds=0.1)
+
+        self.assertFalse(results[0].ok)
+        self.assertEqual(results[1].text, "b:")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.mcp_stdio import MCPClient, StdioServer, StdioSessionPool, ToolLoopBudget
+
+
+class ClosedResourceError(Exception):
+    pass
+
+
+@dataclass
+class FakeSession:
+    server: str
+    tools: list[str]
+    handler: Any
+    list_calls: int = 0
+    gate: asyncio.Event | None = None
+    fail_next: Exception | None = None
+
+    async def list_tools(self) -> Any:
+        self.list_calls += 1
+        return SimpleNamespace(tools=[SimpleNamespace(name=name, description="", inputSchema={}) for name in self.tools])
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> Any:
+        if self.fail_next is not None:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        if self.gate is not None:
+            await self.gate.wait()
+        return SimpleNamespace(content=f"{self.server}:{name}:{arguments}")
+
+
+@dataclass
+class FakeOpener:
+    tools: dict[str, list[str]]
+    gate: asyncio.Event | None = None
+    sessions: list[FakeSession] = field(default_factory=list)
+    closed: int = 0
+
+    @asynccontextmanager
+    async def __call__(self, server: StdioServer, handler: Any):
+        session = FakeSession(server=server.command, tools=self.tools[server.command], handler=handler, gate=self.gate)
+        self.sessions.append(session)
+        try:
+            yield session
+        finally:
+            self.closed += 1
+
+
+def _pool(opener: FakeOpener, **kwargs: Any) -> StdioSessionPool:
+    servers = {name: StdioServer(command=name) for name in opener.tools}
+    return StdioSessionPool(servers=servers, opener=opener, **kwargs)
+
+
+class StdioSessionPoolTests(unittest.TestCase):
+    def test_tool_catalog_is_cached_until_list_changed(self) -> None:
+        opener = FakeOpener(tools={"weather": ["forecast"], "notes": ["add", "forecast"]})
+        pool = _pool(opener)
+
+        async def run() -> None:
+            await pool.start()
+            catalog = await pool.tools()
+            self.assertEqual({name: server for name, (server, _) in catalog.items()}, {"forecast": "weather", "add": "notes"})
+            self.assertEqual([session.list_calls for session in opener.sessions], [1, 1])
+
+            weather = opener.sessions[0]
+            weather.tools = ["forecast", "alerts"]
+            await weather.handler(SimpleNamespace(root=SimpleNamespace(method="notifications/tools/list_changed")))
+            self.assertIn("alerts", await pool.tools())
+            self.assertEqual(weather.list_calls, 2)
+            await pool.aclose()
+
+        asyncio.run(run())
+
+        self.assertEqual(pool.stats.snapshot()["catalog_invalidations"], 1)
+        self.assertEqual((pool.stats.connects, opener.closed), (2, 2))
+
+    def test_broken_session_is_replaced_on_next_call(self) -> None:
+        opener = FakeOpener(tools={"weather": ["forecast"]})
+        pool = _pool(opener)
+
+        async def run() -> None:
+            await pool.start()
+            opener.sessions[0].fail_next = ClosedResourceError()
+            with self.assertRaises(ClosedResourceError):
+                await pool.call_tool("weather", "forecast", {"city": "Oslo"})
+            result = await pool.call_tool("weather", "forecast", {"city": "Oslo"})
+            self.assertEqual(result.content, "weather:forecast:{'city': 'Oslo'}")
+            await pool.aclose()
+
+        asyncio.run(run())
+
+        self.assertEqual((pool.stats.connects, pool.stats.crashes, opener.closed), (2, 1, 2))
+
+    def test_tool_errors_keep_the_session(self) -> None:
+        opener = FakeOpener(tools={"weather": ["forecast"]})
+        pool = _pool(opener)
+
+        async def run() -> None:
+            await pool.start()
+            opener.sessions[0].fail_next = ValueError("bad arguments")
+            with self.assertRaises(ValueError):
+                await pool.call_tool("weather", "forecast")
+            await pool.call_tool("weather", "forecast")
+            await pool.aclose()
+
+        asyncio.run(run())
+
+        self.assertEqual((pool.stats.connects, pool.stats.crashes), (1, 0))
+
+    def test_concurrent_calls_share_or_pool_instances(self) -> None:
+        async def run(instances_per_server: int) -> int:
+            opener = FakeOpener(tools={"weather": ["forecast"]}, gate=asyncio.Event())
+            pool = _pool(opener, instances_per_server=instances_per_server, max_concurrent_per_instance=1)
+            calls = [asyncio.create_task(pool.call_tool("weather", "forecast")) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            opener.gate.set()
+            await asyncio.gather(*calls)
+            await pool.aclose()
+            return len(opener.sessions)
+
+        self.assertEqual(asyncio.run(run(1)), 1)
+        self.assertEqual(asyncio.run(run(2)), 2)
+
+    def test_unknown_server_and_bad_script_are_rejected(self) -> None:
+        pool = StdioSessionPool(opener=FakeOpener(tools={}))
+
+        with self.assertRaises(KeyError):
+            asyncio.run(pool.call_tool("missing", "tool"))
+        with self.assertRaises(ValueError):
+            StdioServer.from_script("server.rb")
+
+
+def _text(text: str) -> Any:
+    return SimpleNamespace(type="text", text=text)
+
+
+def _tool_use(call_id: str, name: str, **arguments: Any) -> Any:
+    return SimpleNamespace(type="tool_use", id=call_id, name=name, input=arguments)
+
+
+def _reply(*content: Any, tokens: int = 10) -> Any:
+    stop_reason = "tool_use" if any(block.type == "tool_use" for block in content) else "end_turn"
+    usage = SimpleNamespace(input_tokens=tokens, output_tokens=0)
+    return SimpleNamespace(content=list(content), stop_reason=stop_reason, usage=usage)
+
+
+@dataclass
+class ScriptedAnthropic:
+    replies: list[Any]
+    requests: list[list[dict[str, Any]]] = field(default_factory=list)
+    max_tokens: list[int] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self.messages = self
+
+    async def create(self, **request: Any) -> Any:
+        self.requests.append(list(request["messages"]))
+        self.max_tokens.append(request["max_tokens"])
+        return self.replies.pop(0)
+
+
+@dataclass
+class RecordingPool:
+    tools_by_server: dict[str, list[str]]
+    delay: float = 0.0
+    active: int = 0
+    peak: int = 0
+    calls: int = 0
+
+    async def tools(self) -> dict[str, tuple[str, Any]]:
+        return {
+            name: (server, SimpleNamespace(name=name, description="", inputSchema={}))
+            for server, names in self.tools_by_server.items()
+            for name in names
+        }
+
+    async def call_tool(self, server: str, tool_name: str, arguments: dict[str, Any] | None = None) -> Any:
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if tool_name == "broken":
+                raise RuntimeError("server error")
+            return SimpleNamespace(content=[_text(f"{server}:{tool_name}:{arguments}")], isError=False)
+        finally:
+            self.active -= 1
+
+
+class ToolLoopTests(unittest.TestCase):
+    def _client(self, pool: RecordingPool, replies: list[Any], **budget: Any) -> tuple[MCPClient, ScriptedAnthropic]:
+        anthropic = ScriptedAnthropic(replies)
+        return MCPClient(pool, anthropic=anthropic, budget=ToolLoopBudget(**budget)), anthropic
+
+    def test_runs_turn_tool_calls_concurrently_over_several_rounds(self) -> None:
+        pool = RecordingPool({"weather": ["forecast"], "notes": ["add", "broken"]}, delay=0.01)
+        client, anthropic = self._client(pool, [
+            _reply(_text("Checking."), _tool_use("a", "forecast", city="Oslo"), _tool_use("b", "broken")),
+            _reply(_tool_use("c", "add", text="umbrella")),
+            _reply(_text("Bring an umbrella.")),
+        ])
+
+        answer = asyncio.run(client.process_query("Weather?"))
+
+        self.assertEqual(answer.splitlines()[0], "Checking.")
+        self.assertEqual(answer.splitlines()[-1], "Bring an umbrella.")
+        self.assertEqual(pool.peak, 2)
+        self.assertEqual(len(anthropic.requests), 3)
+        batch = anthropic.requests[1][-1]["content"]
+        self.assertEqual([result["tool_use_id"] for result in batch], ["a", "b"])
+        self.assertEqual(batch[0]["content"], [{"type": "text", "text": "weather:forecast:{'city': 'Oslo'}"}])
+        self.assertEqual((batch[0]["is_error"], batch[1]["is_error"]), (False, True))
+        self.assertIn("server error", batch[1]["content"])
+
+    def test_stops_at_round_and_token_budgets(self) -> None:
+        pool = RecordingPool({"weather": ["forecast"]})
+        loop = [_reply(_tool_use(str(index), "forecast"), tokens=40) for index in range(3)]
+
+        client, anthropic = self._client(pool, list(loop), max_rounds=2)
+        self.assertTrue(asyncio.run(client.process_query("Weather?")).endswith("[Stopped: 2 tool rounds used]"))
+        self.assertEqual(len(anthropic.requests), 2)
+        # The last round's tool calls would have no round left to report back in.
+        self.assertEqual(pool.calls, 1)
+
+        pool.calls = 0
+        client, anthropic = self._client(pool, list(loop), max_tokens=60)
+        self.assertIn("token budget", asyncio.run(client.process_query("Weather?")))
+        self.assertEqual(len(anthropic.requests), 2)
+        self.assertEqual(anthropic.max_tokens, [60, 20])
+        self.assertEqual(pool.calls, 1)
+
+    def test_stops_when_the_time_budget_runs_out(self) -> None:
+        pool = RecordingPool({"weather": ["forecast"]}, delay=1.0)
+        client, _ = self._client(pool, [_reply(_tool_use("a", "forecast"))], timeout_seconds=0.05)
+
+        answer = asyncio.run(client.process_query("Weather?"))
+
+        self.assertTrue(answer.endswith("[Stopped: time budget of 0.05s used]"))
+        self.assertEqual(pool.active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import unittest
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-from agentic_chatbot.planner import Planner
+from agentic_chatbot.cache import PlanCache
+from agentic_chatbot.llm_router import LLMRouter
+from agentic_chatbot.planner import PLAN_JSON_SCHEMA, Planner, PlanStreamParser
 from agentic_chatbot.schemas import Action, ChatMessage, Role
+from agentic_chatbot.singleflight import SingleFlightLLM
 
 
 @dataclass
@@ -23,6 +27,52 @@ class FakeLLM:
         return self.output
 
 
+@dataclass
+class AsyncFakeLLM:
+    output: str
+    async_calls: int = 0
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        raise AssertionError("sync path should not be used")
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.async_calls += 1
+        return self.output
+
+
+@dataclass
+class StructuredFakeLLM:
+    output: str
+    model: str = "structured-model"
+    requests: list[dict] | None = None
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        raise AssertionError("structured mode should be used")
+
+    def complete_json(self, messages, *, schema, name, temperature=0.2, max_tokens=None) -> str:
+        self.requests = (self.requests or []) + [{"schema": schema, "name": name, "max_tokens": max_tokens}]
+        return self.output
+
+
+@dataclass
+class GatedStreamLLM:
+    """Streams `head`, then waits for `gate` before streaming `tail`."""
+
+    head: list[str]
+    tail: list[str]
+    gate: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        raise AssertionError("streaming path should be used")
+
+    async def astream_json(self, messages, *, schema, name, temperature=0.2, max_tokens=None):
+        for chunk in self.head:
+            yield chunk
+        await self.gate.wait()
+        for chunk in self.tail:
+            yield chunk
+
+
 class PlannerTests(unittest.TestCase):
     def test_plan_parses_valid_json(self) -> None:
         llm = FakeLLM(
@@ -89,6 +139,146 @@ class PlannerTests(unittest.TestCase):
         self.assertEqual(plan.params, {})
         self.assertIsNone(plan.clarifying_question)
 
+    def test_plan_ignores_braces_after_the_object(self) -> None:
+        llm = FakeLLM(output='Sure: {"action":"joke","reason":"r"} (use {topic} next time)')
+
+        plan = Planner(llm=llm).plan(history=[], user_message="joke")
+
+        self.assertEqual(plan.action, Action.JOKE)
+
+    def test_plan_uses_structured_output_with_capped_tokens(self) -> None:
+        llm = StructuredFakeLLM(output='{"action":"recipe","reason":"food","params":{},"clarifying_question":null}')
+        planner = Planner(llm=llm, max_tokens=64)
+
+        plan = planner.plan(history=[], user_message="dinner?")
+
+        self.assertEqual(plan.action, Action.RECIPE)
+        self.assertEqual(llm.requests, [{"schema": PLAN_JSON_SCHEMA, "name": "plan", "max_tokens": 64}])
+        self.assertEqual(PLAN_JSON_SCHEMA["properties"]["action"]["enum"], ["clarify", "joke", "recipe"])
+        self.assertEqual(planner.stats.structured_calls, 1)
+
+    def test_structured_calls_count_the_path_the_wrapped_client_took(self) -> None:
+        output = '{"action":"joke","reason":"r","params":{}}'
+        for wrap in (lambda llm: LLMRouter(providers={"only": llm}), SingleFlightLLM):
+            text_only = Planner(llm=wrap(FakeLLM(output=output)))
+            structured = Planner(llm=wrap(StructuredFakeLLM(output=output)))
+
+            text_only.plan(history=[], user_message="joke")
+            structured.plan(history=[], user_message="joke")
+            asyncio.run(text_only.aplan(history=[], user_message="another joke"))
+
+            self.assertEqual(text_only.stats.structured_calls, 0)
+            self.assertEqual(structured.stats.structured_calls, 1)
+
+    def test_plan_caps_output_tokens_by_default_and_can_lift_the_cap(self) -> None:
+        llm = StructuredFakeLLM(output='{"action":"joke","reason":"r"}')
+
+        Planner(llm=llm).plan(history=[], user_message="joke")
+        Planner(llm=llm, max_tokens=None).plan(history=[], user_message="joke")
+
+        self.assertEqual([request["max_tokens"] for request in llm.requests], [256, None])
+
+    def test_stats_count_parse_failures_per_provider(self) -> None:
+        planner = Planner(llm=FakeLLM(output="not json"))
+
+        planner.plan(history=[], user_message="a")
+        planner.llm.output = '{"action":"joke","reason":"r"}'
+        planner.plan(history=[], user_message="b")
+
+        self.assertEqual(planner.stats.parse_failures, 1)
+        self.assertEqual(planner.stats.failure_rate("FakeLLM"), 0.5)
+        self.assertEqual(planner.stats.snapshot()["failures_by_provider"], {"FakeLLM": {"calls": 2, "failures": 1}})
+
+
+class PlanStreamParserTests(unittest.TestCase):
+    def test_action_is_known_before_the_object_ends(self) -> None:
+        parser = PlanStreamParser()
+        chunks = ['```json\n{"act', 'ion": "jo', 'ke", "reason": "a \\"quoted\\" {brace}', '", "params": {"topic": ["cats", {"x": 1}]}', "}"]
+
+        consumed = 0
+        for chunk in chunks:
+            parser.feed(chunk)
+            consumed += 1
+            if parser.action is not None:
+                break
+
+        self.assertEqual(parser.action, Action.JOKE)
+        self.assertEqual(consumed, 3)
+        self.assertFalse(parser.complete)
+        for chunk in chunks[consumed:]:
+            parser.feed(chunk)
+        self.assertTrue(parser.complete)
+        self.assertEqual(parser.fields["reason"], 'a "quoted" {brace}')
+        self.assertEqual(parser.fields["params"], {"topic": ["cats", {"x": 1}]})
+
+    def test_malformed_input_fails(self) -> None:
+        parser = PlanStreamParser()
+
+        parser.feed('{"action" "joke"}')
+
+        self.assertTrue(parser.failed)
+        self.assertIsNone(parser.action)
+
+
+class AsyncPlannerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_aplan_prefers_native_async_client(self) -> None:
+        llm = AsyncFakeLLM(output='{"action":"joke","reason":"r","params":{},"clarifying_question":null}')
+        planner = Planner(llm=llm)
+
+        plan = await planner.aplan(history=[], user_message="joke please")
+
+        self.assertEqual(plan.action, Action.JOKE)
+        self.assertEqual(llm.async_calls, 1)
+
+    async def test_aplan_early_returns_before_reason_is_streamed(self) -> None:
+        llm = GatedStreamLLM(
+            head=['{"action": "joke", "par', 'ams": {"topic": "owls"}, '],
+            tail=['"clarifying_question": null, "reason": "asked for a joke"}'],
+        )
+        cache = PlanCache()
+        planner = Planner(llm=llm, cache=cache)
+
+        plan, final = await planner.aplan_early(history=[], user_message="owl joke")
+
+        self.assertEqual((plan.action, plan.params), (Action.JOKE, {"topic": "owls"}))
+        self.assertFalse(final.done())
+        llm.gate.set()
+        complete = await final
+        self.assertEqual(complete.reason, "asked for a joke")
+        self.assertEqual(cache.get([], "owl joke"), complete)
+
+    async def test_aplan_early_waits_for_clarifying_question(self) -> None:
+        llm = GatedStreamLLM(
+            head=['{"action": "clarify", "params": {}, '],
+            tail=['"clarifying_question": "Joke or recipe?", "reason": "vague"}'],
+        )
+        planner = Planner(llm=llm)
+
+        pending = asyncio.ensure_future(planner.aplan_early(history=[], user_message="hmm"))
+        await asyncio.sleep(0.01)
+        self.assertFalse(pending.done())
+        llm.gate.set()
+        plan, _ = await pending
+
+        self.assertEqual(plan.clarifying_question, "Joke or recipe?")
+
+    async def test_aplan_early_without_streaming_client(self) -> None:
+        planner = Planner(llm=FakeLLM(output='{"action":"recipe","reason":"r","params":{"ingredients":"rice"}}'))
+
+        plan, final = await planner.aplan_early(history=[], user_message="rice?")
+
+        self.assertEqual(plan.params, {"ingredients": "rice"})
+        self.assertEqual((await final).reason, "r")
+
+    async def test_aplan_runs_sync_client_off_loop(self) -> None:
+        llm = FakeLLM(output="not json")
+        planner = Planner(llm=llm)
+
+        plan = await planner.aplan(history=[], user_message="Do something")
+
+        self.assertEqual(plan.action, Action.CLARIFY)
+        self.assertEqual(llm.last_temperature, 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.planner import Planner
+from agentic_chatbot.router import FastPathRouter, KeywordRule, NaiveBayesClassifier
+from agentic_chatbot.schemas import Action, ChatMessage, Plan
+
+
+@dataclass
+class CountingLLM:
+    output: str
+    calls: int = 0
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.calls += 1
+        return self.output
+
+
+class RouterTests(unittest.TestCase):
+    def test_regex_rule_extracts_params(self) -> None:
+        router = FastPathRouter()
+
+        joke = router.route([], "Tell me a joke about cats!")
+        recipe = router.route([], "recipe for pancakes")
+
+        assert joke is not None and recipe is not None
+        self.assertEqual(joke.plan.action, Action.JOKE)
+        self.assertEqual(joke.plan.params, {"topic": "cats"})
+        self.assertEqual(recipe.plan.action, Action.RECIPE)
+        self.assertEqual(recipe.plan.params, {"ingredients": "pancakes"})
+        self.assertEqual(router.stats.hit_rate, 1.0)
+
+    def test_low_confidence_and_conflicts_fall_back(self) -> None:
+        router = FastPathRouter()
+
+        self.assertIsNone(router.route([], "is that pun any good?"))
+        self.assertIsNone(router.route([], "tell me a joke about recipes"))
+        self.assertIsNone(router.route([], "hello there"))
+        self.assertEqual(router.stats.fallbacks, 3)
+        self.assertEqual(router.stats.hit_rate_at(0.5), 1 / 3)
+
+    def test_classifier_trains_from_plan_log(self) -> None:
+        records = [{"user_message": "something silly to laugh at", "plan": {"action": "joke"}}] * 5
+        records += [{"user_message": "what should I cook tonight", "plan": {"action": "recipe"}}] * 5
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "plans.jsonl"
+            path.write_text("\n".join(json.dumps(record) for record in records), encoding="utf-8")
+            classifier = NaiveBayesClassifier.from_plan_log(path, min_examples=10)
+
+        router = FastPathRouter(rules=[], classifier=classifier, threshold=0.9)
+        decision = router.route([], "what can I cook")
+
+        assert decision is not None
+        self.assertEqual(decision.plan.action, Action.RECIPE)
+        self.assertEqual(router.stats.hits_by_source["classifier"], 1)
+
+    def test_planner_skips_llm_on_fast_path_and_learns_on_fallback(self) -> None:
+        llm = CountingLLM(output='{"action":"recipe","reason":"food","params":{}}')
+        classifier = NaiveBayesClassifier(min_examples=100)
+        router = FastPathRouter(
+            rules=[KeywordRule(action=Action.JOKE, keywords=("joke",), confidence=0.99)],
+            classifier=classifier,
+        )
+        planner = Planner(llm=llm, router=router)
+
+        fast = planner.plan(history=[], user_message="a joke please")
+        slow = planner.plan(history=[], user_message="dinner ideas")
+
+        self.assertEqual(fast.action, Action.JOKE)
+        self.assertEqual(slow, Plan(action=Action.RECIPE, reason="food"))
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(classifier.example_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
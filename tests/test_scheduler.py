@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.scheduler import AIMDLimit, LLMScheduler, Priority, RateLimits, TokenBucket
+from agentic_chatbot.schemas import ChatMessage, Role
+
+MESSAGES = [ChatMessage(role=Role.USER, content="x" * 400)]
+
+
+@dataclass
+class FakeClock:
+    now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after: str | None = None) -> None:
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+
+
+@dataclass
+class FlakyLLM:
+    failures: list[Exception] = field(default_factory=list)
+    model: str = "flaky-1"
+    calls: int = 0
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return "ok"
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        yield "o"
+        yield "k"
+
+
+@dataclass
+class GatedLLM:
+    model: str = "gated-1"
+    order: list[str] = field(default_factory=list)
+    gate: asyncio.Event = field(default_factory=asyncio.Event)
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.order.append(messages[-1].content)
+        await self.gate.wait()
+        return messages[-1].content
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_reservations_beyond_capacity_wait_for_refill(self) -> None:
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10.0, capacity=20.0, clock=clock)
+
+        self.assertEqual(bucket.reserve(20), 0.0)
+        self.assertAlmostEqual(bucket.reserve(5), 0.5)
+        clock.now = 3.0
+        self.assertEqual(bucket.reserve(5), 0.0)
+
+
+class AIMDLimitTests(unittest.TestCase):
+    def test_grows_additively_and_halves_on_rate_limit(self) -> None:
+        limit = AIMDLimit(initial=4, maximum=8, latency_target_seconds=1.0)
+        for _ in range(4):
+            limit.on_success(0.1)
+        self.assertEqual(limit.current, 4)
+        limit.on_success(0.1)
+        self.assertEqual(limit.current, 5)
+
+        limit.on_rate_limited()
+        self.assertEqual(limit.current, 2)
+        limit.on_success(5.0)
+        self.assertLess(limit.value, 2.5)
+
+
+class LLMSchedulerTests(unittest.TestCase):
+    def _scheduler(self, **kwargs) -> tuple[LLMScheduler, list[float]]:
+        clock, sleeps = FakeClock(), []
+
+        def sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+            clock.now += seconds
+
+        return LLMScheduler(clock=clock, sleep=sleep, jitter=lambda: 1.0, **kwargs), sleeps
+
+    def test_retries_rate_limits_with_backoff_and_cuts_concurrency(self) -> None:
+        scheduler, sleeps = self._scheduler(initial_concurrency=8)
+        llm = FlakyLLM(failures=[RateLimitError(), RateLimitError(retry_after="3")])
+
+        self.assertEqual(scheduler.wrap(llm).complete(MESSAGES), "ok")
+
+        self.assertEqual(llm.calls, 3)
+        self.assertEqual([delay for delay in sleeps if delay], [0.5, 3.0])
+        lane = scheduler.snapshot()["FlakyLLM:flaky-1"]
+        self.assertEqual((lane["rate_limited"], lane["retries"], lane["calls"]), (2, 2, 1))
+        self.assertEqual(lane["concurrency_limit"], 2)
+        self.assertEqual(lane["in_flight"], 0)
+
+    def test_gives_up_on_non_retryable_errors_and_after_max_retries(self) -> None:
+        scheduler, _ = self._scheduler(max_retries=1)
+
+        with self.assertRaises(ValueError):
+            scheduler.wrap(FlakyLLM(failures=[ValueError("bad request")])).complete(MESSAGES)
+        with self.assertRaises(RateLimitError):
+            scheduler.wrap(FlakyLLM(failures=[RateLimitError(), RateLimitError()])).complete(MESSAGES)
+
+        self.assertEqual(scheduler.snapshot()["FlakyLLM:flaky-1"]["failures"], 2)
+
+    def test_stream_retries_only_before_first_delta(self) -> None:
+        scheduler, _ = self._scheduler()
+        llm = FlakyLLM(failures=[ConnectionError("reset")])
+
+        self.assertEqual("".join(scheduler.wrap(llm).stream(MESSAGES)), "ok")
+        self.assertEqual(llm.calls, 2)
+
+    def test_token_budget_delays_calls(self) -> None:
+        scheduler, sleeps = self._scheduler(default_limits=RateLimits(tokens_per_minute=120))
+        llm = FlakyLLM()
+
+        scheduler.wrap(llm).complete(MESSAGES)
+        scheduler.wrap(llm).complete(MESSAGES)
+
+        # 100 estimated tokens per call against a 120-token bucket refilling at 2 per second.
+        self.assertEqual(sleeps, [0.0, 40.0])
+
+    def test_planner_calls_jump_the_queue(self) -> None:
+        scheduler = LLMScheduler(initial_concurrency=1, max_concurrency=1)
+        llm = GatedLLM()
+
+        async def run() -> None:
+            def call(text: str, priority: Priority) -> asyncio.Task[str]:
+                messages = [ChatMessage(role=Role.USER, content=text)]
+                return asyncio.create_task(scheduler.wrap(llm, priority).acomplete(messages))
+
+            first = call("first", Priority.SKILL)
+            await asyncio.sleep(0)
+            queued = [call("skill", Priority.SKILL), call("planner", Priority.PLANNER)]
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.snapshot()["GatedLLM:gated-1"]["queue_depth"], 2)
+            llm.gate.set()
+            await asyncio.gather(first, *queued)
+
+        asyncio.run(run())
+
+        self.assertEqual(llm.order, ["first", "planner", "skill"])
+        lane = scheduler.snapshot()["GatedLLM:gated-1"]
+        self.assertEqual((lane["queue_depth"], lane["max_queue_depth"], lane["calls"]), (0, 2, 3))
+
+    def test_cancelled_waiter_leaves_the_queue(self) -> None:
+        scheduler = LLMScheduler(initial_concurrency=1, max_concurrency=1)
+        llm = GatedLLM()
+
+        async def run() -> None:
+            first = asyncio.create_task(scheduler.wrap(llm).acomplete(MESSAGES))
+            await asyncio.sleep(0)
+            waiting = asyncio.create_task(scheduler.wrap(llm).acomplete(MESSAGES))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            llm.gate.set()
+            await first
+
+        asyncio.run(run())
+
+        lane = scheduler.snapshot()["GatedLLM:gated-1"]
+        self.assertEqual((lane["queue_depth"], lane["in_flight"], lane["calls"]), (0, 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
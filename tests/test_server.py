@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import struct
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.schemas import Action, AgentResponse, ChatMessage
+from agentic_chatbot.server import ChatServer, ConversationService, ServerOverloaded
+from agentic_chatbot.sessions import InMemorySessionStore
+
+
+@dataclass
+class EchoAgent:
+    delay: float = 0.0
+    active: int = 0
+    max_active: int = 0
+    seen: list[tuple[int, str]] = field(default_factory=list)
+
+    async def arespond(self, history: list[ChatMessage], user_message: str) -> AgentResponse:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        self.seen.append((len(history), user_message))
+        return AgentResponse(content=f"echo {user_message} after {len(history)}", action=Action.JOKE)
+
+    async def astream_respond(self, history: list[ChatMessage], user_message: str):
+        yield "echo "
+        yield user_message
+        yield AgentResponse(content=f"echo {user_message}", action=Action.JOKE)
+
+
+class ConversationServiceTests(unittest.TestCase):
+    def test_turns_in_one_session_run_in_order(self) -> None:
+        agent = EchoAgent(delay=0.01)
+        service = ConversationService(agent=agent)
+
+        async def run() -> list[AgentResponse]:
+            return await asyncio.gather(*(service.respond("s", f"m{index}") for index in range(4)))
+
+        responses = asyncio.run(run())
+
+        self.assertEqual(agent.seen, [(0, "m0"), (2, "m1"), (4, "m2"), (6, "m3")])
+        self.assertEqual(agent.max_active, 1)
+        self.assertEqual(responses[3].content, "echo m3 after 6")
+        self.assertEqual(len(service.store.load("s")), 8)
+        self.assertEqual(service.snapshot()["active_sessions"], 0)
+
+    def test_sessions_run_concurrently_up_to_limit(self) -> None:
+        agent = EchoAgent(delay=0.02)
+        service = ConversationService(agent=agent, max_concurrent_turns=3)
+
+        async def run() -> None:
+            await asyncio.gather(*(service.respond(f"s{index}", "hi") for index in range(6)))
+
+        asyncio.run(run())
+
+        self.assertEqual(agent.max_active, 3)
+        self.assertEqual(service.stats.turns, 6)
+
+    def test_rejects_turns_past_session_queue_bound(self) -> None:
+        service = ConversationService(agent=EchoAgent(delay=0.02), max_pending_per_session=2)
+
+        async def run() -> list[object]:
+            return await asyncio.gather(*(service.respond("s", f"m{index}") for index in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+
+        self.assertIsInstance(results[2], ServerOverloaded)
+        self.assertEqual(service.stats.rejected, 1)
+        self.assertEqual(len(service.store.load("s")), 4)
+
+    def test_rejects_turns_past_global_queue_bound(self) -> None:
+        service = ConversationService(agent=EchoAgent(delay=0.02), max_queued_turns=2)
+
+        async def run() -> list[object]:
+            return await asyncio.gather(*(service.respond(f"s{index}", "hi") for index in range(3)), return_exceptions=True)
+
+        results = asyncio.run(run())
+
+        self.assertEqual([isinstance(result, ServerOverloaded) for result in results], [False, False, True])
+
+
+class ChatServerTests(unittest.TestCase):
+    def test_http_and_websocket_round_trip(self) -> None:
+        service = ConversationService(agent=EchoAgent(), store=InMemorySessionStore())
+        server = ChatServer(service=service, port=0)
+
+        async def run() -> None:
+            await server.start()
+            try:
+                reader, writer = await asyncio.open_connection(server.host, server.port)
+                status, body = await _http(reader, writer, "POST", "/sessions/alice/messages", {"message": "hello"})
+                self.assertEqual((status, body), (200, {"content": "echo hello after 0", "action": "joke"}))
+
+                status, body = await _http(reader, writer, "POST", "/sessions/alice/messages", {"nope": 1})
+                self.assertEqual(status, 400)
+
+                status, body = await _http(reader, writer, "GET", "/sessions/alice/messages")
+                self.assertEqual([msg["role"] for msg in body["messages"]], ["user", "assistant"])
+                writer.close()
+
+                events = await _websocket_turn(server, "/sessions/bob/ws", {"message": "pun"})
+                self.assertEqual([event["type"] for event in events], ["delta", "delta", "response"])
+                self.assertEqual(events[-1]["content"], "echo pun")
+
+                reader, writer = await asyncio.open_connection(server.host, server.port)
+                status, _ = await _http(reader, writer, "DELETE", "/sessions/alice")
+                self.assertEqual(status, 204)
+                status, body = await _http(reader, writer, "GET", "/healthz")
+                self.assertEqual(body["turns"], 2)
+                writer.close()
+            finally:
+                await server.close()
+
+        asyncio.run(run())
+        self.assertEqual(service.store.load("alice"), [])
+        self.assertEqual(len(service.store.load("bob")), 2)
+
+    def test_invalid_utf8_text_frame_closes_with_1007(self) -> None:
+        server = ChatServer(service=ConversationService(agent=EchoAgent()), port=0)
+
+        async def run() -> bytes:
+            await server.start()
+            try:
+                reader, writer = await _websocket_connect(server, "/sessions/eve/ws")
+                writer.write(_text_frame(b"\xff\xfe", os.urandom(4)))
+                frame = await reader.read()
+                writer.close()
+                return frame
+            finally:
+                await server.close()
+
+        self.assertEqual(asyncio.run(run()), struct.pack("!BBH", 0x88, 2, 1007))
+
+
+async def _http(reader, writer, method: str, path: str, payload: object = None) -> tuple[int, object]:
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    head = (await reader.readuntil(b"\r\n\r\n")).decode()
+    status = int(head.split(" ", 2)[1])
+    length = int(next(line.split(":", 1)[1] for line in head.split("\r\n") if line.lower().startswith("content-length")))
+    data = await reader.readexactly(length)
+    return status, json.loads(data) if data else None
+
+
+async def _websocket_connect(server: ChatServer, path: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 101"), head
+    return reader, writer
+
+
+def _text_frame(data: bytes, mask: bytes) -> bytes:
+    masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(data))
+    return struct.pack("!BB", 0x81, 0x80 | len(data)) + mask + masked
+
+
+async def _websocket_turn(server: ChatServer, path: str, payload: object) -> list[dict]:
+    reader, writer = await _websocket_connect(server, path)
+    mask = os.urandom(4)
+    writer.write(_text_frame(json.dumps(payload).encode(), mask))
+
+    events = []
+    while not events or events[-1]["type"] not in {"response", "error"}:
+        _, length = await reader.readexactly(2)
+        events.append(json.loads(await reader.readexactly(length)))
+    writer.write(struct.pack("!BB", 0x88, 0x80) + mask)
+    await reader.read()
+    writer.close()
+    return events
+
+
+if __name__ == "__main__":
+    unittest.main()
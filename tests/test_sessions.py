@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import unittest
+from pathlib import Path
+import sys
+import tempfile
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.schemas import ChatMessage, Role
+from agentic_chatbot.sessions import (
+    InMemorySessionStore,
+    RedisSessionStore,
+    SQLiteSessionStore,
+    session_store_from_url,
+)
+
+
+def _turn(index: int) -> list[ChatMessage]:
+    return [
+        ChatMessage(role=Role.USER, content=f"question {index}"),
+        ChatMessage(role=Role.ASSISTANT, content=f"answer {index}"),
+    ]
+
+
+class LocalRedis:
+    """The slice of redis-py list commands the session store uses."""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[bytes]] = {}
+        self.ttls: dict[str, int] = {}
+
+    def rpush(self, key: str, *values: str) -> int:
+        items = self.lists.setdefault(key, [])
+        items.extend(value.encode() for value in values)
+        return len(items)
+
+    def lrange(self, key: str, start: int, end: int) -> list[bytes]:
+        items = self.lists.get(key, [])
+        return items[start : None if end == -1 else end + 1]
+
+    def ltrim(self, key: str, start: int, end: int) -> None:
+        self.lists[key] = self.lrange(key, start, end)
+
+    def expire(self, key: str, seconds: int) -> None:
+        self.ttls[key] = seconds
+
+    def delete(self, key: str) -> None:
+        self.lists.pop(key, None)
+
+
+class SessionStoreContractTests:
+    def make_store(self, max_messages: int | None = None):
+        raise NotImplementedError
+
+    def test_appends_and_loads_in_order(self) -> None:
+        store = self.make_store()
+        store.append("a", _turn(1))
+        store.append("b", _turn(9))
+        store.append("a", _turn(2))
+
+        self.assertEqual([msg.content for msg in store.load("a")], ["question 1", "answer 1", "question 2", "answer 2"])
+        self.assertEqual(store.load("a")[1].role, Role.ASSISTANT)
+        self.assertEqual(store.load("missing"), [])
+
+    def test_delete_forgets_session(self) -> None:
+        store = self.make_store()
+        store.append("a", _turn(1))
+
+        store.delete("a")
+
+        self.assertEqual(store.load("a"), [])
+
+    def test_keeps_only_latest_messages(self) -> None:
+        store = self.make_store(max_messages=3)
+        for index in range(3):
+            store.append("a", _turn(index))
+
+        self.assertEqual([msg.content for msg in store.load("a")], ["answer 1", "question 2", "answer 2"])
+
+
+class InMemorySessionStoreTests(SessionStoreContractTests, unittest.TestCase):
+    def make_store(self, max_messages: int | None = None):
+        return InMemorySessionStore(max_messages=max_messages)
+
+    def test_evicts_least_recently_used_session(self) -> None:
+        store = InMemorySessionStore(max_sessions=2)
+        store.append("a", _turn(1))
+        store.append("b", _turn(1))
+        store.load("a")
+
+        store.append("c", _turn(1))
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.load("b"), [])
+        self.assertEqual(len(store.load("a")), 2)
+
+
+class SQLiteSessionStoreTests(SessionStoreContractTests, unittest.TestCase):
+    def make_store(self, max_messages: int | None = None):
+        store = SQLiteSessionStore(max_messages=max_messages)
+        self.addCleanup(store.close)
+        return store
+
+    def test_survives_reopening_the_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/sessions.db"
+            first = session_store_from_url(url)
+            first.append("a", _turn(1))
+            first.close()
+
+            second = session_store_from_url(url)
+            self.assertEqual(len(second.load("a")), 2)
+            second.close()
+
+
+class RedisSessionStoreTests(SessionStoreContractTests, unittest.TestCase):
+    def make_store(self, max_messages: int | None = None):
+        return RedisSessionStore(client=LocalRedis(), max_messages=max_messages)
+
+    def test_refreshes_ttl_on_append(self) -> None:
+        client = LocalRedis()
+        store = RedisSessionStore(client=client, prefix="chat:", ttl_seconds=60)
+
+        store.append("a", _turn(1))
+
+        self.assertEqual(client.ttls, {"chat:a": 60})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.factory import ChatbotFactory
+from agentic_chatbot.mcp import MCPConnectorRegistry, MCPPromptConnector, MCPToolConnector
+from agentic_chatbot.schemas import ChatMessage, Role
+from agentic_chatbot.singleflight import SingleFlight, SingleFlightLLM
+
+MESSAGES = [ChatMessage(role=Role.USER, content="plan this")]
+
+
+@dataclass
+class SlowLLM:
+    model: str = "slow-1"
+    delay: float = 0.05
+    error: Exception | None = None
+    calls: int = 0
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.calls += 1
+        threading.Event().wait(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"answer {self.calls}"
+
+    async def acomplete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f"answer {self.calls}"
+
+
+@dataclass
+class CountingMCPClient:
+    delay: float = 0.05
+    calls: list[tuple[str, str]] = field(default_factory=list)
+
+    def call_tool(self, *, server: str, tool_name: str, arguments: dict[str, Any]) -> str:
+        self.calls.append(("tool", tool_name))
+        threading.Event().wait(self.delay)
+        return f"{tool_name}:{sorted(arguments.items())}"
+
+    async def acall_tool(self, *, server: str, tool_name: str, arguments: dict[str, Any]) -> str:
+        self.calls.append(("tool", tool_name))
+        await asyncio.sleep(self.delay)
+        return f"{tool_name}:{sorted(arguments.items())}"
+
+    def get_prompt(self, *, server: str, prompt_name: str, arguments: dict[str, Any] | None = None) -> str:
+        self.calls.append(("prompt", prompt_name))
+        threading.Event().wait(self.delay)
+        return f"prompt {prompt_name}"
+
+
+class SingleFlightLLMTests(unittest.TestCase):
+    def test_concurrent_identical_deterministic_calls_share_one_request(self) -> None:
+        llm = SlowLLM(delay=0.2)
+        wrapped = SingleFlightLLM(llm)
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            answers = list(pool.map(lambda _: wrapped.complete(MESSAGES, temperature=0.0), range(5)))
+
+        self.assertEqual(answers, ["answer 1"] * 5)
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(wrapped.flight.stats.snapshot()["coalesced"], 4)
+        self.assertEqual(wrapped.flight.in_flight(), 0)
+
+    def test_sampled_and_distinct_calls_are_not_coalesced(self) -> None:
+        llm = SlowLLM(delay=0.01)
+        wrapped = SingleFlightLLM(llm)
+        other = [ChatMessage(role=Role.USER, content="something else")]
+
+        async def run() -> None:
+            await asyncio.gather(
+                wrapped.acomplete(MESSAGES, temperature=0.7),
+                wrapped.acomplete(MESSAGES, temperature=0.7),
+                wrapped.acomplete(MESSAGES, temperature=0.0),
+                wrapped.acomplete(other, temperature=0.0),
+            )
+
+        asyncio.run(run())
+
+        self.assertEqual(llm.calls, 4)
+        self.assertEqual(wrapped.flight.stats.coalesced, 0)
+
+    def test_errors_reach_every_waiter_and_cancelled_waiters_do_not_cancel_the_call(self) -> None:
+        llm = SlowLLM(error=TimeoutError("upstream timed out"))
+        wrapped = SingleFlightLLM(llm)
+
+        async def run() -> list[Any]:
+            calls = [asyncio.create_task(wrapped.acomplete(MESSAGES, temperature=0.0)) for _ in range(4)]
+            await asyncio.sleep(0.01)
+            calls[0].cancel()
+            return await asyncio.gather(*calls, return_exceptions=True)
+
+        outcomes = asyncio.run(run())
+
+        self.assertIsInstance(outcomes[0], asyncio.CancelledError)
+        self.assertTrue(all(isinstance(outcome, TimeoutError) for outcome in outcomes[1:]))
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(wrapped.flight.stats.shared_errors, 3)
+
+    def test_factory_wraps_each_stage_around_one_shared_flight(self) -> None:
+        flight = SingleFlight()
+        agent = ChatbotFactory(provider="openai", sdk_client=object(), single_flight=flight).build_agent()
+
+        self.assertIsInstance(agent.planner.llm, SingleFlightLLM)
+        self.assertIs(agent.joke_skill.llm.flight, flight)
+
+    def test_same_model_on_different_clients_is_not_coalesced(self) -> None:
+        flight = SingleFlight()
+        first = SingleFlightLLM(SlowLLM(delay=0.2), flight)
+        second = SingleFlightLLM(SlowLLM(delay=0.2), flight)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            answers = list(pool.map(lambda llm: llm.complete(MESSAGES, temperature=0.0), (first, second)))
+
+        self.assertEqual(answers, ["answer 1", "answer 1"])
+        self.assertEqual((first.llm.calls, second.llm.calls), (1, 1))
+        self.assertEqual(flight.stats.coalesced, 0)
+
+
+class RegistrySingleFlightTests(unittest.TestCase):
+    def _registry(self, client: CountingMCPClient) -> MCPConnectorRegistry:
+        registry = MCPConnectorRegistry(single_flight=SingleFlight())
+        registry.register_tool("search", MCPToolConnector(client=client, server="s", tool_name="search"))
+        registry.register_tool("lookup", MCPToolConnector(client=client, server="s", tool_name="search"))
+        registry.register_prompt("system", MCPPromptConnector(client=client, server="s", prompt_name="system"))
+        return registry
+
+    def test_identical_tool_calls_coalesce_across_aliases(self) -> None:
+        client = CountingMCPClient()
+        registry = self._registry(client)
+
+        async def run() -> list[str]:
+            return await asyncio.gather(
+                registry.acall_tool("search", {"q": "pasta", "n": 1}),
+                registry.acall_tool("lookup", {"n": 1, "q": "pasta"}),
+                registry.acall_tool("search", {"q": "soup"}),
+            )
+
+        results = asyncio.run(run())
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(client.calls, [("tool", "search"), ("tool", "search")])
+        self.assertEqual(registry.single_flight.stats.coalesced, 1)
+
+    def test_concurrent_prompt_fetches_share_one_request(self) -> None:
+        client = CountingMCPClient(delay=0.2)
+        registry = self._registry(client)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            prompts = list(pool.map(lambda _: registry.get_prompt("system"), range(4)))
+
+        self.assertEqual(set(prompts), {"prompt system"})
+        self.assertEqual(client.calls, [("prompt", "system")])
+
+    def test_factory_shares_its_flight_with_the_registry(self) -> None:
+        client = CountingMCPClient()
+        registry = self._registry(client)
+        registry.single_flight = None
+        old = dict(os.environ)
+        try:
+            os.environ["LLM_SINGLE_FLIGHT"] = "1"
+            factory = ChatbotFactory.from_env()
+        finally:
+            os.environ.clear()
+            os.environ.update(old)
+        factory.sdk_client = object()
+        factory.mcp_registry = registry
+
+        agent = factory.build_agent()
+
+        self.assertIsNotNone(factory.single_flight)
+        self.assertIs(registry.single_flight, factory.single_flight)
+        self.assertIs(agent.joke_skill.mcp_registry, registry)
+
+        async def run() -> list[str]:
+            return await asyncio.gather(*(registry.acall_tool("search", {"q": "pasta"}) for _ in range(3)))
+
+        asyncio.run(run())
+        self.assertEqual(client.calls, [("tool", "search")])
+        self.assertEqual(factory.single_flight.stats.coalesced, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
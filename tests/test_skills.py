@@ -8,8 +8,9 @@ from typing import Any
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
+from agentic_chatbot.cache import ResponseCache
 from agentic_chatbot.schemas import Action, ChatMessage, Plan, Role
-from agentic_chatbot.skills import ClarifySkill, JokeSkill, RecipeSkill
+from agentic_chatbot.skills import ClarifySkill, JokeSkill, RecipeSkill, _LLMSkill
 
 
 @dataclass
@@ -50,6 +51,16 @@ class FakeRegistry:
         return self.tool_text
 
 
+@dataclass
+class StreamingLLM(RecordingLLM):
+    deltas: tuple[str, ...] = ()
+
+    def stream(self, messages: list[ChatMessage], *, temperature: float = 0.2):
+        self.last_messages = messages
+        self.last_temperature = temperature
+        yield from self.deltas
+
+
 class SkillTests(unittest.TestCase):
     def test_clarify_skill_prefers_plan_question(self) -> None:
         skill = ClarifySkill()
@@ -60,6 +71,10 @@ class SkillTests(unittest.TestCase):
         self.assertEqual(result.action, Action.CLARIFY)
         self.assertEqual(result.content, "Can you clarify?")
 
+    def test_llm_skills_must_build_their_own_prompt(self) -> None:
+        with self.assertRaises(TypeError):
+            _LLMSkill(llm=RecordingLLM(response_text="x"))
+
     def test_joke_skill_builds_prompt_and_uses_temperature(self) -> None:
         llm = RecordingLLM(response_text="  A clean cat joke.  ")
         skill = JokeSkill(llm=llm)
@@ -116,6 +131,97 @@ class SkillTests(unittest.TestCase):
         self.assertNotIn("External tool context", llm.last_messages[-1].content)
         self.assertIn("Ingredients preference: rice.", llm.last_messages[-1].content)
 
+    def test_skill_fans_out_multiple_tools_in_plan_order(self) -> None:
+        llm = RecordingLLM(response_text="Recipe")
+        registry = FakeRegistry(tool_text="ctx")
+        skill = RecipeSkill(llm=llm, mcp_registry=registry)
+        plan = Plan(
+            action=Action.RECIPE,
+            reason="food",
+            params={"mcp_tools": [{"tool": "pantry", "args": {"k": 1}}, "nutrition"]},
+        )
+
+        skill.run(plan, history=[], user_message="dinner")
+
+        self.assertIn("External tool context:\n[pantry]\nctx\n\n[nutrition]\nctx", llm.last_messages[-1].content)
+        self.assertEqual(registry.last_tool_alias, "nutrition")
+
+    def test_recipe_skill_stream_yields_deltas_then_response(self) -> None:
+        llm = StreamingLLM(deltas=("  ", "Pancakes", "\n1. Mix", " "))
+        skill = RecipeSkill(llm=llm)
+        plan = Plan(action=Action.RECIPE, reason="food", params={"ingredients": "flour"})
+
+        chunks = list(skill.stream(plan, history=[], user_message="pancakes"))
+
+        self.assertEqual(chunks[:-1], ["Pancakes", "\n1. Mix", " "])
+        self.assertEqual(chunks[-1].content, "Pancakes\n1. Mix")
+        self.assertEqual(chunks[-1].action, Action.RECIPE)
+        self.assertEqual(llm.last_temperature, 0.4)
+
+    def test_joke_skill_stream_falls_back_to_complete(self) -> None:
+        llm = RecordingLLM(response_text=" Joke ")
+        skill = JokeSkill(llm=llm)
+        plan = Plan(action=Action.JOKE, reason="joke")
+
+        chunks = list(skill.stream(plan, history=[], user_message="joke"))
+
+        self.assertEqual(chunks[0], "Joke ")
+        self.assertEqual(chunks[-1].content, "Joke")
+
+
+class SkillResponseCacheTests(unittest.TestCase):
+    def test_caches_recipes_but_not_creative_jokes(self) -> None:
+        cache = ResponseCache()
+        recipe_llm = StreamingLLM(response_text="Pasta", deltas=("Pas", "ta"))
+        joke_llm = RecordingLLM(response_text="A joke")
+        recipe = RecipeSkill(llm=recipe_llm, response_cache=cache)
+        joke = JokeSkill(llm=joke_llm, response_cache=cache)
+        recipe_plan = Plan(action=Action.RECIPE, reason="r", params={"ingredients": "Tomato", "servings": 2})
+
+        list(recipe.stream(recipe_plan, [], "pasta please"))
+        recipe_llm.last_messages = []
+        same_request = Plan(action=Action.RECIPE, reason="r", params={"servings": 2, "ingredients": "tomato "})
+        response = recipe.run(same_request, [ChatMessage(role=Role.USER, content="hi")], "again")
+        joke.run(Plan(action=Action.JOKE, reason="j"), [], "joke")
+        joke_llm.last_messages = []
+        joke.run(Plan(action=Action.JOKE, reason="j"), [], "joke")
+
+        self.assertEqual(response.content, "Pasta")
+        self.assertEqual(recipe_llm.last_messages, [])
+        self.assertNotEqual(joke_llm.last_messages, [])
+        self.assertEqual(len(cache), 1)
+
+    def test_cache_policy_is_per_skill(self) -> None:
+        llm = RecordingLLM(response_text="Same joke")
+        joke = JokeSkill(llm=llm, temperature=0.8, response_cache=ResponseCache(), cache_max_temperature=1.0)
+
+        joke.run(Plan(action=Action.JOKE, reason="j"), [], "joke")
+        llm.last_messages = []
+        response = joke.run(Plan(action=Action.JOKE, reason="j"), [], "joke")
+
+        self.assertEqual(response.content, "Same joke")
+        self.assertEqual(llm.last_messages, [])
+
+
+class AsyncSkillTests(unittest.IsolatedAsyncioTestCase):
+    async def test_joke_skill_arun_matches_sync_prompt(self) -> None:
+        llm = RecordingLLM(response_text=" Joke ")
+        registry = FakeRegistry(prompt_text="Custom comedian prompt", tool_text="Facts from tool")
+        skill = JokeSkill(llm=llm, mcp_registry=registry)
+        plan = Plan(
+            action=Action.JOKE,
+            reason="joke",
+            params={"topic": "cats", "mcp_prompt": "comedy_prompt", "mcp_tool": "fact_tool"},
+        )
+
+        result = await skill.arun(plan, [], "Tell me a joke")
+
+        self.assertEqual(result.content, "Joke")
+        self.assertEqual(llm.last_temperature, 0.8)
+        self.assertEqual(llm.last_messages[0].content, "Custom comedian prompt")
+        self.assertIn("External tool context:\nFacts from tool", llm.last_messages[-1].content)
+        self.assertNotIn("user_message", plan.params)
+
 
 if __name__ == "__main__":
     unittest.main()
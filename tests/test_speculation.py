@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.agent import AgenticChatbot
+from agentic_chatbot.schemas import Action, AgentResponse, ChatMessage, Plan, Role
+from agentic_chatbot.skills import ClarifySkill, JokeSkill, RecipeSkill
+from agentic_chatbot.speculation import KeywordPredictor, PreviousActionPredictor, Speculation
+
+
+@dataclass
+class SlowPlanner:
+    next_plan: Plan
+    delay: float = 0.05
+
+    async def aplan(self, history, user_message):
+        await asyncio.sleep(self.delay)
+        return self.next_plan
+
+
+@dataclass
+class SlowLLM:
+    text: str
+    delay: float = 0.05
+    started: int = 0
+    finished: int = 0
+
+    def complete(self, messages, *, temperature: float = 0.2) -> str:
+        raise AssertionError("async path expected")
+
+    async def acomplete(self, messages, *, temperature: float = 0.2) -> str:
+        self.started += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        return self.text
+
+
+@dataclass
+class FixedPredictor:
+    guess: Plan | None
+    observed: list[Plan] = field(default_factory=list)
+
+    def predict(self, history, user_message):
+        return self.guess
+
+    def observe(self, history, user_message, plan, response):
+        self.observed.append(plan)
+
+
+def _agent(plan: Plan, guess: Plan | None, llm: SlowLLM) -> tuple[AgenticChatbot, Speculation]:
+    speculation = Speculation(predictor=FixedPredictor(guess=guess))
+    agent = AgenticChatbot(
+        planner=SlowPlanner(next_plan=plan),
+        clarify_skill=ClarifySkill(),
+        joke_skill=JokeSkill(llm=llm),
+        recipe_skill=RecipeSkill(llm=llm),
+        speculation=speculation,
+    )
+    return agent, speculation
+
+
+class SpeculationTests(unittest.IsolatedAsyncioTestCase):
+    async def test_correct_guess_overlaps_planning_and_skill(self) -> None:
+        llm = SlowLLM(text="joke")
+        plan = Plan(action=Action.JOKE, reason="planner", params={"topic": "cats"})
+        guess = Plan(action=Action.JOKE, reason="guess", params={"topic": "cats"})
+        agent, speculation = _agent(plan, guess, llm)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await agent.arespond(history=[], user_message="joke about cats")
+        elapsed = loop.time() - started
+
+        self.assertEqual(response, AgentResponse(content="joke", action=Action.JOKE))
+        self.assertEqual(llm.started, 1)
+        self.assertLess(elapsed, 0.095)
+        self.assertEqual(speculation.stats.hits, 1)
+        self.assertEqual(speculation.stats.accuracy, 1.0)
+
+    async def test_wrong_guess_is_cancelled_and_counted_as_waste(self) -> None:
+        llm = SlowLLM(text="recipe")
+        plan = Plan(action=Action.RECIPE, reason="planner", params={"ingredients": "rice"})
+        guess = Plan(action=Action.JOKE, reason="guess")
+        agent, speculation = _agent(plan, guess, llm)
+
+        response = await agent.arespond(history=[], user_message="rice please")
+
+        self.assertEqual(response.action, Action.RECIPE)
+        self.assertEqual(llm.started, 2)
+        self.assertEqual(llm.finished, 1)
+        self.assertEqual(speculation.stats.misses, 1)
+        self.assertGreater(speculation.stats.wasted_tokens, 0)
+
+    async def test_regex_guess_is_accepted_for_a_realistic_planner_plan(self) -> None:
+        llm = SlowLLM(text="joke", delay=0)
+        message = "Tell me a joke about Cats!"
+        guess = KeywordPredictor().predict([], message)
+        plan = Plan(action=Action.JOKE, reason="planner", params={"topic": "cats", "style": "clean"})
+        agent, speculation = _agent(plan, guess, llm)
+
+        await agent.arespond(history=[], user_message=message)
+
+        self.assertEqual(speculation.stats.hits, 1)
+        self.assertEqual(llm.started, 1)
+
+    async def test_param_mismatch_rejects_same_action(self) -> None:
+        llm = SlowLLM(text="joke", delay=0)
+        plan = Plan(action=Action.JOKE, reason="planner", params={"topic": "dogs"})
+        guess = Plan(action=Action.JOKE, reason="guess", params={"topic": "cats"})
+        agent, speculation = _agent(plan, guess, llm)
+
+        await agent.arespond(history=[], user_message="joke about dogs")
+
+        self.assertEqual(speculation.stats.misses, 1)
+
+    async def test_clarify_guesses_are_skipped(self) -> None:
+        llm = SlowLLM(text="joke", delay=0)
+        agent, speculation = _agent(Plan(action=Action.JOKE, reason="p"), Plan(action=Action.CLARIFY, reason="g"), llm)
+
+        await agent.arespond(history=[], user_message="hm")
+
+        self.assertEqual(speculation.stats.skipped, 1)
+        self.assertEqual(speculation.stats.attempts, 0)
+
+
+class KeywordPredictorTests(unittest.TestCase):
+    def test_guesses_without_params_are_not_made_by_default(self) -> None:
+        self.assertIsNone(KeywordPredictor().predict([], "got any jokes"))
+        self.assertIsNotNone(KeywordPredictor(require_params=False).predict([], "got any jokes"))
+
+
+class PreviousActionPredictorTests(unittest.TestCase):
+    def test_predicts_previous_action_for_same_conversation(self) -> None:
+        predictor = PreviousActionPredictor()
+        plan = Plan(action=Action.RECIPE, reason="r", params={"diet": "vegan"})
+        predictor.observe([], "vegan dinner", plan, AgentResponse(content="Tofu bowl", action=Action.RECIPE))
+        history = [
+            ChatMessage(role=Role.USER, content="vegan dinner"),
+            ChatMessage(role=Role.ASSISTANT, content="Tofu bowl"),
+        ]
+        guess = predictor.predict(history, "another one")
+
+        assert guess is not None
+        self.assertEqual(guess.action, Action.RECIPE)
+        self.assertIsNone(predictor.predict([], "another one"))
+
+
+if __name__ == "__main__":
+    unittest.main()
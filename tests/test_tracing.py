@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.agent import AgenticChatbot
+from agentic_chatbot.cache import PlanCache
+from agentic_chatbot.mcp import MCPConnectorRegistry, MCPPromptConnector, PromptCache
+from agentic_chatbot.planner import Planner
+from agentic_chatbot.schemas import ChatMessage
+from agentic_chatbot.skills import ClarifySkill, JokeSkill, RecipeSkill
+from agentic_chatbot.tracing import (
+    InMemoryExporter,
+    JSONLinesExporter,
+    OTLPJSONExporter,
+    Tracer,
+    iter_spans,
+    set_tracer,
+    span,
+)
+
+
+@dataclass
+class ScriptedLLM:
+    planner_output: str
+    skill_output: str = "Why did the cat sit on the keyboard? To keep an eye on the mouse."
+    model: str = "test-model"
+
+    def complete(self, messages: list[ChatMessage], *, temperature: float = 0.2) -> str:
+        if "routing planner" in messages[0].content:
+            return self.planner_output
+        return self.skill_output
+
+
+@dataclass
+class StaticPromptClient:
+    calls: int = 0
+
+    def get_prompt(self, *, server: str, prompt_name: str, arguments: dict | None = None) -> str:
+        self.calls += 1
+        return "You are a pun specialist."
+
+
+class TracingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.exporter = InMemoryExporter()
+        set_tracer(Tracer([self.exporter]))
+        self.addCleanup(set_tracer, None)
+
+    def _agent(self, llm: ScriptedLLM, registry: MCPConnectorRegistry | None = None) -> AgenticChatbot:
+        return AgenticChatbot(
+            planner=Planner(llm=llm, cache=PlanCache()),
+            clarify_skill=ClarifySkill(),
+            joke_skill=JokeSkill(llm=llm, mcp_registry=registry),
+            recipe_skill=RecipeSkill(llm=llm, mcp_registry=registry),
+        )
+
+    def test_turn_produces_nested_stage_spans(self) -> None:
+        llm = ScriptedLLM(planner_output='{"action":"joke","reason":"asked","params":{"mcp_prompt":"puns"}}')
+        registry = MCPConnectorRegistry(
+            prompt_connectors={
+                "puns": MCPPromptConnector(client=StaticPromptClient(), server="s", prompt_name="puns")
+            },
+            prompt_cache=PromptCache(),
+        )
+        agent = self._agent(llm, registry)
+
+        agent.respond(history=[], user_message="tell me a joke")
+
+        root = self.exporter.by_name("agent.respond")[0]
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(root.attributes["action"], "joke")
+        self.assertTrue(all(item.trace_id == root.trace_id for item in self.exporter.spans))
+
+        plan_span = self.exporter.by_name("planner.plan")[0]
+        self.assertEqual(plan_span.parent_id, root.span_id)
+        self.assertFalse(plan_span.attributes["cache_hit"])
+        self.assertTrue(self.exporter.by_name("planner.parse")[0].attributes["valid_json"])
+
+        skill_span = self.exporter.by_name("skill.run")[0]
+        self.assertEqual(skill_span.parent_id, root.span_id)
+        prompt_span = self.exporter.by_name("mcp.get_prompt")[0]
+        self.assertFalse(prompt_span.attributes["cache_hit"])
+
+        planner_call, skill_call = self.exporter.by_name("llm.complete")
+        self.assertEqual(planner_call.parent_id, plan_span.span_id)
+        self.assertEqual(skill_call.parent_id, skill_span.span_id)
+        self.assertEqual(skill_call.attributes["model"], "test-model")
+        self.assertEqual(skill_call.attributes["stage"], "joke")
+        self.assertEqual(skill_call.attributes["response_chars"], len(llm.skill_output))
+        self.assertGreater(skill_call.attributes["prompt_chars"], 0)
+
+    def test_cache_hit_skips_llm_span(self) -> None:
+        llm = ScriptedLLM(planner_output='{"action":"joke","reason":"asked"}')
+        agent = self._agent(llm)
+        agent.respond(history=[], user_message="tell me a joke")
+        self.exporter.clear()
+
+        agent.respond(history=[], user_message="tell me a joke")
+
+        self.assertTrue(self.exporter.by_name("planner.plan")[0].attributes["cache_hit"])
+        self.assertEqual([item.attributes["stage"] for item in self.exporter.by_name("llm.complete")], ["joke"])
+
+    def test_failed_stage_is_marked_as_error(self) -> None:
+        with self.assertRaises(ValueError):
+            with span("outer"):
+                raise ValueError("boom")
+
+        failed = self.exporter.by_name("outer")[0]
+        self.assertEqual(failed.status, "error")
+        self.assertEqual(failed.error, "ValueError: boom")
+
+    def test_disabled_tracing_records_nothing(self) -> None:
+        set_tracer(None)
+        with span("ignored", size=1) as current:
+            current.set_attribute("more", 2)
+            self.assertFalse(current.recording)
+        self.assertEqual(self.exporter.spans, [])
+
+    def test_file_exporters(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path = Path(directory) / "spans.jsonl"
+            otlp_path = Path(directory) / "otlp.jsonl"
+            set_tracer(Tracer([JSONLinesExporter(jsonl_path), OTLPJSONExporter(path=otlp_path)]))
+
+            with span("outer", action="joke"):
+                with span("inner", cache_hit=True):
+                    pass
+
+            inner, outer = list(iter_spans(jsonl_path))
+            self.assertEqual(inner["parent_id"], outer["span_id"])
+            self.assertEqual(outer["attributes"], {"action": "joke"})
+
+            requests = [json.loads(line) for line in otlp_path.read_text().splitlines()]
+            otlp_inner = requests[0]["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+            self.assertEqual(otlp_inner["parentSpanId"], outer["span_id"])
+            self.assertEqual(otlp_inner["attributes"], [{"key": "cache_hit", "value": {"boolValue": True}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
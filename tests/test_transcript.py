@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agentic_chatbot.llm import AnthropicChatClient
+from agentic_chatbot.schemas import ChatMessage, Role
+from agentic_chatbot.transcript import PrefixCache, Transcript
+
+
+def _messages(count: int) -> list[ChatMessage]:
+    roles = (Role.USER, Role.ASSISTANT)
+    return [ChatMessage(role=roles[index % 2], content=f"message {index}") for index in range(count)]
+
+
+class TranscriptTests(unittest.TestCase):
+    def test_behaves_like_a_message_list(self) -> None:
+        messages = _messages(4)
+        transcript = Transcript(messages)
+
+        self.assertEqual(transcript, messages)
+        self.assertEqual(transcript[-1], messages[-1])
+        self.assertEqual(transcript[1:3], messages[1:3])
+        self.assertEqual(transcript.role(1), Role.ASSISTANT)
+
+    def test_prefix_views_do_not_see_later_appends(self) -> None:
+        transcript = Transcript(_messages(2))
+        view = transcript[:2]
+
+        transcript.append(ChatMessage(role=Role.USER, content="later"))
+        view.append(ChatMessage(role=Role.USER, content="forked"))
+
+        self.assertEqual([msg.content for msg in transcript], ["message 0", "message 1", "later"])
+        self.assertEqual([msg.content for msg in view], ["message 0", "message 1", "forked"])
+        self.assertEqual(len(transcript[:2]), 2)
+
+    def test_interns_content_and_keys_prefixes_by_content(self) -> None:
+        first = Transcript([ChatMessage(role=Role.USER, content="".join(["sha", "red"]))])
+        second = Transcript([ChatMessage(role=Role.USER, content="".join(["sh", "ared"]))])
+        other_role = Transcript([ChatMessage(role=Role.ASSISTANT, content="shared")])
+
+        self.assertIs(first.content(0), second.content(0))
+        self.assertEqual(first.prefix_key(1), second.prefix_key(1))
+        self.assertNotEqual(first.prefix_key(1), other_role.prefix_key(1))
+
+    def test_extended_leaves_the_base_untouched(self) -> None:
+        base = Transcript([ChatMessage(role=Role.SYSTEM, content="prompt")])
+        history = Transcript(_messages(3))
+
+        joined = base.extended(history, [ChatMessage(role=Role.USER, content="new")])
+
+        self.assertEqual(len(base), 1)
+        self.assertEqual(len(history), 3)
+        self.assertEqual([msg.role for msg in joined][:2], [Role.SYSTEM, Role.USER])
+        self.assertEqual(joined.prefix_key(4), Transcript([base[0], *history]).prefix_key(4))
+
+
+class PrefixCacheTests(unittest.TestCase):
+    def test_converts_only_messages_past_the_cached_prefix(self) -> None:
+        converted: list[str] = []
+
+        def convert(role: Role, content: str) -> str:
+            converted.append(content)
+            return f"{role.value}: {content}"
+
+        cache = PrefixCache(convert)
+        messages = _messages(4)
+
+        cache.items(messages[:2])
+        items = cache.items(messages)
+
+        self.assertEqual(converted, ["message 0", "message 1", "message 2", "message 3"])
+        self.assertEqual(items[-1], "assistant: message 3")
+        self.assertEqual(cache.snapshot()["hits"], 1)
+
+    def test_prefixes_of_one_conversation_share_storage(self) -> None:
+        cache = PrefixCache(lambda role, content: content)
+        transcript = Transcript()
+        for message in _messages(6):
+            transcript.append(message)
+            cache.items(transcript)
+        cache.items([*_messages(2), ChatMessage(role=Role.USER, content="fork")])
+
+        entries = list(cache._entries.values())
+        self.assertEqual(len(entries), 7)
+        self.assertEqual(len({id(view._buffer) for view, _ in entries[:6]}), 1)
+        self.assertEqual(len({id(items) for _, items in entries[:6]}), 1)
+        self.assertEqual(entries[-1][1], ["message 0", "message 1", "fork"])
+        self.assertEqual(entries[0][1], [f"message {index}" for index in range(6)])
+
+    def test_anthropic_payload_marks_copies_of_cached_blocks(self) -> None:
+        endpoint = SimpleNamespace(requests=[])
+
+        def create(**request: object) -> object:
+            endpoint.requests.append(request)
+            return SimpleNamespace(content=[SimpleNamespace(text="ok")], usage=None)
+
+        endpoint.create = create
+        client = AnthropicChatClient(model="claude", sdk_client=SimpleNamespace(messages=endpoint))
+        prompt = ChatMessage(role=Role.SYSTEM, content="prompt")
+        messages = [prompt, *_messages(3)]
+
+        client.complete(messages)
+        client.complete([*messages, *_messages(5)[3:]])
+
+        first, second = endpoint.requests
+        self.assertIn("cache_control", first["messages"][1]["content"][-1])
+        self.assertEqual(second["messages"][1]["content"][-1], {"type": "text", "text": "message 1"})
+        self.assertIn("cache_control", second["messages"][3]["content"][-1])
+        self.assertEqual(client._payloads.snapshot()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,285 @@
+"""Per-stage spans for planner, skills, LLM and MCP calls; a no-op until `set_tracer` is called."""
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Protocol
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time_ns: int
+    end_time_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: str | None = None
+    _start_perf_ns: int = field(default=0, repr=False)
+
+    recording = True
+
+    @property
+    def duration_ms(self) -> float:
+        if self.end_time_ns is None:
+            return 0.0
+        return (self.end_time_ns - self.start_time_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_ns": self.start_time_ns,
+            "end_time_ns": self.end_time_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    recording = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+    def set_attributes(self, **attributes: Any) -> None:
+        return None
+
+
+class _NoopSpanContext:
+    def __enter__(self) -> _NoopSpan:
+        return _NOOP_SPAN
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+_NOOP_CONTEXT = _NoopSpanContext()
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None:
+        ...
+
+
+@dataclass
+class InMemoryExporter:
+    spans: list[Span] = field(default_factory=list)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def by_name(self, name: str) -> list[Span]:
+        return [span for span in self.spans if span.name == name]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+@dataclass
+class JSONLinesExporter:
+    path: str | Path
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+@dataclass
+class OTLPJSONExporter:
+    """Writes one OTLP/JSON `ExportTraceServiceRequest` per span (as JSON lines).
+
+    The output can be replayed to an OpenTelemetry collector's OTLP/HTTP endpoint, or
+    `sink` can post each request directly.
+    """
+
+    path: str | Path | None = None
+    sink: Callable[[dict[str, Any]], None] | None = None
+    service_name: str = "agentic_chatbot"
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def export(self, span: Span) -> None:
+        request = self.to_otlp(span)
+        if self.sink is not None:
+            self.sink(request)
+        if self.path is not None:
+            with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(request) + "\n")
+
+    def to_otlp(self, span: Span) -> dict[str, Any]:
+        otlp_span: dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns or span.start_time_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "agentic_chatbot.tracing"}, "spans": [otlp_span]}],
+                }
+            ]
+        }
+
+
+@dataclass
+class Tracer:
+    exporters: list[SpanExporter] = field(default_factory=list)
+
+    def span(self, name: str, **attributes: Any) -> "_SpanContext":
+        return _SpanContext(self, name, attributes)
+
+    def _finish(self, span: Span) -> None:
+        for exporter in self.exporters:
+            exporter.export(span)
+
+
+class _SpanContext:
+    __slots__ = ("_tracer", "_name", "_attributes", "_span", "_token")
+
+    def __init__(self, tracer: Tracer, name: str, attributes: dict[str, Any]) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._span: Span | None = None
+        self._token: contextvars.Token[Span | None] | None = None
+
+    def __enter__(self) -> Span:
+        parent = _current_span.get()
+        span = Span(
+            name=self._name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            start_time_ns=time.time_ns(),
+            attributes=self._attributes,
+            _start_perf_ns=time.perf_counter_ns(),
+        )
+        self._span = span
+        self._token = _current_span.set(span)
+        return span
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        span = self._span
+        assert span is not None and self._token is not None
+        span.end_time_ns = span.start_time_ns + (time.perf_counter_ns() - span._start_perf_ns)
+        if exc is not None:
+            span.status = "error"
+            span.error = f"{type(exc).__name__}: {exc}"
+        _current_span.reset(self._token)
+        self._tracer._finish(span)
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("agentic_chatbot_span", default=None)
+_tracer: Tracer | None = None
+
+
+def set_tracer(tracer: Tracer | None) -> None:
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+def tracer_from_env() -> Tracer | None:
+    """Build a tracer from `TRACE_JSONL_PATH` and/or `TRACE_OTLP_PATH`; None when neither is set."""
+    exporters: list[SpanExporter] = []
+    if jsonl_path := os.getenv("TRACE_JSONL_PATH"):
+        exporters.append(JSONLinesExporter(jsonl_path))
+    if otlp_path := os.getenv("TRACE_OTLP_PATH"):
+        exporters.append(OTLPJSONExporter(path=otlp_path, service_name=os.getenv("TRACE_SERVICE_NAME", "agentic_chatbot")))
+    return Tracer(exporters) if exporters else None
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """Context manager yielding a `Span` (or a no-op stand-in when tracing is off)."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP_CONTEXT
+    return tracer.span(name, **attributes)
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the innermost active span, if any."""
+    if _tracer is None:
+        return
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def llm_span(stage: str, llm: Any, messages: list[Any]) -> Any:
+    """Span around one LLM call; attributes are only computed while tracing is on."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP_CONTEXT
+    return tracer.span(
+        "llm.complete",
+        stage=stage,
+        prompt_messages=len(messages),
+        prompt_chars=sum(len(msg.content) for msg in messages),
+        **llm_attributes(llm),
+    )
+
+
+def llm_attributes(llm: Any) -> dict[str, Any]:
+    return {
+        "provider": getattr(llm, "provider", None) or _PROVIDERS.get(type(llm).__name__, type(llm).__name__),
+        "model": getattr(llm, "model", None),
+    }
+
+
+_PROVIDERS = {
+    "OpenAIChatClient": "openai",
+    "AnthropicChatClient": "anthropic",
+    "GoogleChatClient": "google",
+}
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        typed: dict[str, Any] = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": "" if value is None else str(value)}
+    return {"key": key, "value": typed}
+
+
+def iter_spans(path: str | Path) -> Iterator[dict[str, Any]]:
+    """Read spans written by `JSONLinesExporter`."""
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Iterable, Iterator, Sequence, TypeVar, overload
+
+from .schemas import ChatMessage, Role
+
+T = TypeVar("T")
+
+_ROLES = tuple(Role)
+_ROLE_CODES = {role: code for code, role in enumerate(_ROLES)}
+
+
+class _Buffer:
+    __slots__ = ("roles", "contents", "keys")
+
+    def __init__(self) -> None:
+        self.roles = array("B")
+        self.contents: list[str] = []
+        # keys[i] identifies the first i + 1 messages by content, so equal prefixes of
+        # different transcripts share a key.
+        self.keys: list[int] = []
+
+
+class Transcript(Sequence[ChatMessage]):
+    """Append-only message history: role codes in a byte array and interned content.
+
+    `prefix()` (or slicing from the start) returns a view sharing the same storage, and
+    appending to a transcript never changes a view taken earlier. Appending to a view
+    copies its messages first. Every prefix has a content key (`prefix_key`) that callers
+    can use to cache per-prefix work. Appends are not thread-safe; callers serialize them.
+    """
+
+    __slots__ = ("_buffer", "_length", "_owner")
+
+    def __init__(self, messages: Iterable[ChatMessage] = ()) -> None:
+        self._buffer = _Buffer()
+        self._length = 0
+        self._owner = True
+        self.extend(messages)
+
+    @classmethod
+    def of(cls, messages: Iterable[ChatMessage]) -> Transcript:
+        return messages if isinstance(messages, Transcript) else cls(messages)
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> ChatMessage:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[ChatMessage]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> ChatMessage | Sequence[ChatMessage]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if start == 0 and step == 1:
+                return self.prefix(stop)
+            return [self._message(position) for position in range(start, stop, step)]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("transcript index out of range")
+        return self._message(index)
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        roles, contents = self._buffer.roles, self._buffer.contents
+        for index in range(self._length):
+            yield ChatMessage(role=_ROLES[roles[index]], content=contents[index])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (Transcript, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(mine == theirs for mine, theirs in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Transcript({list(self)!r})"
+
+    def role(self, index: int) -> Role:
+        return _ROLES[self._buffer.roles[index]]
+
+    def content(self, index: int) -> str:
+        return self._buffer.contents[index]
+
+    def prefix(self, length: int) -> Transcript:
+        if not 0 <= length <= self._length:
+            raise ValueError(f"Prefix length {length} is outside 0..{self._length}")
+        view = Transcript.__new__(Transcript)
+        view._buffer, view._length, view._owner = self._buffer, length, False
+        return view
+
+    def prefix_key(self, length: int) -> int | None:
+        return self._buffer.keys[length - 1] if length else None
+
+    def append(self, message: ChatMessage) -> None:
+        buffer = self._writable()
+        code = _ROLE_CODES[message.role]
+        content = sys.intern(message.content)
+        parent = buffer.keys[-1] if buffer.keys else 0
+        buffer.roles.append(code)
+        buffer.contents.append(content)
+        buffer.keys.append(hash((parent, code, content)))
+        self._length += 1
+
+    def extend(self, messages: Iterable[ChatMessage]) -> None:
+        if not isinstance(messages, Transcript):
+            for message in messages:
+                self.append(message)
+            return
+        buffer = self._writable()
+        other, count = messages._buffer, messages._length
+        roles, contents = other.roles[:count], other.contents[:count]
+        if buffer.keys:
+            parent = buffer.keys[-1]
+            for code, content in zip(roles, contents):
+                parent = hash((parent, code, content))
+                buffer.keys.append(parent)
+        else:
+            # Starting from empty, the other transcript's keys are already right.
+            buffer.keys.extend(other.keys[:count])
+        buffer.roles.extend(roles)
+        buffer.contents.extend(contents)
+        self._length += count
+
+    def extended(self, *parts: Iterable[ChatMessage]) -> Transcript:
+        """A new transcript: this one followed by `parts`, leaving this one unchanged."""
+        result = Transcript(self)
+        for part in parts:
+            result.extend(part)
+        return result
+
+    def _message(self, index: int) -> ChatMessage:
+        return ChatMessage(role=_ROLES[self._buffer.roles[index]], content=self._buffer.contents[index])
+
+    def _writable(self) -> _Buffer:
+        buffer = self._buffer
+        if not self._owner:
+            # Views never append into shared storage; the first append copies their messages.
+            copy = _Buffer()
+            copy.roles = buffer.roles[: self._length]
+            copy.contents = buffer.contents[: self._length]
+            copy.keys = buffer.keys[: self._length]
+            self._buffer, self._owner = copy, True
+            buffer = copy
+        return buffer
+
+
+class PrefixCache(Generic[T]):
+    """Per-message payload items, cached for the longest previously seen prefix.
+
+    Provider clients turn every message into a payload item (a dict, a text line). With
+    history growing a turn at a time, all but the newest messages were converted on the
+    previous call, so only the new tail is converted here. Entries hold a view of the
+    caller's transcript and a run of items shared by every prefix of one conversation,
+    so a cached prefix costs no copy of its messages or items.
+    """
+
+    def __init__(self, convert: Callable[[Role, str], T], max_entries: int = 256) -> None:
+        self.convert = convert
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # prefix key -> (view of that prefix, items for at least that many messages)
+        self._entries: OrderedDict[int, tuple[Transcript, list[T]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def items(self, messages: Iterable[ChatMessage]) -> list[T]:
+        transcript = Transcript.of(messages)
+        total = len(transcript)
+        if total == 0:
+            return []
+        length, shared, items = 0, None, []
+        with self._lock:
+            for candidate in range(total, 0, -1):
+                key = transcript.prefix_key(candidate)
+                entry = self._entries.get(key)  # type: ignore[arg-type]
+                # The key is a hash, so confirm the content before trusting it.
+                if entry is not None and _same_prefix(entry[0], transcript, candidate):
+                    self._entries.move_to_end(key)  # type: ignore[arg-type]
+                    length, shared = candidate, entry[1]
+                    items = shared[:length]
+                    break
+            if length:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if length == total:
+            return items
+        tail = [self.convert(transcript.role(index), transcript.content(index)) for index in range(length, total)]
+        items.extend(tail)
+        with self._lock:
+            if shared is not None and len(shared) == length:
+                # This conversation's run ends at the matched prefix; grow it in place.
+                shared.extend(tail)
+            else:
+                shared = list(items)
+            self._entries[transcript.prefix_key(total)] = (transcript.prefix(total), shared)  # type: ignore[index]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return items
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def _same_prefix(cached: Transcript, transcript: Transcript, length: int) -> bool:
+    if len(cached) < length:
+        return False
+    if cached._buffer is transcript._buffer:
+        # Shared storage is append-only, so equal lengths mean equal messages.
+        return True
+    roles, contents = cached._buffer.roles, cached._buffer.contents
+    other_roles, other_contents = transcript._buffer.roles, transcript._buffer.contents
+    # Interned strings make most of these identity checks.
+    return all(
+        roles[index] == other_roles[index]
+        and (contents[index] is other_contents[index] or contents[index] == other_contents[index])
+        for index in range(length)
+    )